@@ -0,0 +1,37 @@
+"""
+File: import_time.py
+Author: Jeff Martin
+Date: 10/18/2026
+Email: jmartin@jeffreymartincomposer.com
+This file measures the cold-start time of importing pctheory in a fresh interpreter.
+Usage: python benchmarks/import_time.py [budget in seconds]
+The script exits with status 1 if the best of several runs exceeds the budget.
+"""
+
+import os
+import subprocess
+import sys
+
+MODULES = "pctheory, pctheory.pcseg, pctheory.pcset, pctheory.set_complex, pctheory.transformations"
+RUNS = 5
+DEFAULT_BUDGET = 0.35
+
+
+def measure_import_time() -> float:
+    """
+    Measures the time to import the pctheory modules in a fresh interpreter.
+    :return: The import time in seconds
+    """
+    code = f"import time\nt = time.perf_counter()\nimport {MODULES}\nprint(time.perf_counter() - t)"
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env["PYTHONPATH"] = src + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+    return float(result.stdout)
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET
+    best = min(measure_import_time() for i in range(RUNS))
+    print(f"import time: {best:.3f} s (budget {budget:.3f} s)")
+    sys.exit(0 if best <= budget else 1)
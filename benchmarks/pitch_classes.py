@@ -0,0 +1,61 @@
+"""
+File: pitch_classes.py
+Author: Jeff Martin
+Date: 10/18/2026
+Email: jmartin@jeffreymartincomposer.com
+This file measures the memory use of PitchClasses and Pitches, and the throughput of
+their hash and equality methods.
+Usage: python benchmarks/pitch_classes.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pctheory.pitch import Pitch, PitchClass
+
+COUNT = 1000000
+
+
+def measure_memory(factory) -> float:
+    """
+    Measures the memory allocated while making a million objects.
+    :param factory: A function that makes an object from an integer
+    :return: The memory in megabytes, including the list that holds the objects
+    """
+    tracemalloc.start()
+    objects = [factory(i) for i in range(COUNT)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current / 1e6
+
+
+def measure_time(function) -> float:
+    """
+    Measures the best of several runs of a function.
+    :param function: The function
+    :return: The time in seconds
+    """
+    best = float("inf")
+    for i in range(3):
+        t = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+if __name__ == "__main__":
+    pcs = [PitchClass(i, 12) for i in range(COUNT)]
+    others = [PitchClass(i, 12) for i in range(COUNT)]
+    pitches = [Pitch(i % 88 - 39, 12) for i in range(COUNT)]
+    print(f"memory, 1M PitchClasses: {measure_memory(lambda i: PitchClass(i, 12)):.1f} MB")
+    print(f"memory, 1M Pitches: {measure_memory(lambda i: Pitch(i % 88 - 39, 12)):.1f} MB")
+    print(f"construct 1M PitchClasses: {measure_time(lambda: [PitchClass(i, 12) for i in range(COUNT)]):.3f} s")
+    print(f"hash 1M PitchClasses: {measure_time(lambda: [hash(pc) for pc in pcs]):.3f} s")
+    print(f"compare 1M PitchClass pairs: {measure_time(lambda: [a == b for a, b in zip(pcs, others)]):.3f} s")
+    print(f"set of 1M PitchClasses: {measure_time(lambda: set(pcs)):.3f} s")
+    print(f"set of 1M Pitches: {measure_time(lambda: set(pitches)):.3f} s")
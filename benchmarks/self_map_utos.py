@@ -0,0 +1,58 @@
+"""
+File: self_map_utos.py
+Author: Jeff Martin
+Date: 10/18/2026
+Email: jmartin@jeffreymartincomposer.com
+This file measures get_self_map_utos() and get_complement_map_utos() over all 4096 chromatic pcsets,
+and the batch OperatorGroup.get_invariance() over the same pcsets and a sample of mod 24 pcsets.
+Usage: python benchmarks/self_map_utos.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pctheory import pcset, transformations
+from pctheory.group import OperatorGroup
+from pctheory.pitch import PitchClass
+import numpy as np
+
+RUNS = 3
+SAMPLE_SIZE24 = 100000
+
+
+def make_all_pcsets12() -> list:
+    """
+    Makes all 4096 chromatic pcsets, as sets of PitchClasses.
+    :return: A list of pcsets
+    """
+    return [{PitchClass(i, 12) for i in range(12) if bits >> i & 1} for bits in range(4096)]
+
+
+def measure(function, pcsets: list) -> float:
+    """
+    Measures the best time to apply a function to all pcsets.
+    :param function: The function
+    :param pcsets: The pcsets
+    :return: The time in seconds
+    """
+    best = float("inf")
+    for i in range(RUNS):
+        t = time.perf_counter()
+        for s in pcsets:
+            function(s)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+if __name__ == "__main__":
+    pcsets = make_all_pcsets12()
+    for function in [pcset.get_self_map_utos, pcset.get_complement_map_utos]:
+        print(f"{function.__name__}: {measure(function, pcsets):.3f} s for {len(pcsets)} pcsets")
+    group12 = OperatorGroup(transformations.get_uto_list(12), 12)
+    print(f"OperatorGroup.get_invariance: {measure(group12.get_invariance, [np.arange(4096)]):.3f} s for 4096 pcsets")
+    group24 = OperatorGroup(transformations.get_uto_list(24), 24)
+    sample24 = np.random.default_rng(0).integers(0, 1 << 24, SAMPLE_SIZE24).astype(np.uint32)
+    print(f"OperatorGroup.get_invariance: {measure(group24.get_invariance, [sample24]):.3f} s for {SAMPLE_SIZE24} mod 24 pcsets")
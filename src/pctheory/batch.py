@@ -0,0 +1,316 @@
+"""
+File: batch.py
+Author: Jeff Martin
+Date: 10/18/2026
+
+Copyright © 2026 by Jeffrey Martin. All rights reserved.
+Email: jmartin@jeffreymartincomposer.com
+Website: https://jeffreymartincomposer.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+This module applies pcset operations to many pcsets at once. Pcsets are stored
+as bitmasks in NumPy arrays (bit i is set if pitch-class i is in the pcset, as in
+pcset.PcSetN). Every function accepts either an N-vector of bitmasks or an (N, k)
+integer array of pitch-classes (negative entries are treated as padding), and
+returns NumPy arrays.
+"""
+
+from pctheory.pcset import PcSetN, SetClass, SetClassTable12
+from pctheory.transformations import UTO
+import numpy as np
+
+
+_permutation_tables = {}
+_prime_tables12 = {}
+
+
+def cardinality(pcsets, mod: int=12) -> np.ndarray:
+    """
+    Gets the cardinalities of pcsets.
+    :param pcsets: An N-vector of bitmasks or an (N, k) array of pitch-classes
+    :param mod: The pitch-class modulo
+    :return: The cardinalities
+    *Compatible with all PitchClass modulos up to 64
+    """
+    return _popcount(to_bits(pcsets, mod))
+
+
+def complement(pcsets, mod: int=12) -> np.ndarray:
+    """
+    Gets the complements of pcsets.
+    :param pcsets: An N-vector of bitmasks or an (N, k) array of pitch-classes
+    :param mod: The pitch-class modulo
+    :return: The complements, as bitmasks
+    *Compatible with all PitchClass modulos up to 64
+    """
+    bits = to_bits(pcsets, mod)
+    return bits ^ _full_mask(mod)
+
+
+def ic_vector(pcsets, mod: int=12, long: bool=False) -> np.ndarray:
+    """
+    Gets the IC vectors of pcsets.
+    :param pcsets: An N-vector of bitmasks or an (N, k) array of pitch-classes
+    :param mod: The pitch-class modulo
+    :param long: Whether or not to use the long format (with the cardinality in the first column)
+    :return: An (N, mod // 2) array of IC vectors, or an (N, mod // 2 + 1) array in long format
+    *Compatible with all PitchClass modulos up to 64
+    """
+    bits = to_bits(pcsets, mod)
+    vectors = np.empty((bits.shape[0], mod // 2 + 1), dtype=np.int64)
+    vectors[:, 0] = _popcount(bits)
+    for i in range(1, mod // 2 + 1):
+        vectors[:, i] = _popcount(bits & _rotate(bits, i, mod))
+        if i * 2 == mod:
+            vectors[:, i] //= 2
+    return vectors if long else vectors[:, 1:]
+
+
+def invert(pcsets, mod: int=12) -> np.ndarray:
+    """
+    Inverts pcsets.
+    :param pcsets: An N-vector of bitmasks or an (N, k) array of pitch-classes
+    :param mod: The pitch-class modulo
+    :return: The inverted pcsets, as bitmasks
+    *Compatible with all PitchClass modulos up to 64
+    """
+    return _permute(to_bits(pcsets, mod), tuple((-i) % mod for i in range(mod)), mod)
+
+
+def multiply(pcsets, n: int, mod: int=12) -> np.ndarray:
+    """
+    Multiplies pcsets.
+    :param pcsets: An N-vector of bitmasks or an (N, k) array of pitch-classes
+    :param n: The multiplier
+    :param mod: The pitch-class modulo
+    :return: The multiplied pcsets, as bitmasks
+    *Compatible with all PitchClass modulos up to 64
+    """
+    return _permute(to_bits(pcsets, mod), tuple((i * n) % mod for i in range(mod)), mod)
+
+
+def prime_form(pcsets, mod: int=12, weight_right: bool=True) -> np.ndarray:
+    """
+    Gets the prime forms of pcsets.
+    :param pcsets: An N-vector of bitmasks or an (N, k) array of pitch-classes
+    :param mod: The pitch-class modulo
+    :param weight_right: Whether or not to weight from the right
+    :return: The prime forms, as bitmasks
+    *Compatible with all PitchClass modulos up to 64
+    """
+    bits = to_bits(pcsets, mod)
+    if mod == 12:
+        if weight_right not in _prime_tables12:
+            table = SetClassTable12.get()
+            _prime_tables12[weight_right] = table.get_prime_bits(weight_right)[table.class_ids]
+        return _prime_tables12[weight_right][bits]
+    elif weight_right:
+        # Packing from the right gives the smallest bitmask of all the T and TI images
+        inverted = invert(bits, mod)
+        prime = bits.copy()
+        for i in range(1, mod):
+            np.minimum(prime, _rotate(bits, i, mod), out=prime)
+        for i in range(mod):
+            np.minimum(prime, _rotate(inverted, i, mod), out=prime)
+        return prime
+    else:
+        # Packing from the left has no bitwise shortcut, so each distinct pcset is computed once
+        unique, inverse = np.unique(bits, return_inverse=True)
+        primes = np.array([PcSetN(SetClass.calculate_prime_form(PcSetN.from_bits(int(b), mod).to_set(), False, mod), mod).bits
+                           for b in unique], dtype=bits.dtype)
+        return primes[inverse.reshape(bits.shape)]
+
+
+def to_bits(pcsets, mod: int=12) -> np.ndarray:
+    """
+    Converts pcsets to an array of bitmasks.
+    :param pcsets: An N-vector of bitmasks, an (N, k) array of pitch-classes (negative entries are treated
+    as padding), or a list of pcsets (sets of PitchClasses or PcSetNs)
+    :param mod: The pitch-class modulo
+    :return: An N-vector of bitmasks
+    *Compatible with all PitchClass modulos up to 64
+    """
+    dtype = _bits_dtype(mod)
+    if not isinstance(pcsets, np.ndarray):
+        if len(pcsets) > 0 and isinstance(next(iter(pcsets)), (set, frozenset, PcSetN)):
+            return np.array([_pcset_bits(pcset, mod) for pcset in pcsets], dtype=dtype)
+        pcsets = np.asarray(pcsets)
+    if pcsets.ndim == 1:
+        if pcsets.size > 0 and ((pcsets.dtype.kind == "i" and pcsets.min() < 0) or (mod < 64 and pcsets.max() >> mod)):
+            raise ValueError(f"The bitmasks are out of range for modulo {mod}.")
+        return pcsets.astype(dtype)
+    elif pcsets.ndim == 2:
+        pcsets = pcsets.astype(np.int64, copy=False)
+        masks = np.where(pcsets >= 0, np.uint64(1) << (pcsets % mod).astype(np.uint64), np.uint64(0))
+        return np.bitwise_or.reduce(masks, axis=1).astype(dtype)
+    else:
+        raise ValueError("Pcsets must be an N-vector of bitmasks or an (N, k) array of pitch-classes.")
+
+
+def to_pcsets(bits, mod: int=12) -> list:
+    """
+    Converts an array of bitmasks to a list of pcsets.
+    :param bits: An N-vector of bitmasks
+    :param mod: The pitch-class modulo
+    :return: A list of PcSetNs (PcSet12s for modulo 12)
+    *Compatible with all PitchClass modulos up to 64
+    """
+    return [PcSetN.from_bits(int(b), mod) for b in np.asarray(bits).ravel()]
+
+
+def transform(pcsets, uto: UTO, mod: int=12) -> np.ndarray:
+    """
+    Transforms pcsets by a UTO.
+    :param pcsets: An N-vector of bitmasks or an (N, k) array of pitch-classes
+    :param uto: The UTO
+    :param mod: The pitch-class modulo
+    :return: The transformed pcsets, as bitmasks
+    *Compatible with all PitchClass modulos up to 64
+    """
+    return _permute(to_bits(pcsets, mod), tuple((i * uto.M + uto.T) % mod for i in range(mod)), mod)
+
+
+def transform_all(pcsets, utos: list, mod: int=12) -> np.ndarray:
+    """
+    Transforms pcsets by each of several UTOs, for example to get all T/I images of a corpus.
+    :param pcsets: An N-vector of bitmasks or an (N, k) array of pitch-classes
+    :param utos: A list of UTOs
+    :param mod: The pitch-class modulo
+    :return: A (len(utos), N) array of bitmasks. Row i holds the images under utos[i].
+    *Compatible with all PitchClass modulos up to 64
+    """
+    bits = to_bits(pcsets, mod)
+    images = np.empty((len(utos), bits.shape[0]), dtype=bits.dtype)
+    for i, uto in enumerate(utos):
+        images[i] = transform(bits, uto, mod)
+    return images
+
+
+def transpose(pcsets, n, mod: int=12) -> np.ndarray:
+    """
+    Transposes pcsets.
+    :param pcsets: An N-vector of bitmasks or an (N, k) array of pitch-classes
+    :param n: The index of transposition, or an N-vector of indices of transposition
+    :param mod: The pitch-class modulo
+    :return: The transposed pcsets, as bitmasks
+    *Compatible with all PitchClass modulos up to 64
+    """
+    return _rotate(to_bits(pcsets, mod), n, mod)
+
+
+def _bits_dtype(mod: int):
+    """
+    Gets the smallest unsigned integer type that can hold a bitmask for a modulo.
+    :param mod: The pitch-class modulo
+    :return: The NumPy dtype
+    """
+    if type(mod) != int:
+        raise TypeError("The pitch class modulo must be an integer.")
+    elif mod <= 0 or mod > 64:
+        raise ValueError("Batch operations support pitch-class modulos from 1 to 64.")
+    elif mod <= 8:
+        return np.uint8
+    elif mod <= 16:
+        return np.uint16
+    elif mod <= 32:
+        return np.uint32
+    else:
+        return np.uint64
+
+
+def _full_mask(mod: int):
+    """
+    Gets the bitmask of the aggregate.
+    :param mod: The pitch-class modulo
+    :return: The bitmask, as a NumPy scalar
+    """
+    return _bits_dtype(mod)((1 << mod) - 1)
+
+
+def _pcset_bits(pcset, mod: int) -> int:
+    """
+    Gets the bitmask of a single pcset.
+    :param pcset: A set of PitchClasses or a PcSetN
+    :param mod: The pitch-class modulo
+    :return: The bitmask
+    """
+    if isinstance(pcset, PcSetN):
+        if pcset.mod != mod:
+            raise ArithmeticError(f"Cannot use a pcset with modulo {pcset.mod} in a batch with modulo {mod}.")
+        return pcset.bits
+    return PcSetN(pcset, mod).bits
+
+
+def _permute(bits: np.ndarray, permutation: tuple, mod: int) -> np.ndarray:
+    """
+    Moves bit i of each bitmask to bit permutation[i].
+    :param bits: An N-vector of bitmasks
+    :param permutation: The permutation of pitch-classes
+    :param mod: The pitch-class modulo
+    :return: The permuted bitmasks
+    """
+    if mod <= 16:
+        # Small modulos use a lookup table with one entry for every possible pcset
+        if permutation not in _permutation_tables:
+            _permutation_tables[permutation] = _permute_slow(np.arange(1 << mod, dtype=bits.dtype), permutation)
+        return _permutation_tables[permutation][bits]
+    else:
+        return _permute_slow(bits, permutation)
+
+
+def _permute_slow(bits: np.ndarray, permutation: tuple) -> np.ndarray:
+    """
+    Moves bit i of each bitmask to bit permutation[i], one bit at a time.
+    :param bits: An N-vector of bitmasks
+    :param permutation: The permutation of pitch-classes
+    :return: The permuted bitmasks
+    """
+    permuted = np.zeros_like(bits)
+    one = bits.dtype.type(1)
+    for i, j in enumerate(permutation):
+        permuted |= ((bits >> bits.dtype.type(i)) & one) << bits.dtype.type(j)
+    return permuted
+
+
+def _popcount(bits: np.ndarray) -> np.ndarray:
+    """
+    Counts the bits set in each bitmask.
+    :param bits: An N-vector of bitmasks
+    :return: The counts
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits).astype(np.int64)
+    counts = np.zeros(bits.shape, dtype=np.int64)
+    bits = bits.astype(np.uint64)
+    while np.any(bits):
+        counts += (bits & np.uint64(1)).astype(np.int64)
+        bits = bits >> np.uint64(1)
+    return counts
+
+
+def _rotate(bits: np.ndarray, n, mod: int) -> np.ndarray:
+    """
+    Rotates bitmasks (transposes them).
+    :param bits: An N-vector of bitmasks
+    :param n: The index of transposition, or an N-vector of indices of transposition
+    :param mod: The pitch-class modulo
+    :return: The rotated bitmasks
+    """
+    dtype = bits.dtype
+    n = (np.asarray(n, dtype=np.int64) % mod).astype(np.uint64)
+    wide = bits.astype(np.uint64)
+    # Shifting a uint64 by 64 is undefined, so the right shift is split into two steps
+    rotated = (wide << n) | ((wide >> (np.uint64(mod) - n - np.uint64(1))) >> np.uint64(1))
+    return (rotated & np.uint64((1 << mod) - 1)).astype(dtype)
@@ -22,14 +22,18 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from queue import Queue
-from pctheory import transformations
+from pctheory import batch, transformations
 from pctheory.transformations import UTO
 from pctheory.pitch import PitchClass
+import numpy as np
+
+# The number of pcsets whose images are held in memory at once by OperatorGroup.get_invariance()
+_CHUNK_SIZE = 1 << 16
 
 
 class OperatorGroup:
     """
-    Represents a group of operators. Only compatible with mod 12 and mod 24 systems.
+    Represents a group of operators. Compatible with all PitchClass modulos.
     """
     def __init__(self, utos: list = None, mod: int = 12):
         """
@@ -37,14 +41,11 @@ class OperatorGroup:
         :param utos: UTOs
         :param mod: The number of pcs in the system of the group (chromatic: 12, microtonal: 24)
         """
-        self._MNUM_12 = {1, 5, 7, 11}
-        self._MNUM_24 = {1, 5, 7, 11, 13, 17, 19, 23}
+        self._multipliers = sorted({uto.M for uto in transformations.get_uto_list(mod)})
         self._name = ""
         self._num_pcs = mod
-        if mod == 12:
-            self._operators = [[] for i in range(len(self._MNUM_12))]
-        elif mod == 24:
-            self._operators = [[] for i in range(len(self._MNUM_24))]
+        self._operators = [[] for i in range(len(self._multipliers))]
+        self._operator_list = ()
         self._utos = set()
         if utos is not None:
             self.load_utos(utos)
@@ -55,6 +56,9 @@ class OperatorGroup:
     def __iter__(self):
         return (uto for uto in self._utos)
 
+    def __len__(self):
+        return len(self._utos)
+
     def __list__(self):
         uto_list = list(self._utos)
         return uto_list
@@ -71,38 +75,23 @@ class OperatorGroup:
         Gets the group name.
         :return: The group name
         """
-        group_name = "G"
-        if self._num_pcs == 12:
-            for i in range(len(self._MNUM_12) - 1):
-                if len(self._operators[i]) == 12:
-                    group_name += "*"
-                else:
-                    for uto in self._operators[i]:
-                        group_name += str(uto[0])
-                group_name += "/"
-            if len(self._operators[len(self._MNUM_12) - 1]) == 12:
-                group_name += "*"
-            else:
-                for uto in self._operators[len(self._MNUM_12) - 1]:
-                    group_name += str(uto[0])
-        else:
-            for i in range(len(self._MNUM_24) - 1):
-                if len(self._operators[i]) == 24:
-                    group_name += "*"
-                else:
-                    for j in range(len(self._operators[i]) - 1):
-                        group_name += f"{self._operators[i][j][0]},"
-                    if len(self._operators[i]) > 0:
-                        group_name += str(self._operators[i][len(self._operators[i]) - 1][0])
-                group_name += "/"
-            if len(self._operators[len(self._MNUM_24) - 1]) == 24:
-                group_name += "*"
+        separator = "" if self._num_pcs == 12 else ","
+        names = []
+        for operators in self._operators:
+            if len(operators) == self._num_pcs:
+                names.append("*")
             else:
-                for j in range(len(self._operators[len(self._MNUM_24) - 1]) - 1):
-                    group_name += f"{self._operators[len(self._MNUM_24) - 1][j][0]},"
-                if len(self._operators[len(self._MNUM_24) - 1]) > 0:
-                    group_name += str(self._operators[len(self._MNUM_24) - 1][len(self._operators[len(self._MNUM_24) - 1]) - 1][0])
-        return group_name
+                names.append(separator.join(str(uto.T) for uto in operators))
+        return "G" + "/".join(names)
+
+    @property
+    def operators(self) -> tuple:
+        """
+        The UTOs in the group, ordered by multiplier and then by index of transposition.
+        This is the column order of the arrays returned by get_invariance().
+        :return: A tuple of UTOs
+        """
+        return self._operator_list
 
     @property
     def utos(self) -> set:
@@ -112,17 +101,59 @@ class OperatorGroup:
         """
         return self._utos
 
+    def get_complement_map_utos(self, pcsets) -> list:
+        """
+        Gets the UTOs in the group that map each of many pcsets into its complement.
+        :param pcsets: An N-vector of bitmasks, an (N, k) array of pitch-classes, or a list of pcsets
+        :return: A list of N sets of UTOs
+        *Compatible with all PitchClass modulos up to 64
+        """
+        return self._get_uto_sets(self.get_invariance(pcsets)[1])
+
+    def get_invariance(self, pcsets) -> tuple:
+        """
+        Computes the stabilizer, the complement-mapping UTOs, and the orbit size of many pcsets in one pass.
+        Each multiplication is performed once per pcset, and the transpositions are bit rotations.
+        :param pcsets: An N-vector of bitmasks, an (N, k) array of pitch-classes, or a list of pcsets
+        :return: A tuple (stabilizers, complement_maps, orbit_sizes). stabilizers and complement_maps are (N, len(group))
+        boolean arrays whose columns follow the operators property: stabilizers[i, j] is True if operators[j] maps
+        pcset i into itself, and complement_maps[i, j] is True if operators[j] maps pcset i into its complement.
+        orbit_sizes is an N-vector holding the number of distinct images of each pcset under the group.
+        *Compatible with all PitchClass modulos up to 64
+        """
+        bits = batch.to_bits(pcsets, self._num_pcs)
+        num_sets = bits.shape[0]
+        num_operators = len(self._operator_list)
+        stabilizers = np.empty((num_sets, num_operators), dtype=bool)
+        complement_maps = np.empty((num_sets, num_operators), dtype=bool)
+        orbit_sizes = np.zeros(num_sets, dtype=np.int64)
+        for start in range(0, num_sets, _CHUNK_SIZE):
+            chunk = bits[start:start + _CHUNK_SIZE]
+            stop = start + chunk.shape[0]
+            images = self._get_images(chunk)
+            stabilizers[start:stop] = (images == chunk).T
+            complement_maps[start:stop] = ((images & chunk) == 0).T
+            if num_operators > 0:
+                images.sort(axis=0)
+                orbit_sizes[start:stop] = 1 + np.count_nonzero(images[1:] != images[:-1], axis=0)
+        return stabilizers, complement_maps, orbit_sizes
+
+    def get_orbit_sizes(self, pcsets) -> np.ndarray:
+        """
+        Gets the number of distinct images of each of many pcsets under the group.
+        :param pcsets: An N-vector of bitmasks, an (N, k) array of pitch-classes, or a list of pcsets
+        :return: An N-vector of orbit sizes
+        *Compatible with all PitchClass modulos up to 64
+        """
+        return self.get_invariance(pcsets)[2]
+
     def get_orbits(self) -> list:
         """
         Gets the orbits of the group.
         :return: The orbits, as a list of sets
         """
         orbits = []
-        u = None
-        if self._num_pcs == 12:
-            u = {PitchClass(i, 12) for i in range(self._num_pcs)}
-        elif self._num_pcs == 24:
-            u = {PitchClass(i, 24) for i in range(self._num_pcs)}
+        u = {PitchClass(i, self._num_pcs) for i in range(self._num_pcs)}
         while len(u) > 0:
             orbit = set()
             q = Queue()
@@ -142,6 +173,15 @@ class OperatorGroup:
 
         return orbits
 
+    def get_stabilizers(self, pcsets) -> list:
+        """
+        Gets the UTOs in the group that map each of many pcsets into itself.
+        :param pcsets: An N-vector of bitmasks, an (N, k) array of pitch-classes, or a list of pcsets
+        :return: A list of N sets of UTOs
+        *Compatible with all PitchClass modulos up to 64
+        """
+        return self._get_uto_sets(self.get_invariance(pcsets)[0])
+
     def left_coset(self, uto) -> list:
         """
         Gets a left coset of the group.
@@ -150,7 +190,7 @@ class OperatorGroup:
         """
         coset = []
         for u in self._utos:
-            coset.append(transformations.left_multiply_utos(uto, u))
+            coset.append(transformations.left_multiply_utos(uto, u, mod=self._num_pcs))
         coset.sort()
         return coset
 
@@ -159,28 +199,17 @@ class OperatorGroup:
         Loads UTOs into the group.
         :param utos: UTOs
         """
+        self._operators = [[] for i in range(len(self._multipliers))]
         self._utos = set()
         for uto in utos:
-            match uto[1]:
-                case 1:
-                    self._operators[0].append(uto)
-                case 5:
-                    self._operators[1].append(uto)
-                case 7:
-                    self._operators[2].append(uto)
-                case 11:
-                    self._operators[3].append(uto)
-                case 13:
-                    self._operators[4].append(uto)
-                case 17:
-                    self._operators[5].append(uto)
-                case 19:
-                    self._operators[6].append(uto)
-                case 23:
-                    self._operators[7].append(uto)
-            self._utos.add(uto)
+            if uto.M % self._num_pcs not in self._multipliers:
+                raise ValueError(f"The UTO {uto} is not invertible in modulo {self._num_pcs}.")
+            if uto not in self._utos:
+                self._operators[self._multipliers.index(uto.M % self._num_pcs)].append(uto)
+                self._utos.add(uto)
         for li in self._operators:
             li.sort()
+        self._operator_list = tuple(uto for li in self._operators for uto in li)
 
     def right_coset(self, uto: UTO) -> list:
         """
@@ -190,6 +219,30 @@ class OperatorGroup:
         """
         coset = []
         for u in self._utos:
-            coset.append(transformations.left_multiply_utos(u, uto))
+            coset.append(transformations.left_multiply_utos(u, uto, mod=self._num_pcs))
         coset.sort()
         return coset
+
+    def _get_images(self, bits: np.ndarray) -> np.ndarray:
+        """
+        Transforms bitmasks by every operator in the group.
+        :param bits: An N-vector of bitmasks
+        :return: A (len(group), N) array of bitmasks, with rows in the order of the operators property
+        """
+        images = np.empty((len(self._operator_list), bits.shape[0]), dtype=bits.dtype)
+        row = 0
+        for m, operators in zip(self._multipliers, self._operators):
+            if len(operators) > 0:
+                multiplied = batch.multiply(bits, m, self._num_pcs)
+                for uto in operators:
+                    images[row] = batch.transpose(multiplied, uto.T, self._num_pcs)
+                    row += 1
+        return images
+
+    def _get_uto_sets(self, mask: np.ndarray) -> list:
+        """
+        Converts a boolean operator mask to sets of UTOs.
+        :param mask: An (N, len(group)) boolean array
+        :return: A list of N sets of UTOs
+        """
+        return [{self._operator_list[j] for j in np.flatnonzero(row)} for row in mask]
@@ -21,15 +21,22 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from pctheory import pcset, tables, transformations
+from pctheory import batch, pcset, tables, transformations
 from pctheory.transformations import OTO
 from pctheory.pitch import PitchClass
+import bisect
+import itertools
+import multiprocessing
+import numpy as np
 import random
 import re
 
 _rng = random.Random()
 _rng.seed()
 
+# Lookup tables from the bitmask of each n-note pcset to a dense n-class index, by (n, mod)
+_imb_lookups = {}
+
 
 def adjacent_search(pcseg: list, corpus: list) -> list:
     """
@@ -39,10 +46,11 @@ def adjacent_search(pcseg: list, corpus: list) -> list:
     :return: A sublist of pcsegs from the corpus that have pcseg in them. If an entry in the original corpus contains pcseg more than once,
     it will only be included once in this sublist.
     If no entries have pcseg in them, returns an empty list.
+    *Compatible with all PitchClass modulos. To search the same corpus many times, use a SegmentIndex.
     """
     new_corpus = []
     for entry in corpus:
-        for i in range(0, len(entry) - len(pcseg)):
+        for i in range(0, len(entry) - len(pcseg) + 1):
             found = True
             for j in range(0, len(pcseg)):
                 if pcseg[j] != entry[i+j]:
@@ -114,20 +122,35 @@ def are_combinatorial4(row1: list, row2: list, row3: list, row4: list) -> bool:
         return False
 
 
-def bip_n(imb: list) -> list:
+def bip_n(imb, mod: int = 12) -> list:
     """
     Gets the BIP_n of a list of set-classes generated by IMB_n.
-    :param imb: The IMB_n list
-    :return: The BIP_n
+    :param imb: The IMB_n list, either as SetClasses or as class ids from imb_n_ids(). An (N, k) array of
+    class ids is treated as N separate IMB_n lists.
+    :param mod: The modulo of the set-classes. BIP_n uses Forte numbers, so only mod 12 is supported.
+    :return: The BIP_n (for an array of class ids, an array of the same shape)
+    :raises ValueError: If the set-classes are not chromatic, or if an id is not a SetClassTable12 class id
     *Compatible only with chromatic pcsegs
     """
+    if mod != 12:
+        raise ValueError(f"BIP_n is only defined for chromatic set-classes, not for mod {mod}.")
+    if isinstance(imb, np.ndarray) or (len(imb) > 0 and isinstance(imb[0], (int, np.integer))):
+        nums_forte = pcset.SetClassTable12.get().nums_forte
+        ids = np.asarray(imb, dtype=np.int64)
+        if ids.size > 0 and (ids.min() < 0 or ids.max() >= len(nums_forte)):
+            raise ValueError("The ids are not SetClassTable12 class ids. For modulos other than 12, imb_n_ids() "
+                             "returns prime-form bitmasks, which have no BIP_n.")
+        if isinstance(imb, np.ndarray):
+            return np.sort(nums_forte[ids], axis=-1)
+        return sorted(nums_forte[ids].tolist())
     bip = []
-    if len(imb) > 0:
-        for sc in imb:
-            name = sc.name_forte.split('-')[1]
-            name = name.replace("Z", "")
-            bip.append(int(name))
-        bip.sort()
+    for sc in imb:
+        if sc.mod != 12:
+            raise ValueError(f"BIP_n is only defined for chromatic set-classes, not for mod {sc.mod}.")
+        name = sc.name_forte.split('-')[1]
+        name = name.replace("Z", "")
+        bip.append(int(name))
+    bip.sort()
     return bip
 
 
@@ -145,6 +168,86 @@ def create_ormap(pcseg: list) -> dict:
     return omap
 
 
+def create_row_table(name: str, path=None, processes: int = 1) -> bytes:
+    """
+    Regenerates one of the row tables in pctheory.data from scratch, in the packed row table format
+    (see tables.pack_rows()). Each table holds the rows (or, for "eleven_interval", the interval successions)
+    that start on pitch-class 0, keeping only the lesser of each row and its inversion, in ascending order.
+    :param name: The name of the table ("all_trichord", "all_trichord_babbitt", "eleven_interval", or "ten_trichord")
+    :param path: If provided, the table is also written to this file
+    :param processes: The number of worker processes to search with
+    :return: The packed table
+    *Compatible only with chromatic pcsegs
+    """
+    if name == "all_trichord":
+        rows = _get_imb_n_successions(3, 12, True, 0, False, processes)
+    elif name == "all_trichord_babbitt":
+        lookup = _get_imb_lookup(3, 12)
+        rows = _get_imb_n_successions(3, 12, False, 1 << lookup[0b1001001] | 1 << lookup[0b100010001], False, processes)
+    elif name == "eleven_interval":
+        rows = (intervals for intervals in _get_all_interval_successions(12, False, processes)
+                if intervals <= tuple(-interval % 12 for interval in intervals))
+    elif name == "ten_trichord":
+        rows = _get_imb_n_successions(3, 12, False, 0, False, processes)
+    else:
+        raise ValueError(f"Invalid row table name {name!r}.")
+    packed = tables.pack_rows(list(rows))
+    if path is not None:
+        with open(path, "wb") as table_file:
+            table_file.write(packed)
+    return packed
+
+
+def enumerate_all_interval_rows(mod: int = 12, row_classes: bool = True, processes: int = 1):
+    """
+    Enumerates all-interval rows by backtracking over the unused pitch-classes and intervals (stored as bitmasks).
+    Every all-interval row ends a tritone (mod / 2) from where it began, so no partial row visits the tritone
+    early. When only one row per row-class is wanted, the I symmetry is broken by the first interval, and the
+    R and RI symmetries are broken by keeping only rows whose interval succession is the least among its images.
+    :param mod: The number of pcs in the system (any even modulo)
+    :param row_classes: Whether to generate one row per row-class (under T, I, R, and RI) instead of every
+    all-interval row that starts on pitch-class 0
+    :param processes: The number of worker processes. If more than 1, subtrees are searched in a process pool
+    and results are streamed in the same order as a serial search. (On platforms that spawn new processes,
+    call this from within an ``if __name__ == "__main__":`` block.)
+    :return: A generator of all-interval rows, starting on pitch-class 0, in lexicographic order of their intervals
+    *Compatible with all even PitchClass modulos
+    """
+    for intervals in _get_all_interval_successions(mod, row_classes, processes):
+        yield _make_row_from_intervals(intervals, mod)
+
+
+def enumerate_imb_n_rows(n: int = 3, mod: int = 12, cyclic: bool = False, excluded: list = None,
+                         include_inversions: bool = False, processes: int = 1):
+    """
+    Enumerates rows whose IMB_n has no repeated set-classes, by backtracking. Each imbricated n-class is
+    read from a lookup table indexed by bitmask, and the n-classes used so far are kept in a bitset, so a
+    partial row is abandoned as soon as it repeats an n-class or uses an excluded one. Ten-trichord rows
+    are enumerate_imb_n_rows(3), all-trichord rows are enumerate_imb_n_rows(3, cyclic=True), and all-trichord
+    (Babbitt) rows are enumerate_imb_n_rows(3, excluded=[SetClass("[036]"), SetClass("[048]")]).
+    :param n: The cardinality of imbrication
+    :param mod: The number of pcs in the system
+    :param cyclic: Whether the row is read cyclically, so that the imbrications wrap around from the end
+    to the beginning
+    :param excluded: A list of n-note SetClasses that may not appear in the IMB_n
+    :param include_inversions: Whether to generate both a row and its inversion, instead of only the lesser
+    of the two (as in the row tables)
+    :param processes: The number of worker processes. If more than 1, subtrees are searched in a process pool
+    and results are streamed in the same order as a serial search. (On platforms that spawn new processes,
+    call this from within an ``if __name__ == "__main__":`` block.)
+    :return: A generator of rows, starting on pitch-class 0, in ascending order
+    *Compatible with all PitchClass modulos up to 64
+    """
+    lookup = _get_imb_lookup(n, mod)
+    excluded_classes = 0
+    for sc in excluded if excluded is not None else []:
+        if len(sc) != n or sc.mod != mod:
+            raise ValueError("Excluded set-classes must have n pcs and the same PitchClass modulo as the row.")
+        excluded_classes |= 1 << lookup[sum(1 << pc.pc for pc in sc.pcset)]
+    for row in _get_imb_n_successions(n, mod, cyclic, excluded_classes, include_inversions, processes):
+        yield [PitchClass(pc, mod) for pc in row]
+
+
 def generate_pcseg12_from_interval_list(interval_list: list, starting_pc=None) -> list:
     """
     Generates a pcseg from an interval list.
@@ -192,7 +295,7 @@ def generate_random_all_interval_row(starting_pc=None) -> list:
     :return: An all-interval row
     *Compatible only with chromatic pcsegs
     """
-    name_tables = tables.create_tables_eleven_interval()
+    generators = tables.get_row_table_eleven_interval()
     row = []
 
     # Establish the starting pitch of the row
@@ -203,8 +306,7 @@ def generate_random_all_interval_row(starting_pc=None) -> list:
             row.append(PitchClass(starting_pc, 12))
     else:
         row.append(PitchClass(_rng.randrange(12), 12))
-    generator = name_tables["elevenIntervalRowGenerators"][_rng.randrange(
-        len(name_tables["elevenIntervalRowGenerators"]))]
+    generator = generators[_rng.randrange(len(generators))]
 
     # Randomly choose to invert the row generator
     if _rng.randrange(1) == 1:
@@ -223,14 +325,13 @@ def generate_random_all_trichord_row(starting_pc=None) -> list:
     :return: An all-trichord row
     *Compatible only with chromatic pcsegs
     """
-    name_tables = tables.create_tables_all_trichord()
+    rows = tables.get_row_table_all_trichord()
     if starting_pc is not None:
         if type(starting_pc) == PitchClass:
             starting_pc = starting_pc.pc
     else:
         starting_pc = 0
-    row = [PitchClass(pc + starting_pc, 12) for pc in name_tables["allTrichordRows"][_rng.randrange(
-        len(name_tables["allTrichordRows"]))]]
+    row = [PitchClass(pc + starting_pc, 12) for pc in rows[_rng.randrange(len(rows))]]
 
     # Randomly choose to invert the row generator
     if _rng.randrange(1) == 1:
@@ -246,14 +347,13 @@ def generate_random_all_trichord_babbitt_row(starting_pc=None) -> list:
     :return: An all-trichord (Babbitt) row
     *Compatible only with chromatic pcsegs
     """
-    name_tables = tables.create_tables_all_trichord_babbitt()
+    rows = tables.get_row_table_all_trichord_babbitt()
     if starting_pc is not None:
         if type(starting_pc) == PitchClass:
             starting_pc = starting_pc.pc
     else:
         starting_pc = 0
-    row = [PitchClass(pc + starting_pc, 12) for pc in name_tables["allTrichordBabbittRows"][_rng.randrange(
-        len(name_tables["allTrichordBabbittRows"]))]]
+    row = [PitchClass(pc + starting_pc, 12) for pc in rows[_rng.randrange(len(rows))]]
 
     # Randomly choose to invert the row generator
     if _rng.randrange(1) == 1:
@@ -337,14 +437,13 @@ def generate_random_ten_trichord_row(starting_pc=None) -> list:
     :return: A ten-trichord row
     *Compatible only with chromatic pcsegs
     """
-    name_tables = tables.create_tables_ten_trichord()
+    rows = tables.get_row_table_ten_trichord()
     if starting_pc is not None:
         if type(starting_pc) == PitchClass:
             starting_pc = starting_pc.pc
     else:
         starting_pc = 0
-    row = [PitchClass(pc + starting_pc, 12) for pc in name_tables["tenTrichordRows"][_rng.randrange(
-        len(name_tables["tenTrichordRows"]))]]
+    row = [PitchClass(pc + starting_pc, 12) for pc in rows[_rng.randrange(len(rows))]]
 
     # Randomly choose to invert the row generator
     if _rng.randrange(1) == 1:
@@ -374,14 +473,10 @@ def get_row_class(row: list) -> list:
     *Compatible with PitchClasses mod 12 and 24
     """
     row_class1 = []
-    if len(row) == 12 and row[0].mod == 12:
-        ros = transformations.get_otos12()
-        mod = 12
-    elif len(row) == 24 and row[0].mod == 24:
-        ros = transformations.get_otos24()
-        mod = 24
-    else:
+    if len(row) not in (12, 24) or row[0].mod != len(row):
         return row_class1
+    mod = len(row)
+    ros = transformations.get_otos(mod)
 
     row_class = {}
     for t in ["", "I", "R", "RI"]:
@@ -416,21 +511,48 @@ def imb_n(pcseg: list, n: int) -> list:
     Gets the IMB_n of a pcseg. The IMB_n is the segment of imbricated set-classes of cardinality n.
     :param pcseg: The pcseg
     :param n: The cardinality of imbrication
-    :return: The IMB_n
+    :return: The IMB_n, as a list of interned SetClasses
     *Compatible with all PitchClass modulos
     """
-    imb = set()
     scs = []
     if len(pcseg) > 0 and n > 0:
         mod = pcseg[0].mod
-        for i in range(len(pcseg) + 1 - n):
-            for j in range(i, i + n):
-                imb.add(pcseg[j])
-            scs.append(pcset.SetClass(imb, mod))
-            imb.clear()
+        interned = {}
+        for window in _roll_imb_windows([pc.pc for pc in pcseg], n, mod):
+            if window not in interned:
+                interned[window] = pcset.SetClass.intern(pcset.PcSetN.from_bits(window, mod), mod)
+            scs.append(interned[window])
     return scs
 
 
+def imb_n_ids(pcsegs, n: int, mod: int = 12) -> np.ndarray:
+    """
+    Gets the IMB_n of one or many pcsegs as integer set-class ids, without building SetClasses. Every
+    window is held as a bitmask and classified with a prime-form lookup table, so this is suitable for
+    segmenting whole pieces. For mod 12, the result can be passed directly to bip_n().
+    :param pcsegs: A pcseg (a list of PitchClasses or pitch-class integers), a NumPy vector of pitch-class
+    integers, or an (N, k) NumPy array of N pcsegs of length k
+    :param n: The cardinality of imbrication
+    :param mod: The number of pcs in the system (a list of PitchClasses uses its own modulo)
+    :return: The set-class ids, as an array of length k - n + 1 (or of shape (N, k - n + 1)). For mod 12,
+    these are SetClassTable12 class ids; for other modulos, they are prime-form bitmasks (see batch.prime_form()).
+    :raises ValueError: If n is not positive
+    *Compatible with all PitchClass modulos up to 64
+    """
+    if n < 1:
+        raise ValueError("The cardinality of imbrication must be positive.")
+    if not isinstance(pcsegs, np.ndarray):
+        if len(pcsegs) > 0 and type(pcsegs[0]) == PitchClass:
+            mod = pcsegs[0].mod
+            pcsegs = [pc.pc for pc in pcsegs]
+        pcsegs = np.array(pcsegs, dtype=np.int64).reshape(-1)
+    windows = _get_imb_windows(pcsegs.astype(np.int64) % mod, n)
+    if mod == 12:
+        return pcset.SetClassTable12.get().class_ids[windows]
+    unique, inverse = np.unique(windows, return_inverse=True)
+    return batch.prime_form(unique, mod)[inverse.reshape(windows.shape)]
+
+
 def invert(pcseg: list) -> list:
     """
     Inverts a pcseg.
@@ -480,12 +602,7 @@ def is_all_trichord_row(pcseg: list) -> bool:
     """
     if not is_row(pcseg):
         return False
-    row1 = [pcseg[i % 12] for i in range(14)]
-    imb3 = imb_n(row1, 3)
-    if len(set(imb3)) == 12:
-        return True
-    else:
-        return False
+    return len(set(_get_imb_class_ids([pcseg[i % 12].pc for i in range(14)], 3, 12))) == 12
 
 
 def is_all_trichord_babbitt_row(pcseg: list) -> bool:
@@ -499,14 +616,9 @@ def is_all_trichord_babbitt_row(pcseg: list) -> bool:
     """
     if not is_row(pcseg):
         return False
-    imb3 = imb_n(pcseg, 3)
-    if len(set(imb3)) == 10:
-        for sc in imb3:
-            if sc.name_prime == "[036]" or sc.name_prime == "[048]":
-                return False
-        return True
-    else:
-        return False
+    lookup = _get_imb_lookup(3, 12)
+    imb3 = set(_get_imb_class_ids([pc.pc for pc in pcseg], 3, 12))
+    return len(imb3) == 10 and lookup[0b1001001] not in imb3 and lookup[0b100010001] not in imb3
 
 
 def is_link_chord(pcseg: list) -> bool:
@@ -567,11 +679,7 @@ def is_ten_trichord_row(pcseg: list) -> bool:
     """
     if not is_row(pcseg):
         return False
-    imb3 = imb_n(pcseg, 3)
-    if len(set(imb3)) == 10:
-        return True
-    else:
-        return False
+    return len(set(_get_imb_class_ids([pc.pc for pc in pcseg], 3, 12))) == 10
 
 
 def make12(*args) -> list:
@@ -800,7 +908,8 @@ class InvarianceMatrix:
     """
     Represents an invariance matrix. Compatible with all PitchClass modulos for T and I
     matrices, and compatible with mod 12 and mod 24 for various M matrices
-    (M5, M7 for mod 12; M5, M7, M11, M13, M17, M19 for mod 24)
+    (M5, M7 for mod 12; M5, M7, M11, M13, M17, M19 for mod 24). The matrix is stored as an
+    (n, m) NumPy array of pitch-class integers.
     """
     def __init__(self, a: list, c: list, mx_type="T"):
         """
@@ -812,6 +921,8 @@ class InvarianceMatrix:
         self._a = None
         self._b = None
         self._c = None
+        self._matrix = None
+        self._mod = 12
         self._mx_type = mx_type.upper()
         self._mx = None
         self.load_matrix(a, c)
@@ -823,37 +934,29 @@ class InvarianceMatrix:
         :param j: The column
         :return: The pc
         """
-        return self._mx[i][j]
+        return PitchClass(int(self._mx[i, j]), self._mod)
 
     def __repr__(self):
         """
         Gets a representation of the InvarianceMatrix object.
         :returns: A string representation of the InvarianceMatrix object
         """
-        return f"<pctheory.pcseg.InvarianceMatrix object at {id(self)}>: {self._mx}"
+        return f"<pctheory.pcseg.InvarianceMatrix object at {id(self)}>: {self.mx}"
 
     def __str__(self):
         """
         Converts the InvarianceMatrix object to string.
         :returns: A string conversion of the InvarianceMatrix object
         """
-        chars = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'A', 'B']
-        lines = "    "
-        for pc in self._a:
-            lines += chars[pc.pc] + " "
-        lines += "\n   "
-        for i in range(2 * len(self._a)):
-            lines += "-"
-        lines += "\n"
-        for i in range(len(self._mx) - 1):
-            lines += chars[self._b[i].pc] + " | "
-            for j in range(len(self._mx[i])):
-                lines += chars[self._mx[i][j].pc] + " "
-            lines += "\n"
-        lines += chars[self._b[len(self._mx) - 1].pc] + " | "
-        for j in range(len(self._mx[len(self._mx) - 1])):
-            lines += chars[self._mx[len(self._mx) - 1][j].pc] + " "
-        return lines
+        return self._format()
+
+    @property
+    def array(self) -> np.ndarray:
+        """
+        Gets the invariance matrix as a NumPy array of pitch-class integers.
+        :return: An (n, m) array, where n is the length of pcseg B and m is the length of pcseg A
+        """
+        return self._mx
 
     @property
     def mx(self) -> list:
@@ -861,7 +964,9 @@ class InvarianceMatrix:
         Gets the invariance matrix.
         :return: The invariance matrix
         """
-        return self._mx
+        if self._matrix is None and self._mx is not None:
+            self._matrix = [[PitchClass(pc, self._mod) for pc in row] for row in self._mx.tolist()]
+        return self._matrix
 
     @property
     def pcseg_a(self) -> list:
@@ -887,16 +992,23 @@ class InvarianceMatrix:
         """
         return self._c
 
+    def find_pcs(self, pcs) -> np.ndarray:
+        """
+        Finds the positions of pcs in the matrix.
+        :param pcs: A PitchClass, or a collection of PitchClasses
+        :return: A (k, 2) array of the (row, column) positions of the pcs, in row-major order
+        """
+        if type(pcs) == PitchClass:
+            pcs = [pcs]
+        return np.argwhere(np.isin(self._mx, [pc.pc for pc in pcs]))
+
     def get_column(self, j: int) -> list:
         """
         Gets a column of the matrix.
         :param j: The column index
         :return: The column
         """
-        c = []
-        for i in range(len(self._mx)):
-            c.append(self._mx[i][j])
-        return c
+        return [PitchClass(pc, self._mod) for pc in self._mx[:, j].tolist()]
 
     def get_row(self, i: int) -> list:
         """
@@ -904,7 +1016,7 @@ class InvarianceMatrix:
         :param i: The row index
         :return: The row
         """
-        return self._mx[i]
+        return [PitchClass(pc, self._mod) for pc in self._mx[i].tolist()]
 
     def load_matrix(self, a: list, c: list):
         """
@@ -914,53 +1026,22 @@ class InvarianceMatrix:
         :return: None
         """
         if len(a) > 0 and len(c) > 0:
-            ro = OTO()
-            if a[0].mod == 12:
-                INVERT = 11
-                if self._mx_type == "T":
-                    ro = OTO(0, False, (1 * INVERT) % 12)
-                elif self._mx_type == "M" or self._mx_type == "M5":
-                    ro = OTO(0, False, (5 * INVERT) % 12)
-                elif self._mx_type == "MI" or self._mx_type == "M7":
-                    ro = OTO(0, False, (7 * INVERT) % 12)
-                elif self._mx_type == "I" or self._mx_type == "M11":
-                    ro = OTO(0, False, (11 * INVERT) % 12)
-                b = ro(c)
-            elif a[0].mod == 24:
-                INVERT = 23
-                if self._mx_type == "T":
-                    ro = OTO(0, False, (1 * INVERT) % 24)
-                elif self._mx_type == "M5":
-                    ro = OTO(0, False, (5 * INVERT) % 24)
-                elif self._mx_type == "M7":
-                    ro = OTO(0, False, (7 * INVERT) % 24)
-                elif self._mx_type == "M11":
-                    ro = OTO(0, False, (11 * INVERT) % 24)
-                elif self._mx_type == "M13":
-                    ro = OTO(0, False, (13 * INVERT) % 24)
-                elif self._mx_type == "M17":
-                    ro = OTO(0, False, (17 * INVERT) % 24)
-                elif self._mx_type == "M19":
-                    ro = OTO(0, False, (19 * INVERT) % 24)
-                elif self._mx_type == "I" or self._mx_type == "M23":
-                    ro = OTO(0, False, (23 * INVERT) % 24)
-                b = ro(c)
+            mod = a[0].mod
+            if mod == 12:
+                factors = {"T": 1, "M": 5, "M5": 5, "MI": 7, "M7": 7, "I": 11, "M11": 11}
+            elif mod == 24:
+                factors = {"T": 1, "M5": 5, "M7": 7, "M11": 11, "M13": 13, "M17": 17, "M19": 19, "I": 23, "M23": 23}
             else:
-                if self._mx_type == "T":
-                    ro = OTO(0, False, 1 * (a[0].mod - 1) % a[0].mod)
-                elif self._mx_type == "I":
-                    ro = OTO(0, False, 11 * (a[0].mod - 1) % a[0].mod)
-                b = ro(c)
-
-            self._mx = []
-            for i in range(len(b)):
-                mxrow = []
-                for j in range(len(a)):
-                    mxrow.append(PitchClass(b[i].pc + a[j].pc, a[0].mod))
-                self._mx.append(mxrow)
+                factors = {"T": 1, "I": mod - 1}
+            # Pcseg B is pcseg C multiplied by the inverse of the matrix operator
+            multiplier = -factors[self._mx_type] % mod if self._mx_type in factors else 1
+            b = np.array([pc.pc for pc in c], dtype=np.int64) * multiplier % mod
+            self._mx = (b[:, None] + np.array([pc.pc for pc in a], dtype=np.int64)[None, :]) % mod
             self._a = a.copy()
-            self._b = b
+            self._b = [PitchClass(pc, mod) for pc in b.tolist()]
             self._c = c.copy()
+            self._matrix = None
+            self._mod = mod
 
     def print(self, include: list = None):
         """
@@ -968,55 +1049,154 @@ class InvarianceMatrix:
         :param include: The pcs to include (if None, all pcs will be printed)
         :returns: None
         """
+        print(self._format(include))
+
+    def _format(self, include: list = None) -> str:
+        """
+        Formats the invariance matrix as a string.
+        :param include: The pcs to include (if None, all pcs will be included)
+        :return: The formatted matrix
+        """
         chars = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'A', 'B']
-        lines = "    "
-        for pc in self._a:
-            lines += chars[pc.pc] + " "
-        lines += "\n   "
-        for i in range(2 * len(self._a)):
-            lines += "-"
-        lines += "\n"
         if include is None:
-            for i in range(len(self._mx) - 1):
-                lines += chars[self._b[i].pc] + " | "
-                for j in range(len(self._mx[i])):
-                    lines += chars[self._mx[i][j].pc] + " "
-                lines += "\n"
-            lines += chars[self._b[len(self._mx) - 1].pc] + " | "
-            for j in range(len(self._mx[len(self._mx) - 1])):
-                lines += chars[self._mx[len(self._mx) - 1][j].pc] + " "
+            shown = np.ones(self._mx.shape, dtype=bool)
         else:
-            for i in range(len(self._mx) - 1):
-                lines += chars[self._b[i].pc] + " | "
-                for j in range(len(self._mx[i])):
-                    if self._mx[i][j] in include:
-                        lines += chars[self._mx[i][j].pc] + " "
-                    else:
-                        lines += "  "
-                lines += "\n"
-            lines += chars[self._b[len(self._mx) - 1].pc] + " | "
-            for j in range(len(self._mx[len(self._mx) - 1])):
-                if self._mx[len(self._mx) - 1][j] in include:
-                    lines += chars[self._mx[len(self._mx) - 1][j].pc] + " "
-                else:
-                    lines += "  "
-        print(lines)
+            shown = np.isin(self._mx, [pc.pc for pc in include])
+        lines = ["    " + "".join(chars[pc.pc] + " " for pc in self._a), "   " + "-" * (2 * len(self._a))]
+        for i in range(len(self._mx)):
+            lines.append(chars[self._b[i].pc] + " | " + "".join(chars[pc] + " " if shown[i, j] else "  "
+                                                                for j, pc in enumerate(self._mx[i].tolist())))
+        return "\n".join(lines)
+
+
+class SegmentIndex:
+    """
+    Represents a suffix-array index of a corpus of pcsegs, for fast adjacent (ordered subsegment) searches.
+    The index can be invariant under transposition ("T") or under transposition and inversion ("TI"),
+    in which case it indexes the interval strings of the pcsegs. Compatible with all PitchClass modulos.
+    """
+    def __init__(self, corpus: list, invariance: str = None):
+        """
+        Creates a SegmentIndex.
+        :param corpus: A list of pcsegs with the same PitchClass modulo
+        :param invariance: None for literal searches, "T" for transposition-invariant searches,
+        or "TI" for transposition- and inversion-invariant searches
+        """
+        if invariance is not None and invariance.upper() not in {"T", "TI"}:
+            raise ValueError("The invariance must be None, \"T\", or \"TI\".")
+        self._corpus = list(corpus)
+        self._invariance = invariance.upper() if invariance is not None else None
+        self._mod = None
+        for entry in self._corpus:
+            if len(entry) > 0:
+                self._mod = entry[0].mod
+                break
+
+        # The text holds each encoded pcseg followed by a separator (0), so that no match crosses two entries.
+        text = []
+        starts = []
+        for entry in self._corpus:
+            starts.append(len(text))
+            text += self._encode(entry)
+            text.append(0)
+        self._lengths = np.array([len(entry) for entry in self._corpus], dtype=np.int64)
+        self._starts = np.array(starts, dtype=np.int64)
+        self._suffix_array = _make_suffix_array(np.array(text, dtype=np.int64))
+        self._text = text
+
+    def __len__(self):
+        return len(self._corpus)
+
+    @property
+    def corpus(self) -> list:
+        """
+        Gets the indexed corpus.
+        :return: The corpus
+        """
+        return self._corpus
+
+    @property
+    def invariance(self) -> str:
+        """
+        Gets the invariance of the index.
+        :return: None, "T", or "TI"
+        """
+        return self._invariance
+
+    def count(self, pcseg: list) -> int:
+        """
+        Counts the occurrences of a pcseg in the corpus.
+        :param pcseg: A pcseg to search for
+        :return: The number of occurrences
+        """
+        return len(self.find(pcseg))
+
+    def find(self, pcseg: list) -> list:
+        """
+        Finds all occurrences of a pcseg in the corpus. Each query takes O(m log n) time
+        for a pcseg of length m and a corpus with n pcs.
+        :param pcseg: A pcseg to search for
+        :return: A sorted list of (entry index, position) tuples, one for each occurrence
+        """
+        if len(pcseg) == 0:
+            raise ValueError("Cannot search for an empty pcseg.")
+        if self._mod is not None and any(pc.mod != self._mod for pc in pcseg):
+            raise ValueError("The pcseg must have the same PitchClass modulo as the corpus.")
+        if self._mod is None:
+            return []
+        if self._invariance is not None and len(pcseg) == 1:
+            # Every pc of every entry is a transposition of a single pc.
+            return [(i, j) for i in range(len(self._corpus)) for j in range(self._lengths[i])]
+
+        queries = [self._encode(pcseg)]
+        if self._invariance == "TI":
+            queries.append([(self._mod - interval + 1) % self._mod + 1 for interval in queries[0]])
+        positions = set()
+        for query in queries:
+            key = lambda i: self._text[i:i + len(query)]
+            low = bisect.bisect_left(self._suffix_array, query, key=key)
+            high = bisect.bisect_right(self._suffix_array, query, lo=low, key=key)
+            positions.update(self._suffix_array[low:high].tolist())
+        positions = np.array(sorted(positions), dtype=np.int64)
+        entries = np.searchsorted(self._starts, positions, side="right") - 1
+        return list(zip(entries.tolist(), (positions - self._starts[entries]).tolist()))
+
+    def search(self, pcseg: list) -> list:
+        """
+        Gets all pcsegs in the corpus that contain pcseg as an ordered sublist. This is an indexed
+        version of adjacent_search().
+        :param pcseg: A pcseg to search for
+        :return: A sublist of pcsegs from the corpus that have pcseg in them, in corpus order. If an entry
+        contains pcseg more than once, it will only be included once.
+        """
+        return [self._corpus[i] for i in sorted({i for i, position in self.find(pcseg)})]
+
+    def _encode(self, pcseg: list) -> list:
+        """
+        Encodes a pcseg as a list of positive integers. Literal indexes use the pc integers,
+        and invariant indexes use the intervals between adjacent pcs.
+        :param pcseg: A pcseg
+        :return: The encoded pcseg
+        """
+        if self._invariance is None:
+            return [pc.pc + 1 for pc in pcseg]
+        return [(pcseg[i + 1].pc - pcseg[i].pc) % self._mod + 1 for i in range(len(pcseg) - 1)]
 
 
 class TwelveToneMatrix:
     """
-    Represents a twelve-tone matrix. Compatible only with mod 12 PitchClasses.
+    Represents a twelve-tone matrix. Compatible only with mod 12 PitchClasses. The matrix is stored as an
+    (n, n) NumPy array of pitch-class integers, and the labels and PitchClass lists are made on request.
     """
     def __init__(self, row=None):
         """
         Creates a twelve-tone matrix.
         :param row: A row to import
         """
-        self._labels_left = []
-        self._labels_right = []
-        self._labels_top = []
-        self._labels_bottom = []
-        self._mx = []
+        self._forms = None
+        self._labels = None
+        self._matrix = None
+        self._mx = np.zeros((0, 0), dtype=np.int8)
         self._row = None
         if row is not None:
             self.import_row(row)
@@ -1028,55 +1208,52 @@ class TwelveToneMatrix:
         :param j: The column
         :return: The pc
         """
-        return self._mx[i][j]
+        return PitchClass(int(self._mx[i, j]), 12)
 
     def __repr__(self):
         """
         Generates a string representation of the TwelveToneMatrix that can be printed.
         :return: A string representation of the TwelveToneMatrix
         """
-        lines = "     "
-        for i in range(12):
-            lines += f"{self._labels_top[i]: <5} "
-        lines += "\n"
-        for i in range(12):
-            lines += f"{self._labels_left[i]: <4}"
-            for j in range(12):
-                lines += f"  {str(self._mx[i][j])}   "
-            lines += f"{self._labels_right[i]: >4}"
-            lines += "\n"
-        lines += "     "
-        for i in range(12):
-            lines += f"{self._labels_bottom[i]: <5} "
-        return lines
+        return self.__str__()
 
     def __str__(self):
         """
         Generates a string representation of the TwelveToneMatrix that can be printed.
         :return: A string representation of the TwelveToneMatrix
         """
+        labels_bottom, labels_left, labels_right, labels_top = self._get_labels()
+        matrix = self.matrix
         lines = "     "
-        for i in range(12):
-            lines += f"{self._labels_top[i]: <5} "
+        for i in range(len(matrix)):
+            lines += f"{labels_top[i]: <5} "
         lines += "\n"
-        for i in range(12):
-            lines += f"{self._labels_left[i]: <4}"
-            for j in range(12):
-                lines += f"  {str(self._mx[i][j])}   "
-            lines += f"{self._labels_right[i]: >4}"
+        for i in range(len(matrix)):
+            lines += f"{labels_left[i]: <4}"
+            for j in range(len(matrix)):
+                lines += f"  {str(matrix[i][j])}   "
+            lines += f"{labels_right[i]: >4}"
             lines += "\n"
         lines += "     "
-        for i in range(12):
-            lines += f"{self._labels_bottom[i]: <5} "
+        for i in range(len(matrix)):
+            lines += f"{labels_bottom[i]: <5} "
         return lines
 
+    @property
+    def array(self) -> np.ndarray:
+        """
+        Gets the matrix as a NumPy array of pitch-class integers.
+        :return: An (n, n) array. Row i is the form labeled labels_left[i], and column j is the form labeled labels_top[j].
+        """
+        return self._mx
+
     @property
     def labels_bottom(self) -> list:
         """
         Gets the bottom matrix labels.
         :return: The bottom matrix labels
         """
-        return self._labels_bottom
+        return self._get_labels()[0]
 
     @property
     def labels_left(self) -> list:
@@ -1084,7 +1261,7 @@ class TwelveToneMatrix:
         Gets the left matrix labels.
         :return: The left matrix labels
         """
-        return self._labels_left
+        return self._get_labels()[1]
 
     @property
     def labels_right(self) -> list:
@@ -1092,7 +1269,7 @@ class TwelveToneMatrix:
         Gets the right matrix labels.
         :return: The right matrix labels
         """
-        return self._labels_right
+        return self._get_labels()[2]
 
     @property
     def labels_top(self) -> list:
@@ -1100,7 +1277,7 @@ class TwelveToneMatrix:
         Gets the top matrix labels.
         :return: The top matrix labels
         """
-        return self._labels_top
+        return self._get_labels()[3]
 
     @property
     def matrix(self) -> list:
@@ -1108,7 +1285,9 @@ class TwelveToneMatrix:
         Gets the matrix.
         :return: The matrix
         """
-        return self._mx
+        if self._matrix is None:
+            self._matrix = [[PitchClass(pc, 12) for pc in row] for row in self._mx.tolist()]
+        return self._matrix
 
     @property
     def row(self) -> list:
@@ -1118,16 +1297,57 @@ class TwelveToneMatrix:
         """
         return self._row
 
+    def count_invariant_pcs(self, form: str, segment_size: int = 1) -> dict:
+        """
+        Counts the invariant pcs between a row form and every row form in the matrix. The forms are divided
+        into segments of the given size, and the pcs that corresponding segments have in common are counted.
+        With a segment size of 1, this counts the order positions that hold the same pc.
+        :param form: The label of a row form (for example, "T3", "T0I", "T5R", or "T11RI")
+        :param segment_size: The segment size (for example, 6 for hexachordal invariance)
+        :return: A dictionary from the label of each row form to its number of invariant pcs
+        :raises ValueError: If the form is not in the matrix, or if the segment size does not divide the row length
+        """
+        forms, labels = self._get_forms()
+        if form not in labels:
+            raise ValueError(f"The row form {form} is not in the matrix.")
+        elif segment_size < 1 or len(self._mx) % segment_size != 0:
+            raise ValueError(f"The segment size {segment_size} does not divide the row length.")
+        presence = np.zeros((len(forms), len(self._mx) // segment_size, 12), dtype=bool)
+        presence[np.arange(len(forms))[:, None], np.arange(len(self._mx))[None, :] // segment_size, forms] = True
+        counts = np.logical_and(presence, presence[labels.index(form)]).sum(axis=(1, 2))
+        return dict(zip(labels, counts.tolist()))
+
+    def find_forms(self, pcseg: list) -> list:
+        """
+        Finds every occurrence of a pcseg as a contiguous segment of a row form in the matrix, reading the
+        rows (T), the columns (I), and their retrogrades (R and RI).
+        :param pcseg: The pcseg
+        :return: A list of (label, offset) tuples, one for each occurrence
+        """
+        forms, labels = self._get_forms()
+        if len(pcseg) == 0 or len(pcseg) > len(self._mx):
+            return []
+        windows = np.lib.stride_tricks.sliding_window_view(forms, len(pcseg), axis=1)
+        matches = np.all(windows == np.array([pc.pc for pc in pcseg]), axis=2)
+        return [(labels[i], j) for i, j in np.argwhere(matches).tolist()]
+
+    def find_pcs(self, pcs) -> np.ndarray:
+        """
+        Finds the positions of pcs in the matrix.
+        :param pcs: A PitchClass, or a collection of PitchClasses
+        :return: A (k, 2) array of the (row, column) positions of the pcs, in row-major order
+        """
+        if type(pcs) == PitchClass:
+            pcs = [pcs]
+        return np.argwhere(np.isin(self._mx, [pc.pc for pc in pcs]))
+
     def get_column(self, j: int) -> list:
         """
         Gets a column of the matrix.
         :param j: The column index
         :return: The column
         """
-        pcseg = []
-        for i in range(len(self._mx)):
-            pcseg.append(PitchClass(self._mx[i][j].pc, 12))
-        return pcseg
+        return [PitchClass(pc, 12) for pc in self._mx[:, j].tolist()]
 
     def get_row(self, i: int) -> list:
         """
@@ -1135,27 +1355,374 @@ class TwelveToneMatrix:
         :param i: The row index
         :return: The row
         """
-        return self._mx[i].copy()
+        return [PitchClass(pc, 12) for pc in self._mx[i].tolist()]
 
-    def import_row(self, row: list):
+    def import_row(self, row):
         """
-        Imports a row.
-        :param row: The row to import
+        Imports a row. Any previously imported row is replaced.
+        :param row: The row to import (a list of PitchClasses, or a NumPy vector of pitch-class integers)
         :return:
         """
+        if isinstance(row, np.ndarray):
+            pcs = row.astype(np.int8) % 12
+        else:
+            pcs = np.array([pc.pc for pc in row], dtype=np.int8)
         # We need the starting pitch to be 0 for the P0 form
-        self._row = transpose(row, -row[0].pc)
-        inv = invert(self._row)
-
-        for i in range(len(self._row)):
-            self._mx.append(transpose(self._row, inv[i].pc))
-
-        for i in range(len(self._row)):
-            p_lbl = self._mx[i][0] - self._mx[0][0]
-            i_lbl = self._mx[0][i] - self._mx[0][0]
-            r_lbl = self._mx[i][len(self._row) - 1] - self._mx[0][len(self._row) - 1]
-            ri_lbl = self._mx[len(self._row) - 1][i] - self._mx[len(self._row) - 1][0]
-            self._labels_bottom.append(f"T{ri_lbl.pc}RI")
-            self._labels_left.append(f"T{p_lbl.pc}")
-            self._labels_right.append(f"T{r_lbl.pc}R")
-            self._labels_top.append(f"T{i_lbl.pc}I")
+        pcs = (pcs - pcs[0]) % 12
+        self._mx = (pcs[None, :] - pcs[:, None]) % 12
+        self._row = [PitchClass(pc, 12) for pc in pcs.tolist()]
+        self._forms = None
+        self._labels = None
+        self._matrix = None
+
+    def _get_forms(self) -> tuple:
+        """
+        Gets the row forms in the matrix and their labels, making them on first use.
+        :return: A (4n, n) array of the row forms (the rows, the columns, and their retrogrades) and a list of their labels
+        """
+        if self._forms is None:
+            labels_bottom, labels_left, labels_right, labels_top = self._get_labels()
+            self._forms = (np.concatenate((self._mx, self._mx.T, self._mx[:, ::-1], self._mx.T[:, ::-1])),
+                           labels_left + labels_top + labels_right + labels_bottom)
+        return self._forms
+
+    def _get_labels(self) -> tuple:
+        """
+        Gets the matrix labels, making them on first use.
+        :return: The bottom, left, right, and top labels
+        """
+        if self._labels is None:
+            if len(self._mx) == 0:
+                self._labels = ([], [], [], [])
+            else:
+                self._labels = ([f"T{pc}RI" for pc in ((self._mx[-1] - self._mx[-1, 0]) % 12).tolist()],
+                                [f"T{pc}" for pc in self._mx[:, 0].tolist()],
+                                [f"T{pc}R" for pc in ((self._mx[:, -1] - self._mx[0, -1]) % 12).tolist()],
+                                [f"T{pc}I" for pc in self._mx[0].tolist()])
+        return self._labels
+
+
+def _get_all_interval_successions(mod: int, row_classes: bool, processes: int):
+    """
+    Gets the interval successions of all-interval rows, searching in a process pool if requested.
+    :param mod: The number of pcs in the system
+    :param row_classes: Whether to generate one row per row-class
+    :param processes: The number of worker processes
+    :return: A generator of interval successions, in lexicographic order
+    """
+    if type(mod) != int or mod < 2 or mod % 2 != 0:
+        raise ValueError("All-interval rows only exist for even modulos.")
+    if processes is None or processes <= 1 or mod < 4:
+        return _iter_all_interval_rows(mod, (), row_classes, mod - 1)
+    tasks = ((_iter_all_interval_rows, (mod, prefix, row_classes, mod - 1))
+             for prefix in _iter_all_interval_rows(mod, (), row_classes, mod // 3))
+    return _search_in_pool(tasks, processes)
+
+
+def _get_imb_class_ids(pcs: list, n: int, mod: int) -> list:
+    """
+    Gets the dense n-class index of each imbricated n-note segment of a list of pitch-class integers.
+    :param pcs: The pitch-class integers
+    :param n: The cardinality of imbrication
+    :param mod: The number of pcs in the system
+    :return: The n-class indices
+    """
+    lookup = _get_imb_lookup(n, mod)
+    ids = []
+    for i in range(len(pcs) + 1 - n):
+        window = 0
+        for pc in pcs[i:i + n]:
+            window |= 1 << pc
+        ids.append(lookup.get(window, -1))
+    return ids
+
+
+def _get_imb_lookup(n: int, mod: int) -> dict:
+    """
+    Gets the shared lookup table from the bitmask of each n-note pcset to a dense n-class index
+    (220 entries for mod 12 trichords), building it on first use.
+    :param n: The cardinality
+    :param mod: The number of pcs in the system
+    :return: The lookup table
+    """
+    if (n, mod) not in _imb_lookups:
+        windows = [sum(1 << pc for pc in combination) for combination in itertools.combinations(range(mod), n)]
+        if mod == 12:
+            class_ids = pcset.SetClassTable12.get().class_ids[windows]
+        else:
+            class_ids = batch.prime_form(np.array(windows, dtype=np.uint64), mod)
+        dense_ids = np.unique(class_ids, return_inverse=True)[1].reshape(-1)
+        _imb_lookups[(n, mod)] = dict(zip(windows, dense_ids.tolist()))
+    return _imb_lookups[(n, mod)]
+
+
+def _get_imb_n_successions(n: int, mod: int, cyclic: bool, excluded: int, include_inversions: bool, processes: int):
+    """
+    Gets rows whose IMB_n has no repeated set-classes, searching in a process pool if requested.
+    :param n: The cardinality of imbrication
+    :param mod: The number of pcs in the system
+    :param cyclic: Whether the row is read cyclically
+    :param excluded: A bitset of excluded n-class indices
+    :param include_inversions: Whether to generate both a row and its inversion
+    :param processes: The number of worker processes
+    :return: A generator of rows as tuples of pitch-class integers, in ascending order
+    """
+    if processes is None or processes <= 1 or mod < 4:
+        return _iter_imb_n_rows(n, mod, cyclic, excluded, include_inversions, (), mod)
+    tasks = ((_iter_imb_n_rows, (n, mod, cyclic, excluded, include_inversions, prefix, mod))
+             for prefix in _iter_imb_n_rows(n, mod, cyclic, excluded, include_inversions, (), mod // 3))
+    return _search_in_pool(tasks, processes)
+
+
+def _get_imb_windows(pcs: np.ndarray, n: int) -> np.ndarray:
+    """
+    Gets the bitmask of each imbricated n-note window of one or many pcsegs. Since OR is idempotent, windows
+    of length 2k are built from overlapping windows of length k, so this takes about log2(n) array passes.
+    :param pcs: A vector or (N, k) array of pitch-class integers, already reduced by the modulo
+    :param n: The cardinality of imbrication
+    :return: The window bitmasks, as a uint64 array with k - n + 1 columns
+    """
+    if pcs.shape[-1] < n:
+        return np.zeros(pcs.shape[:-1] + (0,), dtype=np.uint64)
+    windows = np.left_shift(np.uint64(1), pcs.astype(np.uint64))
+    span = 1
+    while span * 2 <= n:
+        windows = windows[..., :-span] | windows[..., span:]
+        span *= 2
+    if span < n:
+        windows = windows[..., :span - n] | windows[..., n - span:]
+    return windows
+
+
+def _is_least_all_interval_image(intervals: list, mod: int) -> bool:
+    """
+    Determines if a succession of intervals is the least of its images under I, R, and RI.
+    :param intervals: The intervals
+    :param mod: The number of pcs in the system
+    :return: True or False
+    """
+    inverted = [-interval % mod for interval in intervals]
+    return intervals <= inverted and intervals <= inverted[::-1] and intervals <= intervals[::-1]
+
+
+def _iter_all_interval_rows(mod: int, prefix: tuple, row_classes: bool, depth: int):
+    """
+    Searches a subtree of all-interval rows depth-first.
+    :param mod: The number of pcs in the system
+    :param prefix: The succession of intervals at the root of the subtree
+    :param row_classes: Whether to generate one row per row-class
+    :param depth: The number of intervals at which to stop. Partial rows are generated if this is less than mod - 1.
+    :return: A generator of interval successions, in lexicographic order
+    """
+    tritone = mod // 2
+    full = (1 << mod) - 1
+
+    def get_steps(pc: int, pcs: int, intervals: int, length: int) -> int:
+        # The intervals that lead to unused pcs are the unused pcs rotated down by the current pc.
+        free = ~pcs & full
+        steps = ((free >> pc) | (free << (mod - pc))) & full & ~intervals
+        # The tritone (relative to the first pc) can only be reached by the last interval.
+        if length == mod - 2:
+            steps &= 1 << (tritone - pc) % mod
+        else:
+            steps &= ~(1 << (tritone - pc) % mod)
+        # With one row per row-class, the row or its inversion starts with an interval up to the tritone.
+        if row_classes and length == 0:
+            steps &= (1 << tritone + 1) - 1
+        return steps
+
+    sequence = list(prefix)
+    pc = 0
+    pcs = 1
+    intervals = 0
+    for interval in prefix:
+        pc = (pc + interval) % mod
+        pcs |= 1 << pc
+        intervals |= 1 << interval
+    stack = [[pc, pcs, intervals, get_steps(pc, pcs, intervals, len(sequence))]]
+    while stack:
+        frame = stack[-1]
+        if frame[3] == 0:
+            stack.pop()
+            if stack:
+                sequence.pop()
+            continue
+        step = frame[3] & -frame[3]
+        frame[3] ^= step
+        interval = step.bit_length() - 1
+        pc = (frame[0] + interval) % mod
+        sequence.append(interval)
+        if len(sequence) == depth:
+            if depth < mod - 1 or not row_classes or _is_least_all_interval_image(sequence, mod):
+                yield tuple(sequence)
+            sequence.pop()
+        else:
+            pcs = frame[1] | 1 << pc
+            intervals = frame[2] | step
+            stack.append([pc, pcs, intervals, get_steps(pc, pcs, intervals, len(sequence))])
+
+
+def _iter_imb_n_rows(n: int, mod: int, cyclic: bool, excluded: int, include_inversions: bool, prefix: tuple, depth: int):
+    """
+    Searches a subtree of rows whose IMB_n has no repeated set-classes depth-first.
+    :param n: The cardinality of imbrication
+    :param mod: The number of pcs in the system
+    :param cyclic: Whether the row is read cyclically
+    :param excluded: A bitset of excluded n-class indices
+    :param include_inversions: Whether to generate both a row and its inversion
+    :param prefix: The pcs at the root of the subtree
+    :param depth: The number of pcs at which to stop. Partial rows are generated if this is less than mod.
+    :return: A generator of rows as tuples of pitch-class integers, in ascending order
+    """
+    lookup = _get_imb_lookup(n, mod)
+    full = (1 << mod) - 1
+    num_windows = mod if cyclic else mod + 1 - n
+    if num_windows > len(set(lookup.values())) - excluded.bit_count():
+        return
+
+    def get_candidates(length: int, used: int) -> int:
+        # Rows start on pitch-class 0, and the lesser of a row and its inversion has its second pc in the lower half.
+        if length == 0:
+            return 1
+        elif length == 1 and not include_inversions:
+            return ~used & full & (1 << mod // 2 + 1) - 1
+        return ~used & full
+
+    row = list(prefix)
+    length = len(row)
+    used = 0
+    for pc in row:
+        used |= 1 << pc
+    classes = 0
+    for class_id in _get_imb_class_ids(row, n, mod):
+        classes |= 1 << class_id
+    # Each frame holds the used pcs, the n-classes used, the candidates for the next pc,
+    # and the bitmask of the last n - 1 pcs (the start of the next imbrication).
+    tail = 0
+    for pc in row[max(0, length + 1 - n):]:
+        tail |= 1 << pc
+    class_bits = {window: 1 << class_id for window, class_id in lookup.items()}
+    stack = [[used, classes, get_candidates(length, used), tail]]
+    while stack:
+        frame = stack[-1]
+        candidates = frame[2]
+        if candidates == 0:
+            stack.pop()
+            if stack:
+                row.pop()
+                length -= 1
+            continue
+        bit = candidates & -candidates
+        frame[2] = candidates ^ bit
+        pc = bit.bit_length() - 1
+        classes = frame[1]
+        window = frame[3] | bit
+        if length >= n - 1:
+            n_class = class_bits[window]
+            if (classes | excluded) & n_class:
+                continue
+            classes |= n_class
+            window &= ~(1 << (row[length + 1 - n] if n > 1 else pc))
+        row.append(pc)
+        length += 1
+        if length < depth:
+            stack.append([frame[0] | bit, classes, get_candidates(length, frame[0] | bit), window])
+            continue
+        valid = True
+        if depth == mod and cyclic:
+            # Check the imbrications that wrap around from the end of the row to the beginning
+            for class_id in _get_imb_class_ids(row[mod + 1 - n:] + row[:n - 1], n, mod):
+                if (classes | excluded) >> class_id & 1:
+                    valid = False
+                    break
+                classes |= 1 << class_id
+        if valid and depth == mod and not include_inversions:
+            valid = row <= [-pc % mod for pc in row]
+        if valid:
+            yield tuple(row)
+        row.pop()
+        length -= 1
+
+
+def _make_row_from_intervals(intervals: tuple, mod: int) -> list:
+    """
+    Makes a pcseg that starts on pitch-class 0 from a succession of intervals.
+    :param intervals: The intervals
+    :param mod: The number of pcs in the system
+    :return: The pcseg
+    """
+    row = [PitchClass(0, mod)]
+    pc = 0
+    for interval in intervals:
+        pc = (pc + interval) % mod
+        row.append(PitchClass(pc, mod))
+    return row
+
+
+def _make_suffix_array(text: np.ndarray) -> np.ndarray:
+    """
+    Builds the suffix array of an integer text by prefix doubling.
+    :param text: An array of integers
+    :return: The start positions of the suffixes of the text, in sorted order
+    """
+    n = text.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    rank = np.unique(text, return_inverse=True)[1].reshape(n).astype(np.int64)
+    suffix_array = np.argsort(rank, kind="stable")
+    k = 1
+    while rank.max() < n - 1:
+        # Sort by the rank of the first k items, then the rank of the next k items (-1 past the end)
+        second = np.full(n, -1, dtype=np.int64)
+        second[:n - k] = rank[k:]
+        suffix_array = np.lexsort((second, rank))
+        changed = (np.diff(rank[suffix_array]) != 0) | (np.diff(second[suffix_array]) != 0)
+        rank[suffix_array] = np.concatenate(([0], np.cumsum(changed)))
+        k *= 2
+    return suffix_array
+
+
+def _roll_imb_windows(pcs: list, n: int, mod: int):
+    """
+    Slides an n-note window along a list of pitch-class integers, adding one pc and dropping one pc at each
+    step. A count is kept for each pc so that repeated pcs are handled.
+    :param pcs: The pitch-class integers
+    :param n: The cardinality of imbrication
+    :param mod: The number of pcs in the system
+    :return: A generator of window bitmasks
+    """
+    counts = [0 for i in range(mod)]
+    window = 0
+    for i in range(len(pcs)):
+        counts[pcs[i]] += 1
+        window |= 1 << pcs[i]
+        if i >= n:
+            counts[pcs[i - n]] -= 1
+            if counts[pcs[i - n]] == 0:
+                window &= ~(1 << pcs[i - n])
+        if i >= n - 1:
+            yield window
+
+
+def _run_search(task: tuple) -> list:
+    """
+    Runs a search in a worker process. This is a module function so that it can be sent to a process pool.
+    :param task: A tuple (search generator function, arguments)
+    :return: The results of the search, as a list
+    """
+    search, args = task
+    return list(search(*args))
+
+
+def _search_in_pool(tasks, processes: int):
+    """
+    Runs searches in a process pool and streams their results in order. The tasks are handed to the pool
+    in batches, so they are not all held in memory.
+    :param tasks: An iterator of (search generator function, arguments) tuples
+    :param processes: The number of worker processes
+    :return: A generator of results
+    """
+    with multiprocessing.Pool(processes) as pool:
+        while batch_tasks := list(itertools.islice(tasks, processes * 256)):
+            for results in pool.imap(_run_search, batch_tasks):
+                yield from results
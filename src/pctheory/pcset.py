@@ -21,21 +21,288 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from networkx import DiGraph
-import pyvis
+from collections import OrderedDict
 from pctheory import tables, transformations
 from pctheory.pitch import PitchClass
 from pctheory.transformations import UTO
+import itertools
 import numpy as np
 import re
 
 
-name_tables = tables.create_tables_sc12()
+name_tables = tables.LazyTables(tables.get_tables_sc12)
+_set_class_table12 = None
+_set_classes12 = None
+_intern_cache = OrderedDict()
+_intern_cache_capacity = 4096
+_intern_cache_stats = {"hits": 0, "misses": 0}
+_subset_census_cache = {}
+
+
+class PcSetN:
+    """
+    Represents an immutable pcset stored as a bitmask. Bit i of the mask is set if pitch-class i
+    is in the pcset. Transposition is a bit rotation, complementation is an XOR, and union,
+    intersection, and subset checks are single integer operations. Compatible with all PitchClass modulos.
+    Iterating over a PcSetN yields PitchClass objects in ascending order, so a PcSetN can be passed
+    to the functions in this module in place of a set of PitchClasses.
+    """
+    __slots__ = ("_bits", "_mod")
+
+    def __init__(self, pcs=None, mod: int=12):
+        """
+        Creates a PcSetN.
+        :param pcs: A collection of PitchClasses or integers (or another PcSetN)
+        :param mod: The pitch-class modulo. If pcs contains PitchClasses, their modulo is used.
+        """
+        if type(mod) != int or mod < 1:
+            raise TypeError("The pitch class modulo must be a positive integer.")
+        bits = 0
+        if pcs is not None:
+            if isinstance(pcs, PcSetN):
+                mod = pcs._mod
+                bits = pcs._bits
+            else:
+                for pc in pcs:
+                    if type(pc) == PitchClass:
+                        mod = pc.mod
+                        break
+                bits = _bits_from_pcs(pcs, mod)
+        self._bits = bits
+        self._mod = mod
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def __contains__(self, pc):
+        if type(pc) == PitchClass:
+            return pc.mod == self._mod and bool(self._bits >> pc.pc & 1)
+        elif type(pc) == int:
+            return bool(self._bits >> (pc % self._mod) & 1)
+        return False
+
+    def __eq__(self, other):
+        if isinstance(other, PcSetN):
+            return self._bits == other._bits and self._mod == other._mod
+        return NotImplemented
+
+    def __ge__(self, other):
+        return self.issuperset(other)
+
+    def __gt__(self, other):
+        return self.issuperset(other) and self._bits != self._other_bits(other)
+
+    def __hash__(self):
+        return hash((self._bits, self._mod))
+
+    def __iter__(self):
+        return (PitchClass(pc, self._mod) for pc in self.pcs)
+
+    def __le__(self, other):
+        return self.issubset(other)
+
+    def __len__(self):
+        return self._bits.bit_count()
+
+    def __lt__(self, other):
+        return self.issubset(other) and self._bits != self._other_bits(other)
+
+    def __ne__(self, other):
+        if isinstance(other, PcSetN):
+            return self._bits != other._bits or self._mod != other._mod
+        return NotImplemented
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def __repr__(self):
+        return "{" + ", ".join([str(pc) for pc in self]) + "}"
+
+    def __str__(self):
+        return "{" + ", ".join([str(pc) for pc in self]) + "}"
+
+    def __sub__(self, other):
+        return self.difference(other)
+
+    def __xor__(self, other):
+        return self.symmetric_difference(other)
+
+    @property
+    def bits(self) -> int:
+        """
+        Gets the bitmask of the pcset.
+        :return: The bitmask
+        """
+        return self._bits
+
+    @property
+    def mod(self) -> int:
+        """
+        Gets the pitch-class modulo of the pcset.
+        :return: The modulo
+        """
+        return self._mod
+
+    @property
+    def pcs(self) -> tuple:
+        """
+        Gets the pitch-class integers in ascending order.
+        :return: A tuple of integers
+        """
+        bits = self._bits
+        return tuple(i for i in range(self._mod) if bits >> i & 1)
+
+    @staticmethod
+    def from_bits(bits: int, mod: int=12) -> 'PcSetN':
+        """
+        Creates a pcset from a bitmask.
+        :param bits: The bitmask
+        :param mod: The pitch-class modulo
+        :return: A PcSetN (or PcSet12 for modulo 12)
+        """
+        if bits < 0 or bits >> mod:
+            raise ValueError(f"The bitmask {bits} is out of range for modulo {mod}.")
+        return _new_pcsetn(bits, mod)
+
+    def complement(self) -> 'PcSetN':
+        """
+        Gets the complement of the pcset.
+        :return: The complement
+        """
+        return _new_pcsetn(self._bits ^ ((1 << self._mod) - 1), self._mod)
+
+    def difference(self, other) -> 'PcSetN':
+        """
+        Gets the difference of this pcset and another pcset.
+        :param other: A PcSetN or a collection of PitchClasses
+        :return: The difference
+        """
+        return _new_pcsetn(self._bits & ~self._other_bits(other), self._mod)
+
+    def intersection(self, other) -> 'PcSetN':
+        """
+        Gets the intersection of this pcset and another pcset.
+        :param other: A PcSetN or a collection of PitchClasses
+        :return: The intersection
+        """
+        return _new_pcsetn(self._bits & self._other_bits(other), self._mod)
+
+    def invert(self) -> 'PcSetN':
+        """
+        Inverts the pcset.
+        :return: The inverted pcset
+        """
+        return _new_pcsetn(_invert_bits(self._bits, self._mod), self._mod)
+
+    def isdisjoint(self, other) -> bool:
+        """
+        Whether or not this pcset has no pitch-classes in common with another pcset.
+        :param other: A PcSetN or a collection of PitchClasses
+        :return: True or False
+        """
+        return not self._bits & self._other_bits(other)
+
+    def issubset(self, other) -> bool:
+        """
+        Whether or not this pcset is a subset of another pcset.
+        :param other: A PcSetN or a collection of PitchClasses
+        :return: True or False
+        """
+        return not self._bits & ~self._other_bits(other)
+
+    def issuperset(self, other) -> bool:
+        """
+        Whether or not this pcset is a superset of another pcset.
+        :param other: A PcSetN or a collection of PitchClasses
+        :return: True or False
+        """
+        return not self._other_bits(other) & ~self._bits
+
+    def multiply(self, n: int) -> 'PcSetN':
+        """
+        Multiplies the pcset.
+        :param n: The multiplier
+        :return: The multiplied pcset
+        """
+        return _new_pcsetn(_multiply_bits(self._bits, n, self._mod), self._mod)
+
+    def symmetric_difference(self, other) -> 'PcSetN':
+        """
+        Gets the symmetric difference of this pcset and another pcset.
+        :param other: A PcSetN or a collection of PitchClasses
+        :return: The symmetric difference
+        """
+        return _new_pcsetn(self._bits ^ self._other_bits(other), self._mod)
+
+    def to_set(self) -> set:
+        """
+        Converts the pcset to a set of PitchClasses.
+        :return: A set of PitchClasses
+        """
+        return {PitchClass(pc, self._mod) for pc in self.pcs}
+
+    def transform(self, uto: UTO) -> 'PcSetN':
+        """
+        Transforms the pcset with a UTO (multiplication first, then transposition).
+        :param uto: A UTO
+        :return: The transformed pcset
+        """
+        return _new_pcsetn(_rotate_bits(_multiply_bits(self._bits, uto.M, self._mod), uto.T, self._mod), self._mod)
+
+    def transpose(self, n: int) -> 'PcSetN':
+        """
+        Transposes the pcset.
+        :param n: The index of transposition
+        :return: The transposed pcset
+        """
+        return _new_pcsetn(_rotate_bits(self._bits, n, self._mod), self._mod)
+
+    def union(self, other) -> 'PcSetN':
+        """
+        Gets the union of this pcset and another pcset.
+        :param other: A PcSetN or a collection of PitchClasses
+        :return: The union
+        """
+        return _new_pcsetn(self._bits | self._other_bits(other), self._mod)
+
+    def _other_bits(self, other) -> int:
+        """
+        Gets the bitmask of another pcset, checking that the modulos match.
+        :param other: A PcSetN or a collection of PitchClasses
+        :return: The bitmask
+        """
+        if isinstance(other, PcSetN):
+            if other._mod != self._mod:
+                raise ArithmeticError(f"Cannot combine pcsets with different mod values ({self._mod} and {other._mod}).")
+            return other._bits
+        elif type(other) in [set, frozenset, list, tuple]:
+            for pc in other:
+                if type(pc) == PitchClass and pc.mod != self._mod:
+                    raise ArithmeticError(f"Cannot combine pcsets with different mod values ({self._mod} and {pc.mod}).")
+            return _bits_from_pcs(other, self._mod)
+        else:
+            raise TypeError(f"Cannot combine a PcSetN with an item of type {type(other)}.")
+
+
+class PcSet12(PcSetN):
+    """
+    Represents an immutable chromatic (mod 12) pcset stored as a 12-bit integer.
+    """
+    __slots__ = ()
+
+    def __init__(self, pcs=None):
+        """
+        Creates a PcSet12.
+        :param pcs: A collection of PitchClasses or integers
+        """
+        super().__init__(pcs, 12)
+        if self._mod != 12:
+            raise ArithmeticError(f"Cannot make a PcSet12 out of PitchClasses with modulo {self._mod}.")
 
 
 class SetClass:
     """
-    Represents a pc-set-class.
+    Represents a pc-set-class. Shared, immutable SetClasses can be obtained with SetClass.intern().
     """
     def __init__(self, pcset=None, pc_mod=None):
         """
@@ -50,9 +317,12 @@ class SetClass:
         else:
             self._NUM_PC = 12
         if pcset is not None:
-            if type(pcset) in [set, list] and len(pcset) > 0 and pc_mod is None:
+            if isinstance(pcset, PcSetN) and pc_mod is None:
+                self._NUM_PC = pcset.mod
+            elif type(pcset) in [set, list] and len(pcset) > 0 and pc_mod is None:
                 self._NUM_PC = next(iter(pcset)).mod
         self._dsym = self._NUM_PC * 2
+        self._frozen = False
         self._ic_vector = [0 for i in range(self._NUM_PC // 2)]
         self._ic_vector_long = [0 for i in range(self._NUM_PC // 2 + 1)]
         self._name_carter = None
@@ -61,24 +331,27 @@ class SetClass:
         self._name_prime = "[]"
         self._num_forte = None
         self._pcset = set()
+        self._key = (0, self._NUM_PC)
         self._weight_right = True
         if pcset is not None:
-            if type(pcset) in [set, list]:
+            if type(pcset) in [set, list] or isinstance(pcset, PcSetN):
                 self.pcset = pcset
             elif type(pcset) == str:
                 self.load_from_name(pcset)
             else:
-                raise TypeError("The pitch class set must be a set/list of PitchClasses or integers, or else it must be a valid set-class name.")
+                raise TypeError("The pitch class set must be a set/list of PitchClasses or integers, a PcSetN, or else it must be a valid set-class name.")
 
 
     def __eq__(self, other):
-        if type(other) == SetClass:
-            return self.pcset == other.pcset and self._NUM_PC == other._NUM_PC
+        if self is other:
+            return True
+        elif type(other) == SetClass:
+            return self._key == other._key
         else:
             raise TypeError("SetClasses can only be compared to other SetClasses.")
 
     def __hash__(self):
-        return hash(self._name_prime)
+        return hash(self._key)
 
     def __len__(self):
         return len(self._pcset)
@@ -95,8 +368,10 @@ class SetClass:
             raise TypeError("SetClasses can only be compared to other SetClasses.")
 
     def __ne__(self, other):
-        if type(other) == SetClass:
-            return self._pcset != other._pcset or self._NUM_PC != other._NUM_PC
+        if self is other:
+            return False
+        elif type(other) == SetClass:
+            return self._key != other._key
         else:
             raise TypeError("SetClasses can only be compared to other SetClasses.")
 
@@ -117,6 +392,17 @@ class SetClass:
         else:
             return self._name_prime
     
+    @property
+    def class_id(self) -> int:
+        """
+        Gets the SetClassTable12 class id of a chromatic set-class.
+        :return: The class id, or None if the SetClass has a PitchClass modulo other than 12
+        """
+        if self._NUM_PC == 12:
+            return SetClassTable12.get()._class_ids[self._key[0]]
+        else:
+            return None
+
     @property
     def derived_core(self) -> list:
         """
@@ -141,16 +427,20 @@ class SetClass:
     def ic_vector(self) -> list:
         """
         Gets the IC vector.
-        :return: The IC vector
+        :return: The IC vector (a copy, if the SetClass is interned)
         """
+        if self._frozen:
+            return list(self._ic_vector)
         return self._ic_vector
 
     @property
     def ic_vector_long(self) -> list:
         """
         Gets the IC vector in long format.
-        :return: The IC vector in long format
+        :return: The IC vector in long format (a copy, if the SetClass is interned)
         """
+        if self._frozen:
+            return list(self._ic_vector_long)
         return self._ic_vector_long
 
     @property
@@ -247,8 +537,10 @@ class SetClass:
     def pcset(self) -> set:
         """
         Gets the pcset prime form.
-        :return: The pcset prime form
+        :return: The pcset prime form (a copy, if the SetClass is interned)
         """
+        if self._frozen:
+            return set(self._pcset)
         return self._pcset
 
     @pcset.setter
@@ -258,16 +550,22 @@ class SetClass:
         :param value: The new pcset or pcseg
         :return:
         """
-        if type(value) == set or type(value) == list:
+        if self._frozen:
+            raise AttributeError("Cannot modify an interned SetClass.")
+        if type(value) == set or type(value) == list or isinstance(value, PcSetN):
             for item in value:
                 if type(item) != PitchClass:
                     raise TypeError("Cannot import sets into a SetClass if they are not composed exclusively of PitchClass objects.")
                 elif item.mod != self.mod:
                     raise ArithmeticError(f"Cannot import sets into a SetClass with a different PitchClass modulo. This SetClass has modulo {self.mod}. You tried to import with a modulo of {item.mod}.")
-            self._pcset = SetClass.calculate_prime_form(value, self._weight_right, self._NUM_PC)
-            self._make_names()
+            if self._NUM_PC == 12:
+                self._load_from_table12(SetClassTable12.get().get_class_id(value))
+            else:
+                self._pcset = SetClass.calculate_prime_form(value, self._weight_right, self._NUM_PC)
+                self._key = (_bits_from_pcs(self._pcset, self._NUM_PC), self._NUM_PC)
+                self._make_names()
         else:
-            raise TypeError("Cannot import types other than sets and lists into a SetClass.")
+            raise TypeError("Cannot import types other than sets, lists, and PcSetNs into a SetClass.")
 
     @property
     def weight_right(self) -> bool:
@@ -284,8 +582,10 @@ class SetClass:
         :param value: A Boolean
         :return:
         """
+        if self._frozen:
+            raise AttributeError("Cannot modify an interned SetClass.")
         self._weight_right = value
-        self._pcset = SetClass.calculate_prime_form(self._pcset, self._weight_right, self._NUM_PC)
+        self.pcset = self._pcset
 
     @staticmethod
     def calculate_prime_form(pcset: set, weight_from_right: bool = True, pc_mod: int=12) -> set:
@@ -297,7 +597,13 @@ class SetClass:
         :return: The prime form
         """
         prime_set = set()
-        if len(pcset) > 0:
+        if pc_mod == 12 and len(pcset) > 0:
+            prime_set = set(SetClassTable12.get()._prime_sets[weight_from_right][SetClassTable12.get().get_class_id(pcset)])
+        elif len(pcset) > 0 and weight_from_right:
+            # Packing from the right gives the smallest bitmask among the T and TI images
+            bits = _prime_bits(_bits_from_pcs(pcset, pc_mod), pc_mod)
+            prime_set = {PitchClass(pc, pc_mod) for pc in range(pc_mod) if bits >> pc & 1}
+        elif len(pcset) > 0:
             lists_to_weight = []
             pclist = [pc.pc for pc in pcset]
             inverted = [pc * -1 % pc_mod for pc in pclist]
@@ -343,6 +649,18 @@ class SetClass:
 
         return prime_set
 
+    @staticmethod
+    def clear_intern_cache():
+        """
+        Clears the cache of interned SetClasses and resets its statistics.
+        :return:
+        """
+        global _set_classes12
+        _intern_cache.clear()
+        _intern_cache_stats["hits"] = 0
+        _intern_cache_stats["misses"] = 0
+        _set_classes12 = None
+
     def contains_abstract_subset(self, sc) -> bool:
         """
         Determines if a set-class is an abstract subset of this set-class.
@@ -353,14 +671,18 @@ class SetClass:
             raise TypeError(f"Cannot subset items of type {type(sc)} from items of type SetClass.")
         elif sc.mod != self.mod:
             raise ArithmeticError(f"Cannot subset SetClasses of modulo {sc.mod} from SetClasses of modulo {self.mod}.")
+        elif self._NUM_PC == 12:
+            table = SetClassTable12.get()
+            return table.contains_abstract_subset(table._class_ids[self._key[0]], table._class_ids[sc._key[0]])
+        elif len(sc._pcset) > len(self._pcset):
+            return False
         else:
-            t_sets = []
-            tni_sets = invert(sc.pcset)
+            # Look for a T or TI image of the subset prime form that fits in this prime form
+            outside = ~self._key[0]
+            sub = sc._key[0]
+            inverted = _invert_bits(sub, self._NUM_PC)
             for i in range(self._NUM_PC):
-                t_sets.append(transpose(sc.pcset, i))
-                t_sets.append(transpose(tni_sets, i))
-            for pcs in t_sets:
-                if pcs.issubset(self.pcset):
+                if not _rotate_bits(sub, i, self._NUM_PC) & outside or not _rotate_bits(inverted, i, self._NUM_PC) & outside:
                     return True
             return False
 
@@ -373,24 +695,23 @@ class SetClass:
         complement_set_class.pcset = get_complement(self._pcset, mod=self._NUM_PC)
         return complement_set_class
 
+    @staticmethod
+    def get_intern_cache_info() -> dict:
+        """
+        Gets statistics for the cache of interned SetClasses.
+        :return: A dictionary with the number of hits and misses, the current size, and the capacity
+        """
+        return {"hits": _intern_cache_stats["hits"], "misses": _intern_cache_stats["misses"],
+                "size": len(_intern_cache), "capacity": _intern_cache_capacity}
+
     def get_invariance_vector(self) -> list:
         """
         Gets the invariance vector of the SetClass
         :return: The invariance vector, or None if the SetClass has a PitchClass modulo other than 12
         """
         if self._NUM_PC == 12:
-            iv = [0, 0, 0, 0, 0, 0, 0, 0]
-            c = get_complement(self._pcset)
-            utos = transformations.get_utos12()
-            for i in range(self._NUM_PC):
-                h = [utos[f"T{i}"].transform(self._pcset), utos[f"T{i}I"].transform(self._pcset),
-                    utos[f"T{i}M"].transform(self._pcset), utos[f"T{i}MI"].transform(self._pcset)]
-                for j in range(4):
-                    if h[j] == self._pcset:
-                        iv[j] += 1
-                    if h[j].issubset(c):
-                        iv[4 + j] += 1
-            return iv
+            table = SetClassTable12.get()
+            return list(table._invariance_vectors[table.get_class_id(self._pcset)])
         else:
             return None
 
@@ -399,20 +720,36 @@ class SetClass:
         Gets a set of subset-classes contained in this SetClass.
         :return:
         """
-        subset_pcsets = subsets(self._pcset)
         subset_classes = set()
-        for s in subset_pcsets:
-            subset_classes.add(SetClass(s, pc_mod=self._NUM_PC))
+        if self._NUM_PC == 12 and len(self._pcset) > 0:
+            table = SetClassTable12.get()
+            for class_id in table.get_abstract_subset_ids(table._class_ids[self._key[0]]):
+                subset_classes.add(SetClass.intern(_new_pcsetn(table._prime_bits[True][class_id], 12)))
+        elif self._NUM_PC != 12 and len(self._pcset) > 0:
+            for set_class, cardinality, multiplicity in self.get_subset_class_census():
+                subset_classes.add(set_class)
         return subset_classes
 
+    def get_subset_class_census(self) -> list:
+        """
+        Gets each abstract subset-class of this SetClass, with its cardinality and its multiplicity
+        (the number of literal subsets of the prime form that belong to it, including the empty set
+        and the prime form itself, so the multiplicities add up to 2^n). Subsets are deduplicated
+        as bitmasks before any SetClass is made, and the census is cached per set-class.
+        :return: A list of (SetClass, cardinality, multiplicity) tuples, ordered by cardinality and then
+        by class id (mod 12) or prime form bitmask (other modulos)
+        *Compatible with all PitchClass modulos
+        """
+        return [(SetClass.intern(_new_pcsetn(bits, self._NUM_PC)), bits.bit_count(), multiplicity)
+                for bits, multiplicity in self._get_subset_class_counts()]
+
     def get_partition2_subset_classes(self) -> set:
         """
         Gets a set of set-class partitions of this SetClass.
         :return:
         """
-        p2 = partitions2(self._pcset)
         partitions2_set = set()
-        for partition in p2:
+        for partition in iter_partitions2(self._pcset):
             partitions2_set.add((SetClass(partition[0]), SetClass(partition[1])))
         return partitions2_set
 
@@ -421,21 +758,15 @@ class SetClass:
         """
         Gets the chromatic set-classes.
         :param cardinalities: A list of cardinalities if you don't want the entire list of 224 set-classes
-        :return: A list of the chromatic set-classes
-        """
-        set_classes = []
-        for name in name_tables["forteToSetNameTable"]:
-            if cardinalities is not None:
-                split = name.split('-')
-                if int(split[0]) in cardinalities:
-                    sc = SetClass(pc_mod=12)
-                    sc.load_from_name(name)
-                    set_classes.append(sc)
-            else:
-                sc = SetClass(pc_mod=12)
-                sc.load_from_name(name)
-                set_classes.append(sc)
-        return set_classes
+        :return: A list of the chromatic set-classes. The set-classes are interned, so they cannot be modified.
+        """
+        global _set_classes12
+        if _set_classes12 is None:
+            _set_classes12 = tuple(SetClass.intern(name, 12) for name in name_tables["forteToSetNameTable"])
+        if cardinalities is not None:
+            return [sc for sc in _set_classes12 if len(sc) in cardinalities]
+        else:
+            return list(_set_classes12)
 
     def get_z_relation(self) -> 'SetClass':
         """
@@ -452,6 +783,68 @@ class SetClass:
                 zset.load_from_name(name_tables["zNameTable"][f])
             return zset
 
+    @staticmethod
+    def intern(pcset, pc_mod: int=None, weight_right: bool=True) -> 'SetClass':
+        """
+        Gets a shared SetClass for a pcset or set-class name. There is one SetClass per
+        (prime form, modulo, packing), kept in a least-recently-used cache, so repeated calls
+        return the same object. Interned SetClasses cannot be modified.
+        :param pcset: A pcset (a set or list of PitchClasses, or a PcSetN) or a valid set-class name
+        :param pc_mod: The pitch-class modulo. If None, the modulo is taken from the pcset (or 12 for names).
+        :param weight_right: Whether or not to weight from the right
+        :return: The interned SetClass
+        """
+        if type(pcset) == str:
+            mod = 12 if pc_mod is None else pc_mod
+            sc = SetClass(pc_mod=mod)
+            sc._weight_right = weight_right
+            sc.load_from_name(pcset)
+            key = (sc._key[0], mod, weight_right)
+        else:
+            if pc_mod is not None:
+                mod = pc_mod
+            elif isinstance(pcset, PcSetN):
+                mod = pcset.mod
+            elif type(pcset) in [set, list] and len(pcset) > 0:
+                mod = next(iter(pcset)).mod
+            else:
+                mod = 12
+            if isinstance(pcset, PcSetN):
+                if pcset.mod != mod:
+                    raise ArithmeticError(f"Cannot import sets into a SetClass with a different PitchClass modulo. This SetClass has modulo {mod}. You tried to import with a modulo of {pcset.mod}.")
+            elif type(pcset) in [set, list]:
+                for item in pcset:
+                    if type(item) != PitchClass:
+                        raise TypeError("Cannot import sets into a SetClass if they are not composed exclusively of PitchClass objects.")
+                    elif item.mod != mod:
+                        raise ArithmeticError(f"Cannot import sets into a SetClass with a different PitchClass modulo. This SetClass has modulo {mod}. You tried to import with a modulo of {item.mod}.")
+            else:
+                raise TypeError("Cannot import types other than sets, lists, and PcSetNs into a SetClass.")
+            sc = None
+            if mod == 12:
+                table = SetClassTable12.get()
+                key = (table._prime_bits[weight_right][table.get_class_id(pcset)], mod, weight_right)
+            else:
+                pcset = SetClass.calculate_prime_form(pcset, weight_right, mod)
+                key = (_bits_from_pcs(pcset, mod), mod, weight_right)
+
+        interned = _intern_cache.get(key)
+        if interned is not None:
+            _intern_cache.move_to_end(key)
+            _intern_cache_stats["hits"] += 1
+            return interned
+        _intern_cache_stats["misses"] += 1
+        if sc is None:
+            sc = SetClass(pc_mod=mod)
+            sc._weight_right = weight_right
+            sc.pcset = pcset
+        sc._frozen = True
+        if _intern_cache_capacity > 0:
+            _intern_cache[key] = sc
+            if len(_intern_cache) > _intern_cache_capacity:
+                _intern_cache.popitem(last=False)
+        return sc
+
     def is_all_combinatorial_hexachord(self) -> bool:
         """
         Whether or not the SetClass is an all-combinatorial hexachord.
@@ -544,6 +937,23 @@ class SetClass:
         else:
             raise Exception("Invalid set-class name.")
 
+    @staticmethod
+    def set_intern_cache_capacity(capacity: int):
+        """
+        Sets the maximum number of interned SetClasses to keep in the cache. The least recently used
+        SetClasses are discarded first. A capacity of 0 disables caching.
+        :param capacity: The capacity
+        :return:
+        """
+        global _intern_cache_capacity
+        if type(capacity) != int:
+            raise TypeError("The cache capacity must be an integer.")
+        elif capacity < 0:
+            raise ValueError("The cache capacity cannot be negative.")
+        _intern_cache_capacity = capacity
+        while len(_intern_cache) > _intern_cache_capacity:
+            _intern_cache.popitem(last=False)
+
     def _make_names(self):
         """
         Makes the names for the set-class.
@@ -579,24 +989,53 @@ class SetClass:
             self._num_forte = int(forte_num)
 
         # Calculate the IC vector
-        self._ic_vector_long = [0 for i in range(self._NUM_PC // 2 + 1)]
-        for pc in self._pcset:
-            for pc2 in self._pcset:
-                interval = (pc2.pc - pc.pc) % self._NUM_PC
-                if interval > self._NUM_PC // 2:
-                    interval = interval * -1 + self._NUM_PC
-                self._ic_vector_long[interval] += 1
-        for i in range(1, len(self._ic_vector_long)):
-            self._ic_vector_long[i] //= 2
+        bits = self._key[0]
+        self._ic_vector_long = _ic_vector_long_bits(bits, self._NUM_PC)
         self._ic_vector = self._ic_vector_long[1:]
 
         # Get the degree of symmetry
         if len(self._pcset) > 0:
-            c = get_corpus(self._pcset)
+            inverted = _invert_bits(bits, self._NUM_PC)
+            c = {_rotate_bits(bits, i, self._NUM_PC) for i in range(self._NUM_PC)}
+            c.update(_rotate_bits(inverted, i, self._NUM_PC) for i in range(self._NUM_PC))
             self._dsym = (self._NUM_PC * 2) // len(c)
         else:
             self._dsym = self._NUM_PC * 2
 
+    def _get_subset_class_counts(self) -> tuple:
+        """
+        Gets the subset-class census of this SetClass as (prime form bitmask, multiplicity) pairs,
+        computing it on first use.
+        :return: A tuple of (bitmask, multiplicity) pairs, in the order of get_subset_class_census()
+        """
+        if self._key not in _subset_census_cache:
+            if self._NUM_PC == 12:
+                table = SetClassTable12.get()
+                vector = table.subset_class_vectors[table._class_ids[self._key[0]]]
+                census = [(table._prime_bits[True][class_id], int(vector[class_id])) for class_id in np.flatnonzero(vector)]
+            else:
+                census = _subset_class_counts(self._key[0], self._NUM_PC)
+            _subset_census_cache[self._key] = tuple(census)
+        return _subset_census_cache[self._key]
+
+    def _load_from_table12(self, class_id: int):
+        """
+        Loads the prime form and names for a chromatic set-class from the SetClassTable12.
+        :param class_id: The class id
+        :return:
+        """
+        table = SetClassTable12.get()
+        self._pcset = set(table._prime_sets[self._weight_right][class_id])
+        self._key = (table._prime_bits[self._weight_right][class_id], 12)
+        self._name_prime = table._names_prime[self._weight_right][class_id]
+        self._name_forte = table._names_forte[class_id]
+        self._name_carter = table._names_carter[class_id]
+        self._name_morris = f"({self._name_forte}){self._name_prime}"
+        self._num_forte = table._nums_forte[class_id]
+        self._ic_vector_long = list(table._ic_vectors_long[class_id])
+        self._ic_vector = self._ic_vector_long[1:]
+        self._dsym = table._dsyms[class_id]
+
     @staticmethod
     def _weight_from_right(pclists: list, pc_mod: int=12):
         """
@@ -673,6 +1112,284 @@ class SetClass:
                     break
         return pclists[0]
 
+class SetClassTable12:
+    """
+    A lookup table of set-class data for all 4096 chromatic (mod 12) pcsets, indexed by bitmask
+    (see PcSetN). Set-classes are identified by a class id from 0 to 223, in order of cardinality
+    and then Forte number. Use SetClassTable12.get() to get the shared table, which is built on first use.
+    """
+    def __init__(self):
+        """
+        Builds a SetClassTable12. This takes a moment, so prefer the shared table from SetClassTable12.get().
+        """
+        tables_sc12 = tables.get_tables_sc12()
+        forte_names = sorted(tables_sc12["forteToSetNameTable"],
+                             key=lambda name: (int(name.split('-')[0]), int(name.split('-')[1].strip('Z'))))
+        left_packing = {forte: prime for prime, forte in tables_sc12["setToForteNameTableLeftPacking"].items()}
+        num_classes = len(forte_names)
+        class_ids = [-1 for i in range(4096)]
+        self._names_forte = forte_names
+        self._nums_forte = [int(name.split('-')[1].strip('Z')) for name in forte_names]
+        self._names_carter = [tables_sc12["forteToCarterNameTable"].get(name, "") for name in forte_names]
+        self._names_prime = {True: [], False: []}
+        self._prime_bits = {True: [], False: []}
+        self._op_t = {True: [0 for i in range(4096)], False: [0 for i in range(4096)]}
+        self._op_m = {True: [1 for i in range(4096)], False: [1 for i in range(4096)]}
+        self._ic_vectors_long = []
+        self._dsyms = []
+        self._invariance_vectors = []
+
+        for class_id, forte_name in enumerate(forte_names):
+            name_right = tables_sc12["forteToSetNameTable"][forte_name]
+            name_left = left_packing.get(forte_name, name_right)
+            for weight_right, name in [(True, name_right), (False, name_left)]:
+                bits = _bits_from_pcs([tables_sc12["hexToInt"][c] for c in name[1:-1]], 12)
+                self._names_prime[weight_right].append(name)
+                self._prime_bits[weight_right].append(bits)
+
+                # Record the operator that maps each pcset in the set-class onto this prime form.
+                # Ti maps onto the prime form with T(-i), and TiI is its own inverse.
+                op_assigned = set()
+                inverted = _invert_bits(bits, 12)
+                for i in range(12):
+                    for image, op_t, op_m in [(_rotate_bits(bits, i, 12), -i % 12, 1), (_rotate_bits(inverted, i, 12), i, 11)]:
+                        if image not in op_assigned:
+                            op_assigned.add(image)
+                            class_ids[image] = class_id
+                            self._op_t[weight_right][image] = op_t
+                            self._op_m[weight_right][image] = op_m
+
+            bits = self._prime_bits[True][class_id]
+            self._ic_vectors_long.append(_ic_vector_long_bits(bits, 12))
+            self._dsyms.append(24 // len(op_assigned))
+            self._invariance_vectors.append(_invariance_vector_bits12(bits))
+
+        self._class_ids = class_ids
+        self._complement_ids = [class_ids[bits ^ 0xFFF] for bits in self._prime_bits[True]]
+        self._inclusion = None
+        self._inclusion_matrix = None
+        self._subset_class_vectors = None
+        self._prime_sets = {weight_right: [frozenset(PitchClass(pc, 12) for pc in range(12) if bits >> pc & 1)
+                                           for bits in self._prime_bits[weight_right]] for weight_right in [True, False]}
+        self._num_classes = num_classes
+
+    def __len__(self):
+        return self._num_classes
+
+    @property
+    def cardinalities(self) -> np.ndarray:
+        """
+        Gets the cardinality of each set-class, indexed by class id.
+        :return: An array of cardinalities
+        """
+        return np.array([bits.bit_count() for bits in self._prime_bits[True]], dtype=np.int8)
+
+    @property
+    def class_ids(self) -> np.ndarray:
+        """
+        Gets the class id of each pcset, indexed by bitmask.
+        :return: An array of 4096 class ids
+        """
+        return np.array(self._class_ids, dtype=np.int16)
+
+    @property
+    def complement_ids(self) -> np.ndarray:
+        """
+        Gets the class id of the abstract complement of each set-class, indexed by class id.
+        :return: An array of 224 class ids
+        """
+        return np.array(self._complement_ids, dtype=np.int16)
+
+    @property
+    def dsyms(self) -> np.ndarray:
+        """
+        Gets the degree of symmetry of each set-class, indexed by class id.
+        :return: An array of degrees of symmetry
+        """
+        return np.array(self._dsyms, dtype=np.int8)
+
+    @property
+    def ic_vectors(self) -> np.ndarray:
+        """
+        Gets the IC vector of each set-class, indexed by class id.
+        :return: An array of shape (224, 6)
+        """
+        return np.array(self._ic_vectors_long, dtype=np.int16)[:, 1:]
+
+    @property
+    def inclusion_matrix(self) -> np.ndarray:
+        """
+        Gets the abstract inclusion matrix. Entry [i, j] is True if set-class j is an abstract
+        subset of set-class i. The matrix is shared, so it is read-only.
+        :return: A boolean array of shape (224, 224)
+        """
+        if self._inclusion_matrix is None:
+            inclusion = self._get_inclusion()
+            self._inclusion_matrix = np.array([[(inclusion[i] >> j) & 1 for j in range(self._num_classes)]
+                                               for i in range(self._num_classes)], dtype=bool)
+            self._inclusion_matrix.flags.writeable = False
+        return self._inclusion_matrix
+
+    @property
+    def invariance_vectors(self) -> np.ndarray:
+        """
+        Gets the invariance vector of each set-class, indexed by class id.
+        :return: An array of shape (224, 8)
+        """
+        return np.array(self._invariance_vectors, dtype=np.int16)
+
+    @property
+    def names_forte(self) -> list:
+        """
+        Gets the Forte name of each set-class, indexed by class id.
+        :return: A list of Forte names
+        """
+        return list(self._names_forte)
+
+    @property
+    def nums_forte(self) -> np.ndarray:
+        """
+        Gets the Forte number (the part of the Forte name after the hyphen) of each set-class, indexed by class id.
+        :return: An array of 224 Forte numbers
+        """
+        return np.array(self._nums_forte, dtype=np.int8)
+
+    @property
+    def subset_class_vectors(self) -> np.ndarray:
+        """
+        Gets the subset-class vector of each set-class. Entry [i, j] is the number of literal subsets
+        of the prime form of set-class i that belong to set-class j (including the empty set and the
+        prime form itself), so row i adds up to 2^n. The matrix is shared, so it is read-only.
+        :return: An integer array of shape (224, 224)
+        """
+        if self._subset_class_vectors is None:
+            masks = np.arange(4096)
+            class_ids = np.array(self._class_ids)
+            vectors = np.zeros((self._num_classes, self._num_classes), dtype=np.int32)
+            for i, bits in enumerate(self._prime_bits[True]):
+                subsets = masks[(masks & bits) == masks]
+                vectors[i] = np.bincount(class_ids[subsets], minlength=self._num_classes)
+            vectors.flags.writeable = False
+            self._subset_class_vectors = vectors
+        return self._subset_class_vectors
+
+    def contains_abstract_subset(self, class_id: int, subset_class_id: int) -> bool:
+        """
+        Determines if a set-class is an abstract subset of another set-class.
+        :param class_id: The class id of the containing set-class
+        :param subset_class_id: The class id of the possible subset-class
+        :return: A boolean
+        """
+        return bool((self._get_inclusion()[class_id] >> subset_class_id) & 1)
+
+    @staticmethod
+    def get() -> 'SetClassTable12':
+        """
+        Gets the shared SetClassTable12, building it on first use.
+        :return: The SetClassTable12
+        """
+        global _set_class_table12
+        if _set_class_table12 is None:
+            _set_class_table12 = SetClassTable12()
+        return _set_class_table12
+
+    def get_abstract_complement_id(self, class_id: int) -> int:
+        """
+        Gets the class id of the abstract complement of a set-class.
+        :param class_id: The class id
+        :return: The class id of the abstract complement
+        """
+        return self._complement_ids[class_id]
+
+    def get_abstract_subset_ids(self, class_id: int) -> list:
+        """
+        Gets the class ids of all abstract subsets of a set-class (including the set-class itself
+        and the empty set-class).
+        :param class_id: The class id
+        :return: A list of class ids in ascending order
+        """
+        inclusion = self._get_inclusion()[class_id]
+        return [i for i in range(self._num_classes) if (inclusion >> i) & 1]
+
+    def get_class_id(self, pcset) -> int:
+        """
+        Gets the class id of a pcset.
+        :param pcset: A pcset (a set of PitchClasses, a PcSet12, or a bitmask)
+        :return: The class id
+        """
+        return self._class_ids[_pcset_bits12(pcset)]
+
+    def get_normalizing_operator(self, pcset, weight_right: bool = True) -> UTO:
+        """
+        Gets a T/I operator that maps a pcset onto the prime form of its set-class.
+        :param pcset: A pcset (a set of PitchClasses, a PcSet12, or a bitmask)
+        :param weight_right: Whether or not the prime form is packed from the right
+        :return: The operator (Tn or TnI)
+        """
+        bits = _pcset_bits12(pcset)
+        return UTO(self._op_t[weight_right][bits], self._op_m[weight_right][bits])
+
+    def get_prime_bits(self, weight_right: bool = True) -> np.ndarray:
+        """
+        Gets the prime form bitmask of each set-class, indexed by class id.
+        :param weight_right: Whether or not the prime forms are packed from the right
+        :return: An array of bitmasks
+        """
+        return np.array(self._prime_bits[weight_right], dtype=np.uint16)
+
+    def get_prime_form(self, pcset, weight_right: bool = True) -> PcSet12:
+        """
+        Gets the prime form of a pcset.
+        :param pcset: A pcset (a set of PitchClasses, a PcSet12, or a bitmask)
+        :param weight_right: Whether or not the prime form is packed from the right
+        :return: The prime form
+        """
+        return _new_pcsetn(self._prime_bits[weight_right][self._class_ids[_pcset_bits12(pcset)]], 12)
+
+    def lookup(self, pcset, weight_right: bool = True) -> dict:
+        """
+        Gets all of the set-class data for a pcset.
+        :param pcset: A pcset (a set of PitchClasses, a PcSet12, or a bitmask)
+        :param weight_right: Whether or not the prime form is packed from the right
+        :return: A dictionary with the class id, prime form, names, IC vectors, degree of symmetry,
+        invariance vector, and normalizing operator
+        """
+        bits = _pcset_bits12(pcset)
+        class_id = self._class_ids[bits]
+        return {
+            "class_id": class_id,
+            "prime_form": _new_pcsetn(self._prime_bits[weight_right][class_id], 12),
+            "name_prime": self._names_prime[weight_right][class_id],
+            "name_forte": self._names_forte[class_id],
+            "name_carter": self._names_carter[class_id],
+            "name_morris": f"({self._names_forte[class_id]}){self._names_prime[weight_right][class_id]}",
+            "num_forte": self._nums_forte[class_id],
+            "ic_vector": self._ic_vectors_long[class_id][1:],
+            "ic_vector_long": list(self._ic_vectors_long[class_id]),
+            "dsym": self._dsyms[class_id],
+            "invariance_vector": list(self._invariance_vectors[class_id]),
+            "operator": UTO(self._op_t[weight_right][bits], self._op_m[weight_right][bits])
+        }
+
+    def _get_inclusion(self) -> list:
+        """
+        Gets the abstract inclusion rows, building them on first use. Row i is an integer
+        with bit j set if set-class j is an abstract subset of set-class i.
+        :return: A list of inclusion rows, indexed by class id
+        """
+        if self._inclusion is None:
+            inclusion = []
+            for bits in self._prime_bits[True]:
+                # Every subset of the prime form belongs to an abstract subset-class
+                row = 1 << self._class_ids[0]
+                subset = bits
+                while subset:
+                    row |= 1 << self._class_ids[subset]
+                    subset = (subset - 1) & bits
+                inclusion.append(row)
+            self._inclusion = inclusion
+        return self._inclusion
+
 
 def get_all_combinatorial_hexachord(name: str) -> SetClass:
     """
@@ -699,6 +1416,8 @@ def get_complement(pcset: set, mod=None) -> set:
     :return: The complement pcset
     *Compatible with all PitchClass modulos
     """
+    if isinstance(pcset, PcSetN):
+        return pcset.complement()
     universal = set()
     if len(pcset) > 0:
         mod = next(iter(pcset)).mod
@@ -717,64 +1436,26 @@ def get_complement_map_utos(pcset: set) -> set:
     Gets all UTOs that map a pcset into its complement.
     :param pcset: A pcset
     :return: A set of UTOs
-    *Compatible with PitchClasses mod 12 and 24
+    *Compatible with all PitchClass modulos
     """
-    utos = set()
-    mod = next(iter(pcset)).mod
-    c = get_complement(pcset)
-    if mod == 12:
-        for i in range(12):
-            tx = UTO(f"T{i}")(pcset)
-            m5x = UTO(f"T{i}M5")(pcset)
-            m7x = UTO(f"T{i}M7")(pcset)
-            m11x = UTO(f"T{i}M11")(pcset)
-            if tx.issubset(c):
-                utos.add(UTO(f"T{i}"))
-            if m5x.issubset(c):
-                utos.add(UTO(f"T{i}M5"))
-            if m7x.issubset(c):
-                utos.add(UTO(f"T{i}M7"))
-            if m11x.issubset(c):
-                utos.add(UTO(f"T{i}M11"))
-    else:
-        uto = transformations.get_utos24()
-        for i in range(24):
-            tx = uto[f"T{i}"].transform(pcset)
-            m5x = uto[f"T{i}M5"].transform(pcset)
-            m7x = uto[f"T{i}M7"].transform(pcset)
-            m11x = uto[f"T{i}M11"].transform(pcset)
-            m13x = uto[f"T{i}M13"].transform(pcset)
-            m17x = uto[f"T{i}M17"].transform(pcset)
-            m19x = uto[f"T{i}M19"].transform(pcset)
-            m23x = uto[f"T{i}M23"].transform(pcset)
-            if tx.issubset(c):
-                utos.add(uto[f"T{i}"])
-            if m5x.issubset(c):
-                utos.add(uto[f"T{i}M5"])
-            if m7x.issubset(c):
-                utos.add(uto[f"T{i}M7"])
-            if m11x.issubset(c):
-                utos.add(uto[f"T{i}M11"])
-            if m13x.issubset(c):
-                utos.add(uto[f"T{i}M13"])
-            if m17x.issubset(c):
-                utos.add(uto[f"T{i}M17"])
-            if m19x.issubset(c):
-                utos.add(uto[f"T{i}M19"])
-            if m23x.issubset(c):
-                utos.add(uto[f"T{i}M23"])
-    return utos
+    return _get_map_utos(pcset, True)
 
 
 def get_corpus(pcset: set) -> set:
     """
     Gets all transformations of a provided pcset.
     :param pcset: A pcset
-    :return: A set of all transformations of the pcset
+    :return: A set of all transformations of the pcset (frozensets, or PcSetNs if a PcSetN is provided)
     *Compatible with all PitchClass modulos
     """
     pcsets = set()
-    if len(pcset) > 0:
+    if isinstance(pcset, PcSetN):
+        if len(pcset) > 0:
+            inverted = pcset.invert()
+            for i in range(pcset.mod):
+                pcsets.add(pcset.transpose(i))
+                pcsets.add(inverted.transpose(i))
+    elif len(pcset) > 0:
         mod = next(iter(pcset)).mod
         for i in range(mod):
             pcsets.add(frozenset(transpose(pcset, i)))
@@ -787,53 +1468,9 @@ def get_self_map_utos(pcset: set) -> set:
     Gets all UTOs that map a pcset into itself.
     :param pcset: A pcset
     :return: A set of UTOs
-    *Compatible with PitchClasses mod 12 and 24
+    *Compatible with all PitchClass modulos
     """
-    utos = set()
-    t = type(next(iter(pcset)))
-    if t == PitchClass:
-        uto = transformations.get_utos12()
-        for i in range(12):
-            tx = uto[f"T{i}"].transform(pcset)
-            m5x = uto[f"T{i}M5"].transform(pcset)
-            m7x = uto[f"T{i}M7"].transform(pcset)
-            m11x = uto[f"T{i}M11"].transform(pcset)
-            if tx == pcset:
-                utos.add(uto[f"T{i}"])
-            if m5x == pcset:
-                utos.add(uto[f"T{i}M5"])
-            if m7x == pcset:
-                utos.add(uto[f"T{i}M7"])
-            if m11x == pcset:
-                utos.add(uto[f"T{i}M11"])
-    else:
-        uto = transformations.get_utos24()
-        for i in range(24):
-            tx = uto[f"T{i}"].transform(pcset)
-            m5x = uto[f"T{i}M5"].transform(pcset)
-            m7x = uto[f"T{i}M7"].transform(pcset)
-            m11x = uto[f"T{i}M11"].transform(pcset)
-            m13x = uto[f"T{i}M13"].transform(pcset)
-            m17x = uto[f"T{i}M17"].transform(pcset)
-            m19x = uto[f"T{i}M19"].transform(pcset)
-            m23x = uto[f"T{i}M23"].transform(pcset)
-            if tx == pcset:
-                utos.add(uto[f"T{i}"])
-            if m5x == pcset:
-                utos.add(uto[f"T{i}M5"])
-            if m7x == pcset:
-                utos.add(uto[f"T{i}M7"])
-            if m11x == pcset:
-                utos.add(uto[f"T{i}M11"])
-            if m13x == pcset:
-                utos.add(uto[f"T{i}M13"])
-            if m17x == pcset:
-                utos.add(uto[f"T{i}M17"])
-            if m19x == pcset:
-                utos.add(uto[f"T{i}M19"])
-            if m23x == pcset:
-                utos.add(uto[f"T{i}M23"])
-    return utos
+    return _get_map_utos(pcset, False)
 
 
 def convert_to_pcset12(pcset: set) -> set:
@@ -862,6 +1499,8 @@ def invert(pcset: set) -> set:
     :return: The inverted pcset
     *Compatible with all PitchClass modulos
     """
+    if isinstance(pcset, PcSetN):
+        return pcset.invert()
     pcset2 = set()
     if len(pcset) > 0:
         for pc in pcset:
@@ -876,13 +1515,88 @@ def is_all_combinatorial_hexachord(pcset: set) -> bool:
     :return: True or False
     *Only compatible with mod 12 SetClasses
     """
-    sc = SetClass(pcset)
-    if sc.name_prime in name_tables["allCombinatorialHexachords"]:
+    table = SetClassTable12.get()
+    if table._names_prime[True][table.get_class_id(pcset)] in name_tables["allCombinatorialHexachords"]:
         return True
     else:
         return False
 
 
+def iter_partitions2(pcset: set, cardinality: int = None):
+    """
+    Lazily generates all partitions of a pcset (size 2 or 1), in the same order as partitions2().
+    The first part of each partition is the part that holds the lowest pc (or the empty part), and
+    the partitions are ordered by their first parts, as in iter_subsets(). Memory use does not
+    depend on the number of partitions. An empty pcset has no partitions.
+    :param pcset: A pcset
+    :param cardinality: If provided, only partitions with a part of this cardinality are generated
+    :return: A generator of (first part, second part) tuples. The parts are PcSetNs if a PcSetN
+    is provided, and sets of PitchClasses otherwise.
+    *Compatible with all PitchClass modulos
+    """
+    n = len(pcset)
+    if n == 0:
+        return
+    half = (n + 1) // 2
+    min_cardinality, max_cardinality = 0, half
+    if cardinality is not None:
+        min_cardinality = min(cardinality, n - cardinality)
+        max_cardinality = min(half, max(cardinality, n - cardinality))
+    elements = sorted(pcset)
+    mod = elements[0].mod
+    full = _bits_from_pcs(elements, mod)
+    for bits, indices in _iter_subset_indices(elements, min_cardinality, max_cardinality):
+        k = len(indices)
+        # The other part comes first if it is also small enough and it is empty or holds the lowest pc
+        if n - k <= half and k > 0 and (k == n or indices[0] != 0):
+            continue
+        if cardinality is not None and k != cardinality and n - k != cardinality:
+            continue
+        if isinstance(pcset, PcSetN):
+            yield _new_pcsetn(bits, mod), _new_pcsetn(full ^ bits, mod)
+        else:
+            first = {elements[i] for i in indices}
+            yield first, {pc for pc in elements if pc not in first}
+
+
+def iter_permutations(pcset: set, cardinality: int = None):
+    """
+    Lazily generates the permutations of a pcset, in the same (lexicographic) order as permutations().
+    Memory use does not depend on the number of permutations, so large enumerations can be piped into
+    filters.
+    :param pcset: A pcset
+    :param cardinality: If provided, only ordered subsets of this length are generated
+    :return: A generator of pcsegs
+    *Compatible with all PitchClass modulos
+    """
+    for permutation in itertools.permutations(sorted(pcset), cardinality):
+        yield list(permutation)
+
+
+def iter_subsets(pcset: set, min_cardinality: int = 0, max_cardinality: int = None):
+    """
+    Lazily generates the subsets of a pcset, in the same order as subsets(): subsets are compared as
+    sorted pcsegs, so the empty set comes first, followed by [0], [0, 1], [0, 1, 2], and so on.
+    Memory use does not depend on the number of subsets, and subsets outside the cardinality
+    range are pruned rather than filtered.
+    :param pcset: A pcset
+    :param min_cardinality: The smallest cardinality to generate
+    :param max_cardinality: The largest cardinality to generate (None for no limit)
+    :return: A generator of subsets. The subsets are PcSetNs if a PcSetN is provided, and sorted
+    lists of PitchClasses otherwise.
+    *Compatible with all PitchClass modulos
+    """
+    elements = sorted(pcset)
+    if max_cardinality is None:
+        max_cardinality = len(elements)
+    if isinstance(pcset, PcSetN):
+        for bits, indices in _iter_subset_indices(elements, min_cardinality, max_cardinality):
+            yield _new_pcsetn(bits, pcset.mod)
+    else:
+        for bits, indices in _iter_subset_indices(elements, min_cardinality, max_cardinality):
+            yield [elements[i] for i in indices]
+
+
 def make12(*args) -> set:
     """
     Makes a chromatic pcset (mod 12).
@@ -928,7 +1642,7 @@ def make_pcset24(*args) -> set:
     return make24(*args)
 
 
-def make_subset_graph(set_class: SetClass, smallest_cardinality: int = 1, show_graph: bool = False, size: tuple = (800, 1100)) -> DiGraph:
+def make_subset_graph(set_class: SetClass, smallest_cardinality: int = 1, show_graph: bool = False, size: tuple = (800, 1100)) -> 'networkx.DiGraph':
     """
     Makes a subset graph.
     :param set_class: A set-class
@@ -937,6 +1651,7 @@ def make_subset_graph(set_class: SetClass, smallest_cardinality: int = 1, show_g
     :param size: The size of the visualized graph
     :return: A graph
     """
+    from networkx import DiGraph
     subset_graph = DiGraph()
     set_classes = list(set_class.get_abstract_subset_classes())
     for sc in set_classes:
@@ -950,6 +1665,7 @@ def make_subset_graph(set_class: SetClass, smallest_cardinality: int = 1, show_g
             if set_classes[i].contains_abstract_subset(set_classes[j]) and len(set_classes[j].pcset) >= smallest_cardinality:
                 subset_graph.add_edge(set_classes[i].name_prime, set_classes[j].name_prime)
     if show_graph:
+        import pyvis.network
         net = pyvis.network.Network(f"{size[0]}px", f"{size[1]}px", directed=True, bgcolor="#eeeeee",
                                     font_color="#333333", heading="Subset Graph")
         net.toggle_hide_edges_on_drag(False)
@@ -972,6 +1688,8 @@ def multiply(pcset: set, n: int) -> set:
     :return: The multiplied pcset
     *Compatible with all PitchClass modulos
     """
+    if isinstance(pcset, PcSetN):
+        return pcset.multiply(n)
     pcset2 = set()
     if len(pcset) > 0:
         for pc in pcset:
@@ -986,76 +1704,20 @@ def partitions2(pcset: set) -> list:
     :return: A list of all partitions
     *Compatible with all PitchClass modulos
     """
-    subs = subsets(pcset)
-    partitions_dict = {}
-    partitions_list = []
-    len_pcset = (len(pcset) + 1) // 2 if len(pcset) % 2 else len(pcset) // 2
-    for sub in subs:
-        if len(sub) <= len_pcset:
-            s = frozenset(sub)
-            d = frozenset(pcset.difference(sub))
-            if d not in partitions_dict:
-                partitions_dict[s] = d
-    for s in partitions_dict:
-        partitions_list.append((set(s), set(partitions_dict[s])))
-    return partitions_list
+    return [(set(first), set(second)) for first, second in iter_partitions2(pcset)]
 
 
 def permutations(pcset: set) -> list:
     """
-    Generates all permutations of a pcset. Uses a swapping notion derived from the Bauer-Mengelberg/Ferentz algorithm
-    for generating all-interval twelve-tone rows.
+    Generates all permutations of a pcset, in lexicographic order.
     Note: The number of permutations will be n! where n is the length of the pcset. The amount of pcsegs is therefore
     O(n!). You may not want to try generating all permutations of a twelve-note set.
-    You have been warned.
+    You have been warned. To process permutations one at a time, use iter_permutations().
     :param pcs: A pcset
     :return: A list of pcsegs
     *Compatible with all PitchClass modulos
     """
-    current_permutation = [pc.pc for pc in pcset]
-    current_permutation.sort()
-    
-    # Determine the type of pitch-class, and the number of possible pitch-classes
-    mod = next(iter(pcset)).mod
-    
-    all_permutations = []  # This will hold the final list of permutations
-    critical_index = 0     # The index of the critical digit
-
-    # This array keeps track of all numbers we have found past the critical index.
-    flags = np.zeros((mod), dtype=np.int8)
-    
-    while critical_index > -1:
-        all_permutations.append([PitchClass(pc, mod) for pc in current_permutation])
-        critical_index = -1
-        next_higher_digit = 0
-        
-        # Examine the permutation to find the critical digit
-        for i in range(len(current_permutation) - 1, 0, -1):
-            flags[current_permutation[i]] = 1
-            
-            # If we've found the critical index
-            if current_permutation[i-1] < current_permutation[i]:
-                flags[current_permutation[i-1]] = 1
-                critical_index = i - 1
-                
-                # Find the next highest number so we can do the swap
-                for j in range(current_permutation[critical_index] + 1, mod):
-                    if flags[j]:
-                        next_higher_digit = j
-                        flags[j] = 0
-                        break
-
-                # Swap the critical digit
-                current_permutation[critical_index] = next_higher_digit
-
-                # Repopulate the permutation
-                for j in range(mod):
-                    if flags[j]:
-                        critical_index += 1
-                        current_permutation[critical_index] = j
-                        flags[j] = 0
-                break
-    return all_permutations
+    return list(iter_permutations(pcset))
 
 
 def set_class_filter12(name: str, sets: list) -> list:
@@ -1077,24 +1739,13 @@ def set_class_filter12(name: str, sets: list) -> list:
 
 def subsets(pcset: set) -> list:
     """
-    Gets all subsets of a pcset, using the bit masking solution from
-    https://afteracademy.com/blog/print-all-subsets-of-a-given-set
+    Gets all subsets of a pcset. To process subsets one at a time, use iter_subsets().
     :param pcset: A pcset
-    :return: A list containing all subsets of the pcset
+    :return: A list containing all subsets of the pcset, as sorted pcsegs
     """
-    total = 2 ** len(pcset)
-    sub = []
-    if total > 1:
-        mod = next(iter(pcset)).mod
-        pcseg = list(pcset)
-        pcseg.sort()
-        for index in range(total):
-            sub.append([])
-            for i in range(len(pcset)):
-                if index & (1 << i):
-                    sub[index].append(PitchClass(pcseg[i].pc, mod))
-        sub.sort()
-    return sub
+    if len(pcset) == 0:
+        return []
+    return list(iter_subsets(set(pcset)))
 
 
 def transform(pcset, string) -> set:
@@ -1107,7 +1758,7 @@ def transform(pcset, string) -> set:
     :param string: The transformation string
     :return: The transformed pcset
     """
-    pcset2 = set.copy(pcset)
+    pcset2 = pcset if isinstance(pcset, PcSetN) else set.copy(pcset)
     i = len(string) - 1
     while i >= 0:
         num = 0
@@ -1135,6 +1786,8 @@ def transpose(pcset: set, n: int) -> set:
     :return: The transposed pcset
     *Compatible with all PitchClass modulos
     """
+    if isinstance(pcset, PcSetN):
+        return pcset.transpose(n)
     pcset2 = set()
     if len(pcset) > 0:
         mod = next(iter(pcset)).mod
@@ -1151,6 +1804,11 @@ def transpositional_combination(pcset1: set, pcset2: set) -> set:
     :return: The TC pcset
     *Compatible with all PitchClass modulos
     """
+    if isinstance(pcset1, PcSetN):
+        bits = 0
+        for pc2 in pcset2:
+            bits |= _rotate_bits(pcset1.bits, pc2.pc, pcset1.mod)
+        return _new_pcsetn(bits, pcset1.mod)
     pcset3 = set()
     if len(pcset1) > 0 and len(pcset2) > 0:
         mod = next(iter(pcset1)).mod
@@ -1176,3 +1834,213 @@ def visualize(pcset: set) -> str:
             else:
                 line += " "
     return line
+
+
+def _bits_from_pcs(pcs, mod: int) -> int:
+    """
+    Converts a collection of PitchClasses or integers to a bitmask.
+    :param pcs: A collection of PitchClasses or integers
+    :param mod: The pitch-class modulo
+    :return: The bitmask
+    """
+    bits = 0
+    for pc in pcs:
+        bits |= 1 << (pc.pc if type(pc) == PitchClass else pc % mod)
+    return bits
+
+
+def _get_map_utos(pcset, complement: bool) -> set:
+    """
+    Gets all UTOs that map a pcset into itself or into its complement. Each multiplication is
+    performed once, and the transpositions are bit rotations of the multiplied bitmask.
+    :param pcset: A set of PitchClasses or a PcSetN
+    :param complement: Whether to map into the complement rather than into the pcset
+    :return: A set of UTOs, taken from the shared UTO catalogue
+    """
+    if isinstance(pcset, PcSetN):
+        bits, mod = pcset.bits, pcset.mod
+    else:
+        mod = next(iter(pcset)).mod if len(pcset) > 0 else 12
+        bits = _bits_from_pcs(pcset, mod)
+    utos = set()
+    multiplied = bits
+    for uto in transformations.get_uto_list(mod):
+        if uto.T == 0:
+            multiplied = _multiply_bits(bits, uto.M, mod)
+        image = _rotate_bits(multiplied, uto.T, mod)
+        if (not image & bits) if complement else image == bits:
+            utos.add(uto)
+    return utos
+
+
+def _ic_vector_long_bits(bits: int, mod: int) -> list:
+    """
+    Computes the long-format IC vector of a pcset bitmask.
+    :param bits: The bitmask
+    :param mod: The pitch-class modulo
+    :return: The IC vector in long format
+    """
+    ic_vector_long = [bits.bit_count()]
+    for i in range(1, mod // 2 + 1):
+        count = (bits & _rotate_bits(bits, i, mod)).bit_count()
+        ic_vector_long.append(count // 2 if 2 * i == mod else count)
+    return ic_vector_long
+
+
+def _invariance_vector_bits12(bits: int) -> list:
+    """
+    Computes the invariance vector of a chromatic pcset bitmask.
+    :param bits: The bitmask
+    :return: The invariance vector
+    """
+    iv = [0, 0, 0, 0, 0, 0, 0, 0]
+    complement = bits ^ 0xFFF
+    forms = [bits, _invert_bits(bits, 12), _multiply_bits(bits, 5, 12), _multiply_bits(bits, 7, 12)]
+    for i in range(12):
+        for j in range(4):
+            image = _rotate_bits(forms[j], i, 12)
+            if image == bits:
+                iv[j] += 1
+            if not image & ~complement:
+                iv[4 + j] += 1
+    return iv
+
+def _invert_bits(bits: int, mod: int) -> int:
+    """
+    Inverts a pcset bitmask (maps bit i to bit -i).
+    :param bits: The bitmask
+    :param mod: The pitch-class modulo
+    :return: The inverted bitmask
+    """
+    # Reversing the bit string maps i to mod - 1 - i, and rotating by 1 maps that to -i.
+    return _rotate_bits(int(f"{bits:0{mod}b}"[::-1], 2), 1, mod)
+
+
+def _iter_subset_indices(elements: list, min_cardinality: int, max_cardinality: int):
+    """
+    Generates the subsets of a sorted list of PitchClasses in lexicographic order, by depth-first search.
+    The index list is reused between subsets, so it must be copied if it is kept.
+    :param elements: A sorted list of PitchClasses
+    :param min_cardinality: The smallest cardinality to generate
+    :param max_cardinality: The largest cardinality to generate
+    :return: A generator of (bitmask, indices) tuples
+    """
+    n = len(elements)
+    indices = []
+    bits = 0
+    start = 0
+    if min_cardinality <= 0 <= max_cardinality:
+        yield bits, indices
+    while True:
+        if start < n and len(indices) < max_cardinality and len(indices) + n - start >= min_cardinality:
+            indices.append(start)
+            bits |= 1 << elements[start].pc
+            start += 1
+            if len(indices) >= min_cardinality:
+                yield bits, indices
+        elif len(indices) > 0:
+            start = indices.pop()
+            bits ^= 1 << elements[start].pc
+            start += 1
+        else:
+            break
+
+
+def _multiply_bits(bits: int, n: int, mod: int) -> int:
+    """
+    Multiplies a pcset bitmask.
+    :param bits: The bitmask
+    :param n: The multiplier
+    :param mod: The pitch-class modulo
+    :return: The multiplied bitmask
+    """
+    if n % mod == 1:
+        return bits
+    new_bits = 0
+    i = 0
+    while bits:
+        if bits & 1:
+            new_bits |= 1 << (i * n % mod)
+        bits >>= 1
+        i += 1
+    return new_bits
+
+
+def _new_pcsetn(bits: int, mod: int) -> PcSetN:
+    """
+    Makes a PcSetN (or PcSet12) directly from a bitmask, without validation.
+    :param bits: The bitmask
+    :param mod: The pitch-class modulo
+    :return: The pcset
+    """
+    pcset = object.__new__(PcSet12 if mod == 12 else PcSetN)
+    pcset._bits = bits
+    pcset._mod = mod
+    return pcset
+
+
+def _pcset_bits12(pcset) -> int:
+    """
+    Gets the bitmask of a chromatic pcset.
+    :param pcset: A set of PitchClasses, a PcSetN, or a bitmask
+    :return: The bitmask
+    """
+    if type(pcset) == int:
+        return pcset
+    elif isinstance(pcset, PcSetN):
+        return pcset.bits
+    else:
+        return _bits_from_pcs(pcset, 12)
+
+
+def _prime_bits(bits: int, mod: int) -> int:
+    """
+    Gets the right-packed prime form of a pcset bitmask, which is the smallest bitmask among its T and TI images.
+    :param bits: The bitmask
+    :param mod: The pitch-class modulo
+    :return: The prime form bitmask
+    """
+    inverted = _invert_bits(bits, mod)
+    return min(min(_rotate_bits(bits, i, mod), _rotate_bits(inverted, i, mod)) for i in range(mod))
+
+
+def _rotate_bits(bits: int, n: int, mod: int) -> int:
+    """
+    Rotates a pcset bitmask (transposes it).
+    :param bits: The bitmask
+    :param n: The index of transposition
+    :param mod: The pitch-class modulo
+    :return: The rotated bitmask
+    """
+    n %= mod
+    return ((bits << n) | (bits >> (mod - n))) & ((1 << mod) - 1)
+
+
+def _subset_class_counts(bits: int, mod: int) -> list:
+    """
+    Counts the literal subsets of a pcset bitmask by set-class, without making any SetClass.
+    Each subset is reduced to the smallest bitmask among its T and TI images, which is the
+    right-packed prime form of its set-class.
+    :param bits: The bitmask
+    :param mod: The pitch-class modulo
+    :return: A list of (prime form bitmask, multiplicity) tuples, ordered by cardinality and then by bitmask
+    """
+    pcs = [pc for pc in range(mod) if bits >> pc & 1]
+    counts = {}
+    if mod <= 64:
+        from pctheory import batch
+        index = np.arange(1 << len(pcs), dtype=np.uint64)
+        subsets = np.zeros_like(index)
+        for i, pc in enumerate(pcs):
+            subsets |= ((index >> np.uint64(i)) & np.uint64(1)) << np.uint64(pc)
+        primes, multiplicities = np.unique(batch.prime_form(subsets, mod), return_counts=True)
+        counts = {int(prime): int(multiplicity) for prime, multiplicity in zip(primes, multiplicities)}
+    else:
+        subset = bits
+        while True:
+            prime = _prime_bits(subset, mod)
+            counts[prime] = counts.get(prime, 0) + 1
+            if subset == 0:
+                break
+            subset = (subset - 1) & bits
+    return sorted(counts.items(), key=lambda item: (item[0].bit_count(), item[0]))
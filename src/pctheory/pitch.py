@@ -24,8 +24,20 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 _hex_map = {0: '0', 1: '1', 2: '2', 3: '3', 4: '4', 5: '5', 6: '6', 7: '7', 8: '8', 9: '9', 10: 'A', 11: 'B', 12: 'C', 13: 'D', 14: 'E', 15: 'F'}
 _reverse_hex_map = {'0': 0, '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, 'A': 10, 'B': 11, 'C': 12, 'D': 13, 'E': 14, 'F': 15}
 
+# Canonical PitchClass instances, keyed by modulo. Each pool holds one instance per pitch-class.
+_pools = {}
+_MAX_POOLED_MOD = 4096
+
+
 class PitchClass:
-    def __init__(self, pc=0, mod: int=12):
+    """
+    Represents a pitch-class. PitchClasses are immutable. For integer modulos up to 4096,
+    PitchClass(pc, mod) returns a shared instance from a pool, so equal PitchClasses are usually
+    the same object.
+    """
+    __slots__ = ("_pc", "_mod", "_hash")
+
+    def __new__(cls, pc=0, mod: int=12):
         """
         Creates a PitchClass
         :param pc: The pitch class (can be an integer or string)
@@ -34,8 +46,23 @@ class PitchClass:
         """
         if type(pc) == str:
             pc = _reverse_hex_map[pc]
-        self._mod = mod
-        self._pc = pc % mod
+        pc %= mod
+        if cls is PitchClass and type(pc) == int:
+            pool = _pools.get(mod)
+            if pool is None and type(mod) == int and mod <= _MAX_POOLED_MOD:
+                pool = _pools[mod] = tuple(cls._make(i, mod) for i in range(mod))
+            if pool is not None:
+                return pool[pc]
+        return cls._make(pc, mod)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return PitchClass, (self._pc, self._mod)
 
     def __add__(self, other):
         if type(other) == PitchClass:
@@ -49,10 +76,12 @@ class PitchClass:
             raise TypeError("PitchClasses can only be added to other PitchClasses of the same modulo, or to integers.")
 
     def __eq__(self, other):
-        if type(other) == PitchClass:
-            return self.pc == other.pc and self._mod == other._mod
+        if self is other:
+            return True
+        elif type(other) == PitchClass:
+            return self._pc == other._pc and self._mod == other._mod
         else:
-            raise TypeError("PitchClasses can only be compared to other PitchClasses.")
+            return NotImplemented
 
     def __ge__(self, other):
         if type(other) == PitchClass:
@@ -73,7 +102,7 @@ class PitchClass:
             raise TypeError("PitchClasses can only be compared to other PitchClasses.")
 
     def __hash__(self):
-        return hash(f"pc{self._pc}-{self._mod}")
+        return self._hash
 
     def __le__(self, other):
         if type(other) == PitchClass:
@@ -105,10 +134,12 @@ class PitchClass:
             raise TypeError("PitchClasses can only be multiplied by other PitchClasses of the same modulo, or by integers.")
 
     def __ne__(self, other):
-        if type(other) == PitchClass:
-            return self.pc != other.pc or self._mod != other._mod
+        if self is other:
+            return False
+        elif type(other) == PitchClass:
+            return self._pc != other._pc or self._mod != other._mod
         else:
-            raise TypeError("PitchClasses can only be compared to other PitchClasses.")
+            return NotImplemented
 
     def __repr__(self):
         # return "<pctheory.pitch.PitchClass object at " + str(id(self)) + ">: " + self.pc_char
@@ -147,13 +178,11 @@ class PitchClass:
     @pc.setter
     def pc(self, value: int):
         """
-        The pitch-class integer
+        The pitch-class integer. PitchClasses are immutable, so this raises an AttributeError.
         :param value: The new pitch-class integer
         :return:
         """
-        self._pc = value % 12
-        if self._pc < 0:
-            self._pc += 12
+        raise AttributeError("Cannot modify a PitchClass. Create a new PitchClass instead.")
 
     @property
     def pc_str(self):
@@ -167,12 +196,31 @@ class PitchClass:
             return f"{self._pc:0>2}"
         else:
             return str(self._pc)
-        
+
+    @classmethod
+    def _make(cls, pc, mod):
+        """
+        Makes a new instance without using the pool
+        :param pc: The pitch-class (already reduced by the modulo)
+        :param mod: The pitch-class modulo
+        :return: The new instance
+        """
+        instance = object.__new__(cls)
+        instance._pc = pc
+        instance._mod = mod
+        instance._hash = hash((pc, mod))
+        return instance
+
 
 class Pitch(PitchClass):
     """
-    Represents a pitch
+    Represents a pitch. Pitches are not pooled, since the pitch space is unbounded.
     """
+    __slots__ = ("_p", "_pname")
+
+    def __new__(cls, p: int=0, pc_mod: int=12, pname: str=0):
+        return super().__new__(cls, p, pc_mod)
+
     def __init__(self, p: int=0, pc_mod: int=12, pname: str=0):
         """
         Creates a Pitch
@@ -180,9 +228,9 @@ class Pitch(PitchClass):
         :param pc_mod: The modulo for the underlying PitchClass
         :param pname: The pitch name as a string (optional, for display purposes)
         """
-        super().__init__(p, pc_mod)
         self._p = p
         self._pname = pname
+        self._hash = hash(p)
 
     def __add__(self, other):
         if type(other) == Pitch:
@@ -195,11 +243,17 @@ class Pitch(PitchClass):
         else:
             raise TypeError("Pitches can only be added to other Pitches of the same PitchClass modulo, or to integers.")
 
+    def __copy__(self):
+        return Pitch(self._p, self._mod, self._pname)
+
+    def __deepcopy__(self, memo):
+        return Pitch(self._p, self._mod, self._pname)
+
     def __eq__(self, other):
         if type(other) == Pitch:
             return self._p == other._p and self._mod == other._mod
         else:
-            raise TypeError("Pitches can only be compared to other Pitches.")
+            return NotImplemented
 
     def __ge__(self, other):
         if type(other) == Pitch:
@@ -220,7 +274,7 @@ class Pitch(PitchClass):
             raise TypeError("Pitches can only be compared to other Pitches.")
 
     def __hash__(self):
-        return hash(f"p{self._p}-{self._mod}")
+        return self._hash
 
     def __le__(self, other):
         if type(other) == Pitch:
@@ -255,7 +309,10 @@ class Pitch(PitchClass):
         if type(other) == Pitch:
             return self._p != other._p or self._mod != other._mod
         else:
-            raise TypeError("Pitches can only be compared to other Pitches.")
+            return NotImplemented
+
+    def __reduce__(self):
+        return Pitch, (self._p, self._mod, self._pname)
 
     def __repr__(self):
         # return "<pctheory.pitch.Pitch object at " + str(id(self)) + ">: " + str(self._p)
@@ -290,8 +347,7 @@ class Pitch(PitchClass):
         :param value: The new pitch integer
         :return:
         """
-        self._p = value
-        self.pc = self._p
+        self._set_p(value)
 
     @property
     def pname(self) -> str:
@@ -330,5 +386,13 @@ class Pitch(PitchClass):
         :param value: The new MIDI version of the pitch integer
         :return:
         """
-        self._p = value - 60
-        self.pc = self._p
+        self._set_p(value - 60)
+
+    def _set_p(self, value):
+        """
+        Updates the pitch integer, along with the pitch-class and the hash
+        :param value: The new pitch integer
+        """
+        self._p = value
+        self._pc = value % self._mod
+        self._hash = hash(value)
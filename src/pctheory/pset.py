@@ -21,18 +21,47 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import transformations, util
+from collections import OrderedDict
+from pctheory import transformations, util
 from pctheory.pitch import Pitch, PitchClass
+import bisect
+import math
 import numpy as np
 import random
+import sys
 
 _rng = random.Random()
 _rng.seed()
 
+# The number of elements to allow in temporary arrays when computing similarity matrices in chunks
+_CHUNK_ELEMENTS = 1 << 22
+
+# Sieves with longer periods than this are evaluated one residue class at a time instead of with a mask
+_MAX_MASK_PERIOD = 1 << 24
+
+# Two unions of residue classes in a Sieve are intersected with the CRT only if they have at most this many pairs
+_MAX_CRT_PAIRS = 4096
+
+# The most recently used realization searches, so that counting, sampling, and enumerating the same
+# realizations share their memoized counts
+_realization_searches = OrderedDict()
+_REALIZATION_SEARCH_CACHE_SIZE = 2
+
 
 class Sieve:
     """
-    Represents a Xenakis sieve. Compatible with all Pitch modulos.
+    Represents a Xenakis sieve. Compatible with all Pitch modulos. A Sieve is an expression of unions (|),
+    intersections (&), and complements (~) of residue classes (modulus, residue). Unions of residue classes
+    are kept in a normal form in which no class contains another and no complete set of sibling classes
+    remains (for example, (4, 0) and (4, 2) become (2, 0)), and intersections of them are computed with the
+    Chinese Remainder Theorem. These reductions are applied only where they do not make the expression
+    larger, so nested expressions are never expanded into exponentially many classes. The expression is
+    compiled into a mask of one period on first use, so membership tests take constant time and ranges
+    take time proportional to the number of pitches returned. (Sieves with very long periods are evaluated
+    one residue class at a time instead.) A Sieve contains no pitches below its base pitch. A union of
+    Sieves with different base pitches has the lower base pitch, and keeps the other Sieve's base pitch as
+    an explicit lower bound on its pitches, so the union is periodic only from its highest bound on. An
+    intersection starts at the higher of the two base pitches.
     """
     def __init__(self, tuples, base_pitch: int, pc_mod=12):
         """
@@ -42,13 +71,28 @@ class Sieve:
         in the sieve - it will just serve as the 0 reference point.
         :param pc_mod: The pitch-class mod of the Sieve
         """
+        self._tree = ("classes", frozenset())
         self._tuples = set()
-        self._intervals = []
+        self._intervals = None
         self._pc_mod = pc_mod
-        self._period = 0
-        self._base_pitch = Pitch(base_pitch, pc_mod)
+        self._period = 1
+        self._bound = 0
+        self._base_p = base_pitch.p if type(base_pitch) == Pitch else base_pitch
+        self._base_pitch = Pitch(self._base_p, pc_mod)
+        self._mask = None
+        self._prefix = None
+        self._residues = None
         self.add_tuples(tuples)
 
+    def __and__(self, other: 'Sieve') -> 'Sieve':
+        return self.intersection(other)
+
+    def __invert__(self) -> 'Sieve':
+        return self.complement()
+
+    def __or__(self, other: 'Sieve') -> 'Sieve':
+        return self.union(other)
+
     @property
     def base_pitch(self) -> Pitch:
         """
@@ -60,9 +104,17 @@ class Sieve:
     @property
     def intervals(self) -> list:
         """
-        The intervallic succession of the Sieve
+        The intervallic succession of the Sieve, between the pitches from the base pitch (or the highest lower
+        bound of a union) to one period above it
         :return: The intervallic succession
+        :raises ValueError: If the period is too long for the succession to be listed
         """
+        if self._intervals is None:
+            self._compile()
+            if self._mask is None:
+                raise ValueError(f"Cannot list the intervals of a Sieve with a period of {self._period}.")
+            ps = _get_periodic_range(self._residues, self._period, self._bound, self._bound + self._period)
+            self._intervals = np.diff(ps).tolist()
         return self._intervals
 
     @property
@@ -76,69 +128,149 @@ class Sieve:
     @property
     def period(self) -> int:
         """
-        The period of the Sieve
+        The period of the Sieve. This is the least period, unless the period is too long to be compiled into a mask.
         :return: The period
         """
+        self._compile()
         return self._period
 
     @property
     def tuples(self) -> set:
         """
-        The tuples in the Sieve
+        The tuples in the Sieve, as a union of residue classes in normal form. For a Sieve built with
+        complements, this expands the expression, which can take exponentially many classes. The Sieve
+        itself is evaluated without the expansion. For a union of Sieves with different base pitches, the
+        tuples describe the pitches from the highest lower bound on.
         :return: The tuples
         """
+        if self._tuples is None:
+            self._tuples = _flatten_node(self._tree)
         return self._tuples
 
     def add_tuples(self, *args):
         """
-        Adds one or more tuples to the Sieve12
-        :param args: One or more tuples
+        Adds one or more tuples to the Sieve
+        :param args: One or more tuples, or a collection of tuples
         :return: None
         """
-        lcm_list = set()
-        if type(args[0]) == set or type(args[0]) == list or type(args[0]) == tuple:
+        if len(args) == 1 and (type(args[0]) == set or type(args[0]) == list or
+                               (type(args[0]) == tuple and len(args[0]) > 0 and type(args[0][0]) == tuple)):
             args = args[0]
-        for tup in args:
-            self._tuples.add(tup)
-        for tup in self._tuples:
-            lcm_list.add(tup[0])
-        self._period = util.lcm(lcm_list)
-        r = self.get_range(Pitch(self._base_p, self._pc_mod), Pitch(self._base_p + self._period, self._pc_mod))
-        r = list(r)
-        r.sort()
-        for i in range(1, len(r)):
-            self._intervals.append(r[i].p - r[i - 1].p)
-
-    def get_range(self, p0, p1) -> set:
+        self._set_tree(_unite_nodes(self._tree, ("classes", frozenset(_simplify_residue_classes(args)))))
+
+    def complement(self) -> 'Sieve':
+        """
+        Complements the Sieve
+        :return: A new Sieve with the same base pitch, containing the pitches at or above the base pitch
+        that are not in this Sieve
+        """
+        return Sieve._from_tree(_complement_node(self._tree), self._base_p, self._pc_mod)
+
+    @staticmethod
+    def from_pitches(pitches, max_modulus: int = None, p0=None, p1=None, pc_mod: int = 12) -> 'Sieve':
+        """
+        Decomposes a pset into a Sieve that reproduces it exactly between p0 and p1. For each modulus in
+        turn, a single pass over the range finds the residue classes whose pitches in the range all belong
+        to the pset, and each pitch is assigned the smallest modulus of a class that contains it (stopping
+        once every pitch has one). The largest of these classes are then chosen greedily to cover the
+        pset, and classes made redundant by the others are dropped. The result is irredundant (no class
+        can be removed), but it is a greedy approximation, not a minimum: finding the fewest classes is a
+        set cover problem, and a smaller union may exist.
+        :param pitches: A pset, or a list or NumPy array of pitch integers
+        :param max_modulus: The largest modulus to use (if None, the length of the range)
+        :param p0: The low pitch of the range (if None, the lowest pitch). This is the base pitch of the Sieve.
+        :param p1: The high pitch of the range (if None, the highest pitch)
+        :param pc_mod: The pitch-class mod of the Sieve (a pset uses its own modulo)
+        :return: A Sieve whose pitches between p0 and p1 are the pset
+        :raises ValueError: If the pset cannot be decomposed with moduli up to max_modulus, or if a pitch is outside the range
+        """
+        if isinstance(pitches, (set, frozenset, list)) and len(pitches) > 0 and type(next(iter(pitches))) == Pitch:
+            pc_mod = next(iter(pitches)).mod
+            pitches = [p.p for p in pitches]
+        pitches = np.unique(np.asarray(pitches, dtype=np.int64))
+        if len(pitches) == 0:
+            return Sieve(set(), 0 if p0 is None else (p0.p if type(p0) == Pitch else p0), pc_mod)
+        p_low = int(pitches[0]) if p0 is None else (p0.p if type(p0) == Pitch else p0)
+        p_high = int(pitches[-1]) if p1 is None else (p1.p if type(p1) == Pitch else p1)
+        if pitches[0] < p_low or pitches[-1] > p_high:
+            raise ValueError("The pitches must lie between p0 and p1.")
+        length = p_high - p_low + 1
+        present = np.zeros(length, dtype=bool)
+        present[pitches - p_low] = True
+        moduli = np.zeros(length, dtype=np.int64)
+        remaining = len(pitches)
+        for modulus in range(1, length + 1 if max_modulus is None else min(max_modulus, length) + 1):
+            # A class is usable if the range has no gap in it. Padding with True lets the range be cut into rows.
+            rows = -(-length // modulus)
+            padded = np.ones(rows * modulus, dtype=bool)
+            padded[:length] = present
+            usable = np.tile(padded.reshape(rows, modulus).all(axis=0), rows)[:length] & (moduli == 0)
+            if usable.any():
+                moduli[usable] = modulus
+                remaining -= np.count_nonzero(usable)
+                if remaining == 0:
+                    break
+        if remaining > 0:
+            raise ValueError(f"The pitches cannot be decomposed into residue classes with moduli up to {max_modulus}.")
+
+        # Cover the pitches with the largest classes first, then drop classes that the others cover
+        offsets = np.flatnonzero(present)
+        candidates = sorted({(m, r % m) for m, r in zip(moduli[offsets].tolist(), offsets.tolist())})
+        counts = np.zeros(length, dtype=np.int64)
+        chosen = []
+        for modulus, residue in candidates:
+            if counts[residue::modulus].min() == 0:
+                counts[residue::modulus] += 1
+                chosen.append((modulus, residue))
+        t = set()
+        for modulus, residue in reversed(chosen):
+            if counts[residue::modulus].min() > 1:
+                counts[residue::modulus] -= 1
+            else:
+                t.add((modulus, residue))
+        return Sieve(t, p_low, pc_mod)
+
+    def get_range(self, p0, p1, as_array: bool = False):
         """
         Gets all pitches in the sieve between p0 and p1
         :param p0: The low pitch
         :param p1: The high pitch
-        :return: A pset
-        """
-        ps = set()
-        p_low = p0.p if type(p0) == Pitch else p0
-        p_high = p1.p + 1 if type(p1) == Pitch else p1 + 1
-        for j in range(p_low, p_high):
-            i = j - self._base_p
-            if i >= 0:
-                for tup in self._tuples:
-                    if i % tup[0] == tup[1]:
-                        ps.add(Pitch(j, self._pc_mod))
-        return ps
+        :param as_array: Whether to return a sorted NumPy array of pitch integers instead of a pset
+        :return: A pset (or a NumPy array)
+        """
+        p_low = max(p0.p if type(p0) == Pitch else p0, self._base_p) - self._base_p
+        p_high = (p1.p if type(p1) == Pitch else p1) - self._base_p
+        ps = np.zeros(0, dtype=np.int64)
+        self._compile()
+        if p_high >= p_low and self._mask is not None:
+            # Below the bound, the pitches are not periodic
+            ps = np.concatenate([np.flatnonzero(self._prefix[p_low:p_high + 1]) + p_low,
+                                 _get_periodic_range(self._residues, self._period, max(p_low, self._bound), p_high)])
+            ps += self._base_p
+        elif p_high >= p_low and self._tree[0] == "classes":
+            ps = np.unique(np.concatenate([ps] + [np.arange(p_low + (residue - p_low) % modulus, p_high + 1, modulus)
+                                                  for modulus, residue in self._tree[1]])) + self._base_p
+        elif p_high >= p_low:
+            # Evaluate the expression over the range, a chunk at a time
+            chunks = [ps]
+            for start in range(p_low, p_high + 1, _CHUNK_ELEMENTS):
+                length = min(_CHUNK_ELEMENTS, p_high + 1 - start)
+                chunks.append(np.flatnonzero(_evaluate_node(self._tree, start, length)) + start)
+            ps = np.concatenate(chunks) + self._base_p
+        if as_array:
+            return ps
+        return {Pitch(p, self._pc_mod) for p in ps.tolist()}
 
     def intersection(self, sieve) -> 'Sieve':
         """
         Intersects two Sieves
         :param sieve: A Sieve
-        :return: A new Sieve. It will have the same base pitch as self.
+        :return: A new Sieve. It will have the higher of the two base pitches, since neither Sieve has pitches
+        below its own base pitch.
         """
-        t = set()
-        for tup1 in self._tuples:
-            for tup2 in sieve.tuples:
-                if tup1 == tup2:
-                    t.add(tup1)
-        return Sieve(t, self._base_pitch, self._pc_mod)
+        base_p = max(self._base_p, sieve.base_pitch.p)
+        return Sieve._from_tree(_intersect_nodes(_shift_node(self._tree, self._base_p - base_p),
+                                                 _shift_node(sieve._tree, sieve._base_p - base_p)), base_p, self._pc_mod)
 
     def is_in_sieve(self, p) -> bool:
         """
@@ -153,30 +285,81 @@ class Sieve:
             ps = {p}
         elif type(p) == int:
             ps = {Pitch(p, self._pc_mod)}
+        self._compile()
         for q in ps:
             i = q.p - self._base_p
             if i < 0:
                 return False
-            else:
-                for tup in self._tuples:
-                    if i % tup[0] == tup[1]:
-                        break
-                else:
+            elif self._mask is not None and i < self._bound:
+                if not self._prefix[i]:
                     return False
+            elif self._mask is not None:
+                if not self._mask[i % self._period]:
+                    return False
+            elif not _evaluate_node(self._tree, i, 1)[0]:
+                return False
         return True
 
     def union(self, sieve) -> 'Sieve':
         """
         Unions two Sieves
         :param sieve: A Sieve
-        :return: A new Sieve. It will have the same base pitch as self.
+        :return: A new Sieve. It will have the lower of the two base pitches. Neither Sieve has pitches below
+        its own base pitch, so the higher base pitch is kept as a lower bound on the pitches of that Sieve.
         """
-        t = set()
-        for tup in self._tuples:
-            t.add(tup)
-        for tup in sieve.tuples:
-            t.add(tup)
-        return Sieve(t, self._base_pitch, self._pc_mod)
+        base_p = min(self._base_p, sieve.base_pitch.p)
+        trees = []
+        for tree, shift in [(self._tree, self._base_p - base_p), (sieve._tree, sieve._base_p - base_p)]:
+            trees.append(("from", shift, _shift_node(tree, shift)) if shift > 0 else tree)
+        return Sieve._from_tree(_unite_nodes(*trees), base_p, self._pc_mod)
+
+    def _compile(self):
+        """
+        Evaluates the expression over one period into a mask, if this has not been done yet and the period
+        is not too long. The period is then reduced if the mask repeats more often than the moduli do.
+        The offsets below the bound are evaluated into a separate prefix.
+        :return: None
+        """
+        if self._mask is None and self._period <= _MAX_MASK_PERIOD:
+            mask = _evaluate_node(self._tree, self._bound, self._period)
+            for q in set(util.factor(self._period)) - {1}:
+                while self._period % q == 0 and np.all(mask.reshape(q, -1) == mask[:self._period // q]):
+                    self._period //= q
+                    mask = mask[:self._period]
+            # Index the mask by offset modulo the period
+            self._mask = np.roll(mask, self._bound)
+            self._prefix = _evaluate_node(self._tree, 0, self._bound)
+            self._residues = np.flatnonzero(self._mask)
+
+    @staticmethod
+    def _from_tree(tree, base_p: int, pc_mod: int) -> 'Sieve':
+        """
+        Makes a Sieve from an expression tree
+        :param tree: The expression tree
+        :param base_p: The base pitch, as an integer
+        :param pc_mod: The pitch-class mod of the Sieve
+        :return: The Sieve
+        """
+        sieve = Sieve(set(), base_p, pc_mod)
+        sieve._set_tree(tree)
+        return sieve
+
+    def _set_tree(self, tree):
+        """
+        Replaces the expression tree of the Sieve
+        :param tree: The expression tree. Each node is a tuple: ("classes", frozenset of (modulus, residue) tuples)
+        for a union of residue classes in normal form, ("union", children), ("intersection", children),
+        ("complement", child), or ("from", start, child) for the offsets of child that are at least start.
+        :return: None
+        """
+        self._tree = tree
+        self._tuples = set(tree[1]) if tree[0] == "classes" else None
+        self._period = util.lcm(_get_node_moduli(tree))
+        self._bound = _get_node_bound(tree)
+        self._intervals = None
+        self._mask = None
+        self._prefix = None
+        self._residues = None
 
 
 def calculate_pm_similarity(pset1: set, pset2: set, ic_roster1=None, ic_roster2=None) -> tuple:
@@ -190,30 +373,51 @@ def calculate_pm_similarity(pset1: set, pset2: set, ic_roster1=None, ic_roster2=
     *Compatible with all Pitch modulos
     """
     cint = len(pset1.intersection(pset2))
-    ic_shared = 0
     if ic_roster1 is None:
         ic_roster1 = get_ic_roster(pset1)
     if ic_roster2 is None:
         ic_roster2 = get_ic_roster(pset2)
-    for ic in ic_roster1:
-        if ic in ic_roster2:
-            if ic_roster1[ic] < ic_roster2[ic]:
-                ic_shared += ic_roster1[ic]
-            else:
-                ic_shared += ic_roster2[ic]
+    ic_shared = sum(min(count, ic_roster2[ic]) for ic, count in ic_roster1.items() if ic in ic_roster2)
     return (cint, ic_shared)
 
 
+def count_pset_realizations(pcset: set, lower_boundary: int, upper_boundary: int, num_duplicate_pitches: int = 0,
+                            max_span: int = None, min_spacing: int = None, max_spacing: int = None, bass=None,
+                            doubled_pcs: set = None) -> int:
+    """
+    Counts the pset realizations of a pcset within the specified boundaries that satisfy the given constraints.
+    A realization contains every pc of the pcset at least once. The count is computed from memoized partial
+    realizations, not by enumeration.
+    :param pcset: The pcset to realize
+    :param lower_boundary: The lower boundary
+    :param upper_boundary: The upper boundary
+    :param num_duplicate_pitches: The number of additional duplicate pitches to include (for doubling)
+    :param max_span: The largest distance between the lowest and highest pitches (None for no limit)
+    :param min_spacing: The smallest distance between adjacent pitches (None for no limit)
+    :param max_spacing: The largest distance between adjacent pitches (None for no limit)
+    :param bass: The lowest pitch, as a Pitch, or the pc of the lowest pitch, as a PitchClass (None for any)
+    :param doubled_pcs: The pcs that may appear in more than one register (None for all pcs)
+    :return: The number of realizations
+    :raises ValueError: If the number of duplicate pitches or a distance is negative
+    *Compatible with all Pitch modulos
+    """
+    return _get_realization_search(pcset, lower_boundary, upper_boundary, num_duplicate_pitches, max_span, min_spacing,
+                                   max_spacing, bass, doubled_pcs).count()
+
+
 def generate_random_pset_realizations(pcset: set, lower_boundary: int, upper_boundary: int, num_realizations: int=1, num_duplicate_pitches: int=0, filter_func=None):
     """
     Generates random pset realizations of a given pcset, 
-    within the specified upper and lower boundaries
+    within the specified upper and lower boundaries. Realizations are drawn uniformly and without repetition
+    from the valid realizations, so fewer are returned only if fewer exist. Pcs with no register in the
+    range are left out. For declarative constraints, use sample_pset_realizations().
     :param pcset: The pcset to realize
     :param lower_boundary: The lower boundary
     :param upper_boundary: The upper boundary
     :param num_realizations: The number of random realizations to generate
     :param num_duplicate_pitches: The number of additional duplicate pitches to include (for doubling)
-    :param filter_func: A function for filtering the pset realizations to force them to match specified criteria
+    :param filter_func: A function for filtering the pset realizations to force them to match specified criteria.
+    It is applied after a realization is drawn, so at most 10 * num_realizations realizations are tried.
     :return: One or more random pset realizations of the pcset within the given boundaries. If the number of realizations
     is greater than 1, returns a list of psets. Otherwise returns a single pset.
     *Compatible with all Pitch modulos
@@ -222,48 +426,20 @@ def generate_random_pset_realizations(pcset: set, lower_boundary: int, upper_bou
         return set()
     else:
         mod = next(iter(pcset)).mod
-        lowest_boundary_note = lower_boundary % mod
-        
-        # Generate all of the possible pitch realizations for each pitch-class
-        # within the range provided
-        pitch_choices = []
-        for pc in pcset:
-            choices = []
-            candidate_pitch = (pc.pc - lowest_boundary_note) % mod + lower_boundary           
-            in_range = True
-            while in_range:
-                if candidate_pitch > upper_boundary:
-                    in_range = False
-                else:
-                    choices.append(Pitch(candidate_pitch, mod))
-                candidate_pitch += mod
-            pitch_choices.append(choices)
-
-        # Generate pset realizations
-        realizations = {}
-        i = 0
-        while len(realizations) < num_realizations and i < 10 * num_realizations:
-            # Build the current realization
-            realization = set()
-            unused_pitches = []
-            for bucket in pitch_choices:
-                if len(bucket) > 0:
-                    idx = _rng.randrange(0, len(bucket))
-                    realization.add(bucket[idx])
-                    unused_pitches += bucket[:idx] + bucket[idx+1:]
-
-            # Add duplicate pitches 
-            for i in range(num_duplicate_pitches):
-                idx = _rng.randrange(0, len(unused_pitches))
-                realization.add(unused_pitches[idx])
-                del unused_pitches[idx]
-
-            if filter_func is None:
-                realizations[str(realization)] = realization
-            elif filter_func(realization):
-                realizations[str(realization)] = realization
-            i += 1
-        realizations = [realizations[key] for key in realizations]
+        pcset = {pc for pc in pcset if (pc.pc - lower_boundary) % mod + lower_boundary <= upper_boundary}
+        search = _get_realization_search(pcset, lower_boundary, upper_boundary, num_duplicate_pitches)
+        count = search.count()
+        if filter_func is None:
+            ranks = _sample_ranks(count, min(num_realizations, count))
+        else:
+            ranks = _sample_ranks(count, min(10 * num_realizations, count))
+        realizations = []
+        for rank in ranks:
+            if len(realizations) == num_realizations:
+                break
+            realization = {Pitch(p, mod) for p in search.unrank(rank)}
+            if filter_func is None or filter_func(realization):
+                realizations.append(realization)
 
         if len(realizations) == 1:
             return realizations[0]
@@ -294,36 +470,25 @@ def get_ic_matrix(pset: set) -> np.ndarray:
     """
     Gets the pitch ic-matrix
     :param pset: The pset
-    :return: The ic-matrix as a list of lists
+    :return: The ic-matrix, as an integer array whose rows and columns are the pitches in ascending order
     *Compatible with all Pitch modulos
     """
-    mx = np.empty((len(pset), len(pset)))
-    pseg = list(pset)
-    pseg.sort()
-    for i in range(mx.shape[0]):
-        for j in range(mx.shape[1]):
-            mx[i][j] = abs(pseg[i].p - pseg[j].p)
-    return mx
+    ps = _get_pitch_array(pset)
+    return np.abs(ps[:, None] - ps[None, :])
 
 
 def get_ic_roster(pset: set) -> dict:
     """
     Gets the pitch ic-roster
     :param pset: The pset
-    :return: The ic-roster as a dictionary
+    :return: The ic-roster as a dictionary, in ascending order of ic
     *Compatible with all Pitch modulos
     """
-    pseg = list(pset)
-    roster = {}
-    pseg.sort()
-    for i in range(len(pseg) - 1, -1, -1):
-        for j in range(i - 1, -1, -1):
-            interval = abs(pseg[i].p - pseg[j].p)
-            if interval not in roster:
-                roster[interval] = 1
-            else:
-                roster[interval] += 1
-    return roster
+    ps = _get_pitch_array(pset)
+    i, j = np.triu_indices(len(ps), 1)
+    counts = np.bincount(ps[j] - ps[i])
+    ics = np.flatnonzero(counts)
+    return dict(zip(ics.tolist(), counts[ics].tolist()))
 
 
 def get_pcint_class(pset: set) -> list:
@@ -343,6 +508,24 @@ def get_pcint_class(pset: set) -> list:
     return intlist
 
 
+def get_pm_similarity_matrix(psets: list, chunk_size: int = None) -> tuple:
+    """
+    Computes the pitch-measure (PM) similarity for all pairs of psets at once
+    :param psets: A list of psets
+    :param chunk_size: The number of rows to compute at a time. If None, a chunk size is chosen to keep
+    temporary arrays small.
+    :return: Two integer arrays of shape (N, N): the number of common pitches, and the number of shared ics.
+    Entry [i, j] compares psets[i] and psets[j], as in calculate_pm_similarity().
+    *Compatible with all Pitch modulos
+    """
+    common = np.empty((len(psets), len(psets)), dtype=np.int64)
+    shared = np.empty((len(psets), len(psets)), dtype=np.int64)
+    for start, common_rows, shared_rows in iter_pm_similarity_matrix(psets, chunk_size):
+        common[start:start + common_rows.shape[0]] = common_rows
+        shared[start:start + shared_rows.shape[0]] = shared_rows
+    return common, shared
+
+
 def get_set_class(pset: set) -> list:
     """
     Gets the set-class of a pset
@@ -373,6 +556,116 @@ def invert(pset: set) -> set:
     return pset2
 
 
+def iter_pm_similarity_matrix(psets: list, chunk_size: int = None):
+    """
+    Computes a PM similarity matrix one chunk of rows at a time. Each pset is encoded as a 0/1 row over all
+    the pitches in the list, and its ic-roster as a 0/1 row with a column for each (ic, k) meaning "has the
+    ic at least k times", so common pitches and shared ics (the sum of the smaller count of each ic)
+    are both matrix products.
+    :param psets: A list of psets
+    :param chunk_size: The number of rows in each chunk. If None, a chunk size is chosen to keep
+    temporary arrays small.
+    :return: A generator of (start, common, shared) tuples, where common and shared are integer arrays of
+    shape (chunk_size, N) holding rows start to start + chunk_size of the two matrices
+    *Compatible with all Pitch modulos
+    """
+    if chunk_size is None:
+        chunk_size = max(1, _CHUNK_ELEMENTS // max(1, len(psets)))
+    elif type(chunk_size) != int or chunk_size < 1:
+        raise ValueError("The chunk size must be a positive integer.")
+    arrays = [_get_pitch_array(pset) for pset in psets]
+    rows = np.repeat(np.arange(len(psets)), [len(ps) for ps in arrays])
+    pitches = np.concatenate(arrays + [np.zeros(0, dtype=np.int64)])
+    pitch_columns = np.unique(pitches, return_inverse=True)[1].reshape(-1)
+    pitch_matrix = np.zeros((len(psets), pitch_columns.max(initial=-1) + 1))
+    pitch_matrix[rows, pitch_columns] = 1
+
+    # Count each (pset, ic) pair, then give the kth occurrence of each ic its own column
+    ic_rows = []
+    ics = []
+    for index, ps in enumerate(arrays):
+        i, j = np.triu_indices(len(ps), 1)
+        ic_rows.append(np.full(len(i), index))
+        ics.append(ps[j] - ps[i])
+    pairs, counts = np.unique(np.stack((np.concatenate(ic_rows + [np.zeros(0, dtype=np.int64)]),
+                                        np.concatenate(ics + [np.zeros(0, dtype=np.int64)]))), axis=1, return_counts=True)
+    distinct_ics, ic_columns = np.unique(pairs[1], return_inverse=True)
+    widths = np.zeros(len(distinct_ics), dtype=np.int64)
+    np.maximum.at(widths, ic_columns, counts)
+    offsets = np.cumsum(widths) - widths
+    layer_rows = np.repeat(pairs[0], counts)
+    layer_columns = np.repeat(offsets[ic_columns] - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+    ic_matrix = np.zeros((len(psets), widths.sum()))
+    ic_matrix[layer_rows, layer_columns] = 1
+
+    for start in range(0, len(psets), chunk_size):
+        stop = min(start + chunk_size, len(psets))
+        yield (start, np.rint(pitch_matrix[start:stop] @ pitch_matrix.T).astype(np.int64),
+               np.rint(ic_matrix[start:stop] @ ic_matrix.T).astype(np.int64))
+
+
+def iter_pset_realizations(pcset: set, lower_boundary: int, upper_boundary: int, num_duplicate_pitches: int = 0,
+                           max_span: int = None, min_spacing: int = None, max_spacing: int = None, bass=None,
+                           doubled_pcs: set = None, filter_func=None):
+    """
+    Lazily generates every pset realization of a pcset within the specified boundaries that satisfies the given
+    constraints. A realization contains every pc of the pcset at least once. Pitches are chosen from low to high
+    and the constraints are checked as each pitch is chosen, so the search never enters a branch without a valid
+    realization. Realizations are generated in ascending order, comparing them as sorted psegs.
+    :param pcset: The pcset to realize
+    :param lower_boundary: The lower boundary
+    :param upper_boundary: The upper boundary
+    :param num_duplicate_pitches: The number of additional duplicate pitches to include (for doubling)
+    :param max_span: The largest distance between the lowest and highest pitches (None for no limit)
+    :param min_spacing: The smallest distance between adjacent pitches (None for no limit)
+    :param max_spacing: The largest distance between adjacent pitches (None for no limit)
+    :param bass: The lowest pitch, as a Pitch, or the pc of the lowest pitch, as a PitchClass (None for any)
+    :param doubled_pcs: The pcs that may appear in more than one register (None for all pcs)
+    :param filter_func: A function for filtering complete realizations, for criteria that cannot be declared
+    :return: A generator of psets
+    :raises ValueError: If the number of duplicate pitches or a distance is negative
+    *Compatible with all Pitch modulos
+    """
+    search = _get_realization_search(pcset, lower_boundary, upper_boundary, num_duplicate_pitches, max_span,
+                                     min_spacing, max_spacing, bass, doubled_pcs)
+    mod = next(iter(pcset)).mod if len(pcset) > 0 else 12
+    for pitches in search:
+        realization = {Pitch(p, mod) for p in pitches}
+        if filter_func is None or filter_func(realization):
+            yield realization
+
+
+def iter_subsets(pset: set, min_cardinality: int = 0, max_cardinality: int = None):
+    """
+    Lazily generates the subsets of a pset, in the same order as subsets(): subsets are compared as
+    sorted psegs, so the empty set comes first. Memory use does not depend on the number of subsets,
+    and subsets outside the cardinality range are pruned rather than filtered.
+    :param pset: A pset
+    :param min_cardinality: The smallest cardinality to generate
+    :param max_cardinality: The largest cardinality to generate (None for no limit)
+    :return: A generator of subsets, as sorted lists of Pitches
+    *Compatible with all Pitch modulos
+    """
+    pseg = sorted(pset)
+    n = len(pseg)
+    if max_cardinality is None:
+        max_cardinality = n
+    indices = []
+    start = 0
+    if min_cardinality <= 0 <= max_cardinality:
+        yield []
+    while True:
+        if start < n and len(indices) < max_cardinality and len(indices) + n - start >= min_cardinality:
+            indices.append(start)
+            start += 1
+            if len(indices) >= min_cardinality:
+                yield [Pitch(pseg[i].p, pseg[i].mod) for i in indices]
+        elif len(indices) > 0:
+            start = indices.pop() + 1
+        else:
+            break
+
+
 def make_pset12(*args) -> set:
     """
     Makes a pset
@@ -397,26 +690,42 @@ def make_pset24(*args) -> set:
     return {Pitch(p, 24) for p in args}
 
 
+def sample_pset_realizations(pcset: set, lower_boundary: int, upper_boundary: int, num_realizations: int = 1,
+                             num_duplicate_pitches: int = 0, max_span: int = None, min_spacing: int = None,
+                             max_spacing: int = None, bass=None, doubled_pcs: set = None) -> list:
+    """
+    Samples pset realizations of a pcset within the specified boundaries that satisfy the given constraints.
+    The realizations are drawn uniformly and without repetition from all valid realizations. Each one is built
+    directly from the realization counts, so no draws are rejected.
+    :param pcset: The pcset to realize
+    :param lower_boundary: The lower boundary
+    :param upper_boundary: The upper boundary
+    :param num_realizations: The number of realizations to sample. If fewer exist, all of them are returned.
+    :param num_duplicate_pitches: The number of additional duplicate pitches to include (for doubling)
+    :param max_span: The largest distance between the lowest and highest pitches (None for no limit)
+    :param min_spacing: The smallest distance between adjacent pitches (None for no limit)
+    :param max_spacing: The largest distance between adjacent pitches (None for no limit)
+    :param bass: The lowest pitch, as a Pitch, or the pc of the lowest pitch, as a PitchClass (None for any)
+    :param doubled_pcs: The pcs that may appear in more than one register (None for all pcs)
+    :return: A list of psets, in random order
+    :raises ValueError: If the number of duplicate pitches or a distance is negative
+    *Compatible with all Pitch modulos
+    """
+    search = _get_realization_search(pcset, lower_boundary, upper_boundary, num_duplicate_pitches, max_span,
+                                     min_spacing, max_spacing, bass, doubled_pcs)
+    count = search.count()
+    mod = next(iter(pcset)).mod if len(pcset) > 0 else 12
+    return [{Pitch(p, mod) for p in search.unrank(rank)} for rank in _sample_ranks(count, min(num_realizations, count))]
+
+
 def subsets(pset: set) -> list:
     """
-    Gets all subsets of a pset, using the bit masking solution from
-    https://afteracademy.com/blog/print-all-subsets-of-a-given-set
+    Gets all subsets of a pset. To process subsets one at a time, use iter_subsets().
     :param pset: A pset
-    :return: A list containing all subsets of the pset
+    :return: A list containing all subsets of the pset, as sorted psegs
     *Compatible with all Pitch modulos
     """
-    total = 2 ** len(pset)
-    t = type(next(iter(pset)))
-    sub = []
-    pseg = list(pset)
-    pseg.sort()
-    for index in range(total):
-        sub.append([])
-        for i in range(len(pset)):
-            if index & (1 << i):
-                sub[index].append(t(pseg[i].p))
-    sub.sort()
-    return sub
+    return list(iter_subsets(pset))
 
 
 def to_pcset(pset: set) -> set:
@@ -463,3 +772,517 @@ def transpose(pset: set, n: int) -> set:
         for p in pset:
             pset2.add(Pitch(p.p + n, mod))
     return pset2
+
+
+class _RealizationSearch:
+    """
+    Counts, enumerates, and unranks the pset realizations of a pcset under a set of constraints. Pitches are
+    chosen from low to high. The number of ways to complete a partial realization depends only on its last
+    pitch, its size, the pcs it covers, and its span limit, so these counts are memoized. Below the top of the
+    range, only the pc of the last pitch and its distance to the limit matter, so realizations that start an
+    octave apart share their counts. A realization's rank is its position in ascending order.
+    """
+    def __init__(self, pcset: set, lower_boundary: int, upper_boundary: int, num_duplicate_pitches: int = 0,
+                 max_span: int = None, min_spacing: int = None, max_spacing: int = None, bass=None,
+                 doubled_pcs: set = None):
+        """
+        Creates a realization search
+        :param pcset: The pcset to realize
+        :param lower_boundary: The lower boundary
+        :param upper_boundary: The upper boundary
+        :param num_duplicate_pitches: The number of additional duplicate pitches
+        :param max_span: The largest distance between the lowest and highest pitches
+        :param min_spacing: The smallest distance between adjacent pitches
+        :param max_spacing: The largest distance between adjacent pitches
+        :param bass: The lowest Pitch, or the PitchClass of the lowest pitch
+        :param doubled_pcs: The pcs that may appear in more than one register
+        :raises ValueError: If the number of duplicate pitches or a distance is negative
+        """
+        if num_duplicate_pitches < 0 or any(x is not None and x < 0 for x in [max_span, min_spacing, max_spacing]):
+            raise ValueError("The number of duplicate pitches and the distances must be nonnegative.")
+        mod = next(iter(pcset)).mod if len(pcset) > 0 else 12
+        self._mod = mod
+        index = {pc: i for i, pc in enumerate(sorted({pc.pc for pc in pcset}))}
+        doubled = set(index) if doubled_pcs is None else {pc.pc for pc in doubled_pcs}
+        self._pitches = [p for p in range(lower_boundary, upper_boundary + 1) if p % mod in index]
+        self._bits = [1 << index[p % mod] for p in self._pitches]
+        self._doubled = [p % mod in doubled for p in self._pitches]
+        self._full = (1 << len(index)) - 1
+        self._size = len(index) + num_duplicate_pitches
+        self._max_span = max_span
+        self._min_spacing = 1 if min_spacing is None else max(min_spacing, 1)
+        self._max_spacing = max_spacing
+        if bass is None:
+            self._starts = list(range(len(self._pitches)))
+        elif type(bass) == Pitch:
+            self._starts = [j for j, p in enumerate(self._pitches) if p == bass.p]
+        else:
+            self._starts = [j for j, p in enumerate(self._pitches) if p % mod == bass.pc]
+        self._counts = {}
+
+    def __iter__(self):
+        if self._size == 0:
+            yield []
+            return
+        path = []
+        for j in self._starts:
+            limit = self._get_limit(j)
+            if self._count_from(j, 1, self._bits[j], limit) > 0:
+                path.append(j)
+                yield from self._iter_from(path, self._bits[j], limit)
+                path.pop()
+
+    def count(self) -> int:
+        """
+        Counts the realizations
+        :return: The number of realizations
+        """
+        if self._size == 0:
+            return 1
+        return sum(self._count_from(j, 1, self._bits[j], self._get_limit(j)) for j in self._starts)
+
+    def unrank(self, rank: int) -> list:
+        """
+        Gets the realization with a given rank
+        :param rank: The rank, from 0 to count() - 1
+        :return: The realization, as an ascending list of pitch integers
+        """
+        if self._size == 0:
+            return []
+        choices = self._starts
+        path = []
+        mask = 0
+        limit = None
+        while len(path) < self._size:
+            for j in choices:
+                if len(path) == 0:
+                    limit = self._get_limit(j)
+                count = self._count_from(j, len(path) + 1, mask | self._bits[j], limit)
+                if rank < count:
+                    path.append(j)
+                    mask |= self._bits[j]
+                    choices = self._get_successors(j, len(path), mask, limit)
+                    break
+                rank -= count
+        return [self._pitches[j] for j in path]
+
+    def _count_from(self, j: int, size: int, mask: int, limit: int) -> int:
+        """
+        Counts the completions of a partial realization
+        :param j: The index of the last pitch
+        :param size: The number of pitches
+        :param mask: The pcs covered, as a bitmask
+        :param limit: The highest pitch allowed by the span
+        :return: The number of completions
+        """
+        if size == self._size:
+            return 1 if mask == self._full else 0
+        p = self._pitches[j]
+        if self._max_spacing is not None and limit > p + self._max_spacing * (self._size - size):
+            limit = p + self._max_spacing * (self._size - size)
+        if limit >= self._pitches[-1]:
+            key = (j, size, mask, None)
+        else:
+            # Below the top of the range the candidates repeat every octave, so the completions depend
+            # only on the pc of the last pitch and the distance to the limit
+            key = (None, p % self._mod, size, mask, limit - p)
+        total = self._counts.get(key)
+        if total is None:
+            total = 0
+            missing = self._full & ~mask
+            if missing.bit_count() <= self._size - size:
+                if size + 1 == self._size:
+                    total = sum(1 for j2 in self._get_successors(j, size, mask, limit) if mask | self._bits[j2] == self._full)
+                else:
+                    for j2 in self._get_successors(j, size, mask, limit):
+                        total += self._count_from(j2, size + 1, mask | self._bits[j2], limit)
+            self._counts[key] = total
+        return total
+
+    def _get_limit(self, j: int) -> int:
+        """
+        Gets the highest pitch allowed by the span, given the lowest pitch
+        :param j: The index of the lowest pitch
+        :return: The highest pitch allowed
+        """
+        if self._max_span is None:
+            return self._pitches[-1]
+        return self._pitches[j] + self._max_span
+
+    def _get_successors(self, j: int, size: int, mask: int, limit: int) -> list:
+        """
+        Gets the pitches that may follow a pitch in a partial realization
+        :param j: The index of the last pitch
+        :param size: The number of pitches
+        :param mask: The pcs covered, as a bitmask
+        :param limit: The highest pitch allowed by the span
+        :return: The indices of the pitches that may follow
+        """
+        p = self._pitches[j]
+        high = limit if self._max_spacing is None else min(limit, p + self._max_spacing)
+        start = bisect.bisect_left(self._pitches, p + self._min_spacing, j + 1)
+        stop = bisect.bisect_right(self._pitches, high, start)
+        if (self._full & ~mask).bit_count() == self._size - size:
+            # Every remaining pitch is needed for a missing pc, so none can be doubled
+            return [j2 for j2 in range(start, stop) if not mask & self._bits[j2]]
+        return [j2 for j2 in range(start, stop) if not mask & self._bits[j2] or self._doubled[j2]]
+
+    def _iter_from(self, path: list, mask: int, limit: int):
+        """
+        Generates the completions of a partial realization, skipping branches with no completions
+        :param path: The indices of the pitches chosen so far. It is extended in place.
+        :param mask: The pcs covered, as a bitmask
+        :param limit: The highest pitch allowed by the span
+        :return: A generator of realizations, as ascending lists of pitch integers
+        """
+        if len(path) == self._size:
+            yield [self._pitches[j] for j in path]
+            return
+        for j2 in self._get_successors(path[-1], len(path), mask, limit):
+            if self._count_from(j2, len(path) + 1, mask | self._bits[j2], limit) > 0:
+                path.append(j2)
+                yield from self._iter_from(path, mask | self._bits[j2], limit)
+                path.pop()
+
+
+def _complement_residue_class(modulus: int, residue: int) -> set:
+    """
+    Gets the complement of a residue class as a union of residue classes. A number is outside the class
+    if it differs from the residue modulo some prime power p^k dividing the modulus, so the complement
+    needs only (p - 1) classes for each prime factor p, rather than modulus - 1 classes.
+    :param modulus: The modulus
+    :param residue: The residue
+    :return: The complement, as a set of (modulus, residue) tuples
+    """
+    classes = set()
+    factors = [f for f in util.factor(modulus) if f > 1]
+    for p in set(factors):
+        power = 1
+        for i in range(factors.count(p)):
+            for j in range(p):
+                r = residue % power + j * power
+                if r != residue % (power * p):
+                    classes.add((power * p, r))
+            power *= p
+    return classes
+
+
+def _complement_node(node) -> tuple:
+    """
+    Complements a Sieve expression. The complement of a union of residue classes is expanded only if it has
+    no more classes than the union, since in general it has the product of the (p - 1) terms of its classes.
+    :param node: The expression tree
+    :return: The complemented expression tree
+    """
+    if node[0] == "complement":
+        return node[1]
+    elif node[0] == "classes":
+        budget = max(len(node[1]), 1)
+        classes = {(1, 0)}
+        for modulus, residue in sorted(node[1]):
+            classes = _intersect_residue_classes(classes, _complement_residue_class(modulus, residue))
+            if len(classes) > budget:
+                return ("complement", node)
+        return ("classes", frozenset(classes))
+    return ("complement", node)
+
+
+def _evaluate_node(node, start: int, length: int) -> np.ndarray:
+    """
+    Evaluates a Sieve expression over a range of offsets from the base pitch. Each residue class is laid out
+    as an arithmetic progression.
+    :param node: The expression tree
+    :param start: The first offset
+    :param length: The number of offsets
+    :return: A Boolean array, True for the offsets in the Sieve
+    """
+    if node[0] == "classes":
+        values = np.zeros(length, dtype=bool)
+        for modulus, residue in node[1]:
+            values[(residue - start) % modulus::modulus] = True
+        return values
+    elif node[0] == "complement":
+        return ~_evaluate_node(node[1], start, length)
+    elif node[0] == "from":
+        values = _evaluate_node(node[2], start, length)
+        values[:max(node[1] - start, 0)] = False
+        return values
+    values = _evaluate_node(node[1][0], start, length)
+    for child in node[1][1:]:
+        if node[0] == "union":
+            values |= _evaluate_node(child, start, length)
+        else:
+            values &= _evaluate_node(child, start, length)
+    return values
+
+
+def _flatten_node(node) -> set:
+    """
+    Expands a Sieve expression into a union of residue classes in normal form. Lower bounds are left out,
+    so the classes describe the expression from its highest bound on.
+    :param node: The expression tree
+    :return: A set of (modulus, residue) tuples
+    """
+    if node[0] == "classes":
+        return set(node[1])
+    elif node[0] == "from":
+        return _flatten_node(node[2])
+    elif node[0] == "union":
+        return _simplify_residue_classes(set().union(*[_flatten_node(child) for child in node[1]]))
+    elif node[0] == "intersection":
+        classes = {(1, 0)}
+        for child in node[1]:
+            classes = _intersect_residue_classes(classes, _flatten_node(child))
+        return classes
+    # The complement of a union is the intersection of the complements of its classes
+    classes = {(1, 0)}
+    for modulus, residue in sorted(_flatten_node(node[1])):
+        classes = _intersect_residue_classes(classes, _complement_residue_class(modulus, residue))
+    return classes
+
+
+def _get_node_bound(node) -> int:
+    """
+    Gets the highest lower bound in a Sieve expression. The expression is periodic from this offset on.
+    :param node: The expression tree
+    :return: The bound
+    """
+    if node[0] == "classes":
+        return 0
+    elif node[0] == "complement":
+        return _get_node_bound(node[1])
+    elif node[0] == "from":
+        return max(node[1], _get_node_bound(node[2]))
+    return max(_get_node_bound(child) for child in node[1])
+
+
+def _get_node_moduli(node) -> set:
+    """
+    Gets the moduli in a Sieve expression
+    :param node: The expression tree
+    :return: The set of moduli
+    """
+    if node[0] == "classes":
+        return {modulus for modulus, residue in node[1]}
+    elif node[0] == "complement":
+        return _get_node_moduli(node[1])
+    elif node[0] == "from":
+        return _get_node_moduli(node[2])
+    return set().union(*[_get_node_moduli(child) for child in node[1]])
+
+
+def _get_periodic_range(residues: np.ndarray, period: int, p0: int, p1: int) -> np.ndarray:
+    """
+    Gets the numbers between p0 and p1 that are congruent to one of a sorted array of residues. Only the
+    residues in the partial first and last periods are sliced out, and the full periods between them are
+    tiled, so the cost is proportional to the output.
+    :param residues: The sorted residues
+    :param period: The period
+    :param p0: The low number (nonnegative)
+    :param p1: The high number
+    :return: A sorted NumPy array of the numbers
+    """
+    first = p0 // period
+    last = p1 // period
+    if first == last:
+        return residues[np.searchsorted(residues, p0 - first * period):
+                        np.searchsorted(residues, p1 - first * period, side="right")] + first * period
+    head = residues[np.searchsorted(residues, p0 - first * period):] + first * period
+    middle = (np.arange(first + 1, last, dtype=np.int64)[:, None] * period + residues[None, :]).ravel()
+    tail = residues[:np.searchsorted(residues, p1 - last * period, side="right")] + last * period
+    return np.concatenate([head, middle, tail])
+
+
+def _get_pitch_array(pset) -> np.ndarray:
+    """
+    Gets the pitch integers of a pset in ascending order
+    :param pset: A pset (or a list of Pitches or pitch integers)
+    :return: An integer array
+    """
+    return np.sort(np.array([p.p if type(p) == Pitch else p for p in pset], dtype=np.int64))
+
+
+def _get_realization_search(pcset: set, lower_boundary: int, upper_boundary: int, num_duplicate_pitches: int = 0,
+                            max_span: int = None, min_spacing: int = None, max_spacing: int = None, bass=None,
+                            doubled_pcs: set = None) -> '_RealizationSearch':
+    """
+    Gets a realization search, reusing a recent search with the same arguments and its memoized counts
+    :param pcset: The pcset to realize
+    :param lower_boundary: The lower boundary
+    :param upper_boundary: The upper boundary
+    :param num_duplicate_pitches: The number of additional duplicate pitches
+    :param max_span: The largest distance between the lowest and highest pitches
+    :param min_spacing: The smallest distance between adjacent pitches
+    :param max_spacing: The largest distance between adjacent pitches
+    :param bass: The lowest Pitch, or the PitchClass of the lowest pitch
+    :param doubled_pcs: The pcs that may appear in more than one register
+    :return: The realization search
+    """
+    bass_key = None
+    if bass is not None:
+        bass_key = (bass.p, None) if type(bass) == Pitch else (None, bass.pc)
+    key = (frozenset((pc.pc, pc.mod) for pc in pcset), lower_boundary, upper_boundary, num_duplicate_pitches, max_span,
+           min_spacing, max_spacing, bass_key, None if doubled_pcs is None else frozenset(pc.pc for pc in doubled_pcs))
+    search = _realization_searches.get(key)
+    if search is None:
+        search = _RealizationSearch(pcset, lower_boundary, upper_boundary, num_duplicate_pitches, max_span, min_spacing,
+                                    max_spacing, bass, doubled_pcs)
+        _realization_searches[key] = search
+        if len(_realization_searches) > _REALIZATION_SEARCH_CACHE_SIZE:
+            _realization_searches.popitem(last=False)
+    else:
+        _realization_searches.move_to_end(key)
+    return search
+
+
+def _intersect_residue_classes(classes1: set, classes2: set) -> set:
+    """
+    Intersects two unions of residue classes, using the Chinese Remainder Theorem to intersect each pair of classes
+    :param classes1: A set of (modulus, residue) tuples
+    :param classes2: A set of (modulus, residue) tuples
+    :return: The intersection, in normal form
+    """
+    classes = set()
+    for m1, r1 in classes1:
+        for m2, r2 in classes2:
+            g = math.gcd(m1, m2)
+            if (r2 - r1) % g == 0:
+                m = m1 // g * m2
+                t = (r2 - r1) // g * pow(m1 // g, -1, m2 // g) % (m2 // g)
+                classes.add((m, (r1 + m1 * t) % m))
+    return _simplify_residue_classes(classes)
+
+
+def _intersect_nodes(node1, node2) -> tuple:
+    """
+    Intersects two Sieve expressions. Nested intersections are merged, and unions of residue classes are
+    intersected with the CRT where this gives no more classes than the two unions have together.
+    :param node1: An expression tree
+    :param node2: An expression tree
+    :return: The intersected expression tree
+    """
+    merged = []
+    children = []
+    for node in [node1, node2]:
+        for child in (node[1] if node[0] == "intersection" else [node]):
+            if child[0] != "classes":
+                children.append(child)
+            elif len(child[1]) == 0:
+                return ("classes", frozenset())
+            elif child[1] != {(1, 0)}:
+                classes = set(child[1])
+                for i in range(len(merged)):
+                    if len(classes) * len(merged[i]) <= _MAX_CRT_PAIRS:
+                        product = _intersect_residue_classes(classes, merged[i])
+                        if len(product) == 0:
+                            return ("classes", frozenset())
+                        elif len(product) <= len(classes) + len(merged[i]):
+                            merged[i] = product
+                            break
+                else:
+                    merged.append(classes)
+    nodes = [("classes", frozenset(classes)) for classes in merged] + children
+    if len(nodes) == 0:
+        return ("classes", frozenset({(1, 0)}))
+    return nodes[0] if len(nodes) == 1 else ("intersection", tuple(nodes))
+
+
+def _sample_ranks(count: int, k: int) -> list:
+    """
+    Draws k distinct ranks uniformly from range(count)
+    :param count: The number of ranks
+    :param k: The number of ranks to draw
+    :return: The ranks, in random order
+    """
+    if count <= sys.maxsize:
+        return _rng.sample(range(count), k)
+    ranks = {}
+    while len(ranks) < k:
+        ranks[_rng.randrange(count)] = None
+    return list(ranks)
+
+
+def _shift_node(node, shift: int) -> tuple:
+    """
+    Shifts a Sieve expression, for a base pitch that is lower by the given amount. Lower bounds that fall
+    below the new base pitch are dropped.
+    :param node: The expression tree
+    :param shift: The shift
+    :return: The shifted expression tree
+    """
+    if node[0] == "classes":
+        return ("classes", frozenset((modulus, (residue + shift) % modulus) for modulus, residue in node[1]))
+    elif node[0] == "complement":
+        return ("complement", _shift_node(node[1], shift))
+    elif node[0] == "from" and node[1] + shift <= 0:
+        return _shift_node(node[2], shift)
+    elif node[0] == "from":
+        return ("from", node[1] + shift, _shift_node(node[2], shift))
+    return (node[0], tuple(_shift_node(child, shift) for child in node[1]))
+
+
+def _simplify_residue_classes(classes) -> set:
+    """
+    Reduces a union of residue classes to normal form. Classes contained in other classes are dropped,
+    and complete sets of sibling classes (the p classes modulo m that make up a class modulo m / p, for
+    a prime p) are replaced by their parent class, where a sibling also counts as present if another class
+    contains it. Moduli are merged from largest to smallest, so parent classes are merged in turn.
+    Classes with a residue outside the range of their modulus are empty and are dropped.
+    :param classes: A collection of (modulus, residue) tuples
+    :return: The normal form, as a set of (modulus, residue) tuples
+    """
+    divisors = {}
+
+    def get_divisors(modulus):
+        if modulus not in divisors:
+            d = [1]
+            factors = [f for f in util.factor(modulus) if f > 1]
+            for p in set(factors):
+                d = [x * p ** k for x in d for k in range(factors.count(p) + 1)]
+            divisors[modulus] = sorted(d)
+        return divisors[modulus]
+
+    def is_covered(modulus, residue):
+        return any((d, residue % d) in classes for d in get_divisors(modulus))
+
+    classes = {(modulus, residue) for modulus, residue in classes if 0 <= residue < modulus}
+    moduli = sorted({modulus for modulus, residue in classes})
+    while len(moduli) > 0:
+        modulus = moduli.pop()
+        for p in set(util.factor(modulus)) - {1}:
+            step = modulus // p
+            parents = {residue % step for m, residue in classes if m == modulus}
+            for parent in parents:
+                siblings = [(modulus, parent + j * step) for j in range(p)]
+                if all(is_covered(m, r) for m, r in siblings):
+                    classes.difference_update(siblings)
+                    classes.add((step, parent))
+                    if step not in moduli:
+                        moduli.append(step)
+                        moduli.sort()
+    return {(modulus, residue) for modulus, residue in classes
+            if not any((d, residue % d) in classes for d in get_divisors(modulus)[:-1])}
+
+
+def _unite_nodes(node1, node2) -> tuple:
+    """
+    Unites two Sieve expressions. Nested unions are merged, and their unions of residue classes are merged
+    into one normal form, which never has more classes than they have together.
+    :param node1: An expression tree
+    :param node2: An expression tree
+    :return: The united expression tree
+    """
+    classes = set()
+    children = []
+    for node in [node1, node2]:
+        for child in (node[1] if node[0] == "union" else [node]):
+            if child[0] == "classes":
+                classes.update(child[1])
+            else:
+                children.append(child)
+    classes = _simplify_residue_classes(classes)
+    if (1, 0) in classes or len(children) == 0:
+        return ("classes", frozenset(classes))
+    elif len(classes) > 0:
+        children.insert(0, ("classes", frozenset(classes)))
+    return children[0] if len(children) == 1 else ("union", tuple(children))
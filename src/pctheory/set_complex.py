@@ -21,10 +21,14 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from pctheory.pcset import SetClass
+from pctheory.pcset import SetClass, SetClassTable12
 
 
-set_classes12 = SetClass.get_set_classes12()
+def __getattr__(name):
+    # The chromatic set-classes are only built when set_classes12 is first accessed.
+    if name == "set_classes12":
+        return SetClass.get_set_classes12()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def assert_k(s: SetClass, t: SetClass) -> bool:
@@ -35,6 +39,8 @@ def assert_k(s: SetClass, t: SetClass) -> bool:
     :param t: A set-class
     :return: A boolean
     """
+    if s.mod == 12 and t.mod == 12:
+        return _assert_k12(SetClassTable12.get(), s.class_id, t.class_id)
     t_bar = t.get_abstract_complement()
     return t.contains_abstract_subset(s) or \
            t_bar.contains_abstract_subset(s) or \
@@ -50,6 +56,8 @@ def assert_kh(s: SetClass, t: SetClass) -> bool:
     :param t: A set-class
     :return: A boolean
     """
+    if s.mod == 12 and t.mod == 12:
+        return _assert_kh12(SetClassTable12.get(), s.class_id, t.class_id)
     t_bar = t.get_abstract_complement()
     return (t.contains_abstract_subset(s) or s.contains_abstract_subset(t)) and \
         (t_bar.contains_abstract_subset(s) or s.contains_abstract_subset(t_bar))
@@ -61,11 +69,10 @@ def get_k12(nexus: SetClass) -> list:
     :param nexus: A nexus set
     :return: The K-complex
     """
-    k = []
-    for sc in set_classes12:
-        if assert_k(nexus, sc):
-            k.append(sc)
-    return k
+    if nexus.mod != 12:
+        raise ArithmeticError("K-complexes can only be computed for SetClasses with PitchClass modulo 12.")
+    k = _complex_masks12(nexus.class_id)[0]
+    return [sc for sc in SetClass.get_set_classes12() if k[sc.class_id]]
 
 
 def get_kh12(nexus: SetClass) -> list:
@@ -74,8 +81,53 @@ def get_kh12(nexus: SetClass) -> list:
     :param nexus: A nexus set
     :return: The Kh-complex
     """
-    kh = []
-    for sc in set_classes12:
-        if assert_kh(nexus, sc):
-            kh.append(sc)
-    return kh
+    if nexus.mod != 12:
+        raise ArithmeticError("Kh-complexes can only be computed for SetClasses with PitchClass modulo 12.")
+    kh = _complex_masks12(nexus.class_id)[1]
+    return [sc for sc in SetClass.get_set_classes12() if kh[sc.class_id]]
+
+
+def _assert_k12(table: SetClassTable12, s: int, t: int) -> bool:
+    """
+    Asserts that two chromatic set-classes are in a K-relationship, using the inclusion table
+    :param table: The SetClassTable12
+    :param s: The class id of a set-class
+    :param t: The class id of a set-class
+    :return: A boolean
+    """
+    t_bar = table.get_abstract_complement_id(t)
+    return table.contains_abstract_subset(t, s) or \
+           table.contains_abstract_subset(t_bar, s) or \
+           table.contains_abstract_subset(s, t) or \
+           table.contains_abstract_subset(s, t_bar)
+
+
+def _assert_kh12(table: SetClassTable12, s: int, t: int) -> bool:
+    """
+    Asserts that two chromatic set-classes are in a Kh-relationship, using the inclusion table
+    :param table: The SetClassTable12
+    :param s: The class id of a set-class
+    :param t: The class id of a set-class
+    :return: A boolean
+    """
+    t_bar = table.get_abstract_complement_id(t)
+    return (table.contains_abstract_subset(t, s) or table.contains_abstract_subset(s, t)) and \
+        (table.contains_abstract_subset(t_bar, s) or table.contains_abstract_subset(s, t_bar))
+
+
+def _complex_masks12(nexus_id: int) -> tuple:
+    """
+    Finds the members of the K- and Kh-complexes about a chromatic nexus set, for all set-classes at once
+    :param nexus_id: The class id of the nexus set
+    :return: A tuple of two boolean arrays (K and Kh), indexed by class id
+    """
+    table = SetClassTable12.get()
+    inclusion = table.inclusion_matrix
+    complements = table.complement_ids
+    t_contains_s = inclusion[:, nexus_id]
+    t_bar_contains_s = inclusion[complements, nexus_id]
+    s_contains_t = inclusion[nexus_id, :]
+    s_contains_t_bar = inclusion[nexus_id, complements]
+    k = t_contains_s | t_bar_contains_s | s_contains_t | s_contains_t_bar
+    kh = (t_contains_s | s_contains_t) & (t_bar_contains_s | s_contains_t_bar)
+    return k, kh
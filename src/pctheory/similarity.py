@@ -0,0 +1,298 @@
+"""
+File: similarity.py
+Author: Jeff Martin
+Date: 10/18/2026
+
+Copyright © 2026 by Jeffrey Martin. All rights reserved.
+Email: jmartin@jeffreymartincomposer.com
+Website: https://jeffreymartincomposer.com
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from math import comb
+from pctheory.pcset import SetClass, SetClassTable12
+import numpy as np
+
+# The measures that compare IC vectors, and the measures that compare subset-class vectors
+_IC_MEASURES = {"ANGLE", "ASIM", "ICVSIM", "SIM"}
+_SUBSET_MEASURES = {"ATMEMB", "RECREL", "REL"}
+
+# The number of array elements in the largest temporary array made for one chunk of rows
+_CHUNK_ELEMENTS = 1 << 22
+
+
+def angle(x: SetClass, y: SetClass) -> float:
+    """
+    Computes ANGLE, the angle in degrees between the IC vectors of two set-classes (0 if the vectors
+    are proportional).
+    Source: Scott and Isaacson, "The Interval Angle: A Similarity Measure for Pitch-Class Sets"
+    :param x: A set-class
+    :param y: A set-class
+    :return: The angle, or nan if either set-class has fewer than 2 pcs
+    *Compatible with all PitchClass modulos
+    """
+    return _compare_pair(x, y, "ANGLE")
+
+
+def asim(x: SetClass, y: SetClass) -> float:
+    """
+    Computes ASIM, the absolute difference of the IC vectors of two set-classes divided by the total number
+    of intervals in both set-classes (0 for identical IC vectors, 1 for maximally dissimilar ones).
+    Source: Morris, "A Similarity Index for Pitch-Class Sets"
+    :param x: A set-class
+    :param y: A set-class
+    :return: ASIM, or nan if both set-classes have fewer than 2 pcs
+    *Compatible with all PitchClass modulos
+    """
+    return _compare_pair(x, y, "ASIM")
+
+
+def atmemb(x: SetClass, y: SetClass) -> float:
+    """
+    Computes ATMEMB. For each subset-class of 2 or more pcs that is embedded in both set-classes, the
+    embeddings in each set-class are added up, and the total is divided by the number of subsets of 2
+    or more pcs in both set-classes (1 for identical set-classes, 0 for set-classes with no common subset-classes).
+    Source: Rahn, "Relating Sets"
+    :param x: A set-class
+    :param y: A set-class
+    :return: ATMEMB, or nan if either set-class has fewer than 2 pcs
+    *Compatible with all PitchClass modulos
+    """
+    return _compare_pair(x, y, "ATMEMB")
+
+
+def get_similarity_matrix(set_classes: list, measure: str = "ASIM", chunk_size: int = None) -> np.ndarray:
+    """
+    Computes a similarity measure for all pairs of set-classes at once.
+    :param set_classes: A list of set-classes with the same PitchClass modulo
+    :param measure: The measure ("ANGLE", "ASIM", "ATMEMB", "IcVSIM", "RECREL", "REL", or "SIM"; case-insensitive)
+    :param chunk_size: The number of rows to compute at a time. If None, a chunk size is chosen to keep
+    temporary arrays small.
+    :return: A float array of shape (N, N). Entry [i, j] compares set_classes[i] and set_classes[j].
+    *Compatible with all PitchClass modulos
+    """
+    matrix = np.empty((len(set_classes), len(set_classes)), dtype=np.float64)
+    for start, rows in iter_similarity_matrix(set_classes, measure, chunk_size):
+        matrix[start:start + rows.shape[0]] = rows
+    return matrix
+
+
+def icvsim(x: SetClass, y: SetClass) -> float:
+    """
+    Computes IcVSIM, the standard deviation of the difference between the IC vectors of two set-classes
+    (0 for identical IC vectors).
+    Source: Isaacson, "Similarity of Interval-Class Content Between Pitch-Class Sets: The IcVSIM Relation"
+    :param x: A set-class
+    :param y: A set-class
+    :return: IcVSIM
+    *Compatible with all PitchClass modulos
+    """
+    return _compare_pair(x, y, "ICVSIM")
+
+
+def iter_similarity_matrix(set_classes: list, measure: str = "ASIM", chunk_size: int = None):
+    """
+    Computes a similarity matrix one chunk of rows at a time. This is useful for large catalogues (such as
+    mod 24 set-classes), where the full matrix can be written to disk or reduced as it is made.
+    :param set_classes: A list of set-classes with the same PitchClass modulo
+    :param measure: The measure ("ANGLE", "ASIM", "ATMEMB", "IcVSIM", "RECREL", "REL", or "SIM"; case-insensitive)
+    :param chunk_size: The number of rows in each chunk. If None, a chunk size is chosen to keep
+    temporary arrays small.
+    :return: A generator of (start, rows) tuples, where rows is a float array of shape (chunk_size, N)
+    holding rows start to start + chunk_size of the similarity matrix
+    *Compatible with all PitchClass modulos
+    """
+    measure = _get_measure_key(measure)
+    mod = _get_mod(set_classes)
+    cardinalities = np.array([len(sc) for sc in set_classes], dtype=np.int64)
+    if measure in _IC_MEASURES:
+        vectors = np.array([sc.ic_vector for sc in set_classes], dtype=np.float64).reshape(len(set_classes), mod // 2)
+        column_cardinalities = None
+        width = vectors.shape[1]
+    else:
+        vectors, column_cardinalities = _get_subset_class_vectors(set_classes, mod)
+        width = int(np.bincount(column_cardinalities).max(initial=1)) if measure == "RECREL" else 1
+    if chunk_size is None:
+        chunk_size = max(1, _CHUNK_ELEMENTS // max(1, len(set_classes) * width))
+    elif type(chunk_size) != int or chunk_size < 1:
+        raise ValueError("The chunk size must be a positive integer.")
+
+    for start in range(0, len(set_classes), chunk_size):
+        stop = min(start + chunk_size, len(set_classes))
+        yield start, _compare(measure, vectors[start:stop], vectors, cardinalities[start:stop], cardinalities,
+                              column_cardinalities, mod)
+
+
+def recrel(x: SetClass, y: SetClass) -> float:
+    """
+    Computes RECREL, as a percentage. For each cardinality n from 2 up to the size of the smaller set-class,
+    the n-class vectors of both set-classes are scaled to proportions, and half their absolute difference is
+    taken (0 if the set-classes have the same distribution of n-classes, 1 if they have no n-classes in common).
+    RECREL is the mean of these differences (0% for identical set-classes, 100% for maximally dissimilar ones).
+    Source: Castrén, "RECREL: A Similarity Measure for Set-Classes"
+    :param x: A set-class
+    :param y: A set-class
+    :return: RECREL, or nan if either set-class has fewer than 2 pcs
+    *Compatible with all PitchClass modulos
+    """
+    return _compare_pair(x, y, "RECREL")
+
+
+def rel(x: SetClass, y: SetClass) -> float:
+    """
+    Computes Lewin's REL. For each subset-class of 2 or more pcs, the square roots of its embeddings in the
+    two set-classes are multiplied, and the sum is divided by the square root of the product of the number of
+    subsets of 2 or more pcs in each set-class (1 for identical set-classes, 0 for set-classes with no common
+    subset-classes).
+    Source: Lewin, "A Response: On Partial Ordering"
+    :param x: A set-class
+    :param y: A set-class
+    :return: REL, or nan if either set-class has fewer than 2 pcs
+    *Compatible with all PitchClass modulos
+    """
+    return _compare_pair(x, y, "REL")
+
+
+def sim(x: SetClass, y: SetClass) -> float:
+    """
+    Computes SIM, the sum of the absolute differences between the IC vectors of two set-classes
+    (0 for identical IC vectors).
+    Source: Morris, "A Similarity Index for Pitch-Class Sets"
+    :param x: A set-class
+    :param y: A set-class
+    :return: SIM
+    *Compatible with all PitchClass modulos
+    """
+    return _compare_pair(x, y, "SIM")
+
+
+def _compare(measure: str, a: np.ndarray, b: np.ndarray, cardinalities_a: np.ndarray, cardinalities_b: np.ndarray,
+             column_cardinalities: np.ndarray, mod: int) -> np.ndarray:
+    """
+    Compares two groups of set-classes.
+    :param measure: The measure key
+    :param a: The IC vectors or subset-class vectors of the first group, one row per set-class
+    :param b: The IC vectors or subset-class vectors of the second group, one row per set-class
+    :param cardinalities_a: The cardinality of each set-class in the first group
+    :param cardinalities_b: The cardinality of each set-class in the second group
+    :param column_cardinalities: The cardinality of each subset-class column (for subset-class vectors)
+    :param mod: The PitchClass modulo
+    :return: A float array of shape (len(a), len(b))
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if measure == "ANGLE":
+            # The angle is computed from the distance between the unit vectors, which is accurate for small angles.
+            unit_a = a / np.linalg.norm(a, axis=1)[:, None]
+            unit_b = b / np.linalg.norm(b, axis=1)[:, None]
+            distances = np.linalg.norm(unit_a[:, None, :] - unit_b[None, :, :], axis=2)
+            return np.degrees(2 * np.arcsin(np.clip(distances / 2, 0.0, 1.0)))
+        elif measure in {"ASIM", "SIM"}:
+            differences = np.abs(a[:, None, :] - b[None, :, :]).sum(axis=2)
+            if measure == "SIM":
+                return differences
+            intervals_a = cardinalities_a * (cardinalities_a - 1) // 2
+            intervals_b = cardinalities_b * (cardinalities_b - 1) // 2
+            return differences / np.add.outer(intervals_a, intervals_b)
+        elif measure == "ICVSIM":
+            return (b[None, :, :] - a[:, None, :]).std(axis=2)
+
+        undefined = np.logical_or.outer(cardinalities_a < 2, cardinalities_b < 2)
+        if measure == "REL":
+            totals_a = a.sum(axis=1)
+            totals_b = b.sum(axis=1)
+            result = (np.sqrt(a) @ np.sqrt(b).T) / np.sqrt(np.outer(totals_a, totals_b))
+        elif measure == "ATMEMB":
+            totals_a = a.sum(axis=1)
+            totals_b = b.sum(axis=1)
+            # Only subset-classes embedded in both set-classes count toward the total.
+            result = (a @ (b > 0).T + (a > 0) @ b.T) / np.add.outer(totals_a, totals_b)
+        else:
+            differences = np.zeros(undefined.shape, dtype=np.float64)
+            counts = np.zeros(undefined.shape, dtype=np.int64)
+            for n in range(2, mod + 1):
+                columns = column_cardinalities == n
+                if not columns.any():
+                    continue
+                proportions_a = a[:, columns] / np.array([max(comb(int(c), n), 1) for c in cardinalities_a])[:, None]
+                proportions_b = b[:, columns] / np.array([max(comb(int(c), n), 1) for c in cardinalities_b])[:, None]
+                valid = np.logical_and.outer(cardinalities_a >= n, cardinalities_b >= n)
+                difference = np.abs(proportions_a[:, None, :] - proportions_b[None, :, :]).sum(axis=2) / 2
+                differences += np.where(valid, difference, 0.0)
+                counts += valid
+            result = 100 * differences / counts
+        result[undefined] = np.nan
+        return result
+
+
+def _compare_pair(x: SetClass, y: SetClass, measure: str) -> float:
+    """
+    Compares two set-classes.
+    :param x: A set-class
+    :param y: A set-class
+    :param measure: The measure key
+    :return: The value of the measure
+    """
+    return float(get_similarity_matrix([x, y], measure)[0, 1])
+
+
+def _get_measure_key(measure: str) -> str:
+    """
+    Gets the key of a similarity measure.
+    :param measure: The name of the measure (case-insensitive)
+    :return: The key
+    """
+    if type(measure) != str or measure.upper() not in _IC_MEASURES | _SUBSET_MEASURES:
+        raise ValueError(f"Invalid similarity measure {measure!r}. Use ANGLE, ASIM, ATMEMB, IcVSIM, RECREL, REL, or SIM.")
+    return measure.upper()
+
+
+def _get_mod(set_classes: list) -> int:
+    """
+    Gets the PitchClass modulo shared by a list of set-classes.
+    :param set_classes: A list of set-classes
+    :return: The modulo (12 if the list is empty)
+    """
+    mods = {sc.mod for sc in set_classes}
+    if len(mods) > 1:
+        raise ValueError("All set-classes must have the same PitchClass modulo.")
+    return mods.pop() if len(mods) > 0 else 12
+
+
+def _get_subset_class_vectors(set_classes: list, mod: int) -> tuple:
+    """
+    Gets the subset-class vectors of a list of set-classes, restricted to subset-classes of 2 or more pcs.
+    Mod 12 vectors are read from the SetClassTable12, and vectors for other modulos are assembled from
+    the cached subset-class census of each set-class, keyed by prime form bitmask.
+    :param set_classes: A list of set-classes
+    :param mod: The PitchClass modulo
+    :return: A float array of shape (N, K) with the embeddings of each subset-class column, and an array of
+    the K column cardinalities
+    """
+    if mod == 12:
+        table = SetClassTable12.get()
+        columns = np.flatnonzero(table.cardinalities >= 2)
+        rows = [table.get_class_id(sc.pcset) for sc in set_classes]
+        return table.subset_class_vectors[rows][:, columns].astype(np.float64), \
+            table.cardinalities[columns].astype(np.int64)
+    censuses = [sc._get_subset_class_counts() for sc in set_classes]
+    columns = sorted({bits for census in censuses for bits, multiplicity in census if bits.bit_count() >= 2},
+                     key=lambda bits: (bits.bit_count(), bits))
+    column_ids = {bits: i for i, bits in enumerate(columns)}
+    vectors = np.zeros((len(set_classes), len(columns)), dtype=np.float64)
+    for i, census in enumerate(censuses):
+        for bits, multiplicity in census:
+            if bits.bit_count() >= 2:
+                vectors[i, column_ids[bits]] = multiplicity
+    return vectors, np.array([bits.bit_count() for bits in columns], dtype=np.int64)
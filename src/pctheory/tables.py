@@ -21,8 +21,129 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+from collections.abc import Mapping
 import importlib.resources
 import json
+import numpy as np
+import struct
+
+
+_tables = {}
+_row_tables = {}
+
+# Packed row tables start with a 16-byte header: a magic number, the format version,
+# the number of entries per row, and the number of rows. Each row is stored as
+# 4-bit entries (high nibble first), padded to a whole number of bytes.
+PACKED_ROW_MAGIC = b"PCTR"
+PACKED_ROW_VERSION = 1
+_PACKED_ROW_HEADER = struct.Struct("<4sHHI4x")
+
+
+class LazyTables(Mapping):
+    """
+    A read-only mapping that loads a set of tables the first time it is accessed.
+    This allows modules to declare tables at module level without paying the cost
+    of loading them at import time.
+    """
+    def __init__(self, loader):
+        """
+        Creates a LazyTables mapping.
+        :param loader: A function that returns the tables as a dictionary
+        """
+        self._loader = loader
+        self._data = None
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __repr__(self):
+        return f"<pctheory.tables.LazyTables ({'loaded' if self._data is not None else 'not loaded'})>"
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Whether or not the tables have been loaded.
+        :return: True or False
+        """
+        return self._data is not None
+
+    def load(self) -> dict:
+        """
+        Loads the tables if they have not been loaded yet.
+        :return: The tables
+        """
+        if self._data is None:
+            self._data = self._loader()
+        return self._data
+
+
+class PackedRowTable:
+    """
+    A read-only table of rows stored in the packed binary format (4 bits per entry).
+    The file is memory-mapped, so opening it is cheap, and the pages are shared between
+    processes that open the same table. Indexing with an integer returns a row as a tuple
+    of integers. Indexing with a slice or an array of indices returns a 2D NumPy array.
+    """
+    def __init__(self, path):
+        """
+        Opens a PackedRowTable.
+        :param path: The path of the packed table file
+        """
+        with open(path, "rb") as table_file:
+            header = table_file.read(_PACKED_ROW_HEADER.size)
+        if len(header) < _PACKED_ROW_HEADER.size:
+            raise ValueError("The file is too short to be a packed row table.")
+        magic, version, width, count = _PACKED_ROW_HEADER.unpack(header)
+        if magic != PACKED_ROW_MAGIC:
+            raise ValueError("The file is not a packed row table.")
+        if version != PACKED_ROW_VERSION:
+            raise ValueError(f"Unsupported packed row table version {version}.")
+        self._count = count
+        self._width = width
+        self._row_bytes = (width + 1) // 2
+        if count > 0:
+            self._data = np.memmap(path, dtype=np.uint8, mode="r", offset=_PACKED_ROW_HEADER.size,
+                                   shape=(count, self._row_bytes))
+        else:
+            self._data = np.zeros((0, self._row_bytes), dtype=np.uint8)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            row = self._data[index].tobytes()
+            return tuple(row[i // 2] >> 4 if i % 2 == 0 else row[i // 2] & 15 for i in range(self._width))
+        else:
+            return _unpack_nibbles(self._data[index], self._width)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return f"<pctheory.tables.PackedRowTable ({self._count} rows of width {self._width})>"
+
+    @property
+    def width(self) -> int:
+        """
+        The number of entries in each row.
+        :return: The width
+        """
+        return self._width
+
+    def to_array(self) -> np.ndarray:
+        """
+        Unpacks the entire table.
+        :return: A 2D NumPy array with one row per table row
+        """
+        return _unpack_nibbles(self._data, self._width)
 
 
 def create_tables_all_trichord():
@@ -30,7 +151,7 @@ def create_tables_all_trichord():
     Creates tables for all-trichord rows
     :return: Tables
     """
-    with importlib.resources.open_text("pctheory.data", "all_trichord.json") as table_json:
+    with importlib.resources.files("pctheory.data").joinpath("all_trichord.json").open(encoding="utf-8") as table_json:
         return json.loads(table_json.read())
 
 
@@ -39,7 +160,7 @@ def create_tables_all_trichord_babbitt():
     Creates tables for all-trichord (Babbitt) rows
     :return: Tables
     """
-    with importlib.resources.open_text("pctheory.data", "babbitt_trichord.json") as table_json:
+    with importlib.resources.files("pctheory.data").joinpath("babbitt_trichord.json").open(encoding="utf-8") as table_json:
         return json.loads(table_json.read())
 
 
@@ -48,7 +169,7 @@ def create_tables_eleven_interval():
     Creates tables for eleven-interval row generators
     :return: Tables
     """
-    with importlib.resources.open_text("pctheory.data", "eleven_interval.json") as table_json:
+    with importlib.resources.files("pctheory.data").joinpath("eleven_interval.json").open(encoding="utf-8") as table_json:
         return json.loads(table_json.read())
 
 
@@ -57,7 +178,7 @@ def create_tables_sc12():
     Creates tables for SetClass12 objects
     :return: Tables
     """
-    with importlib.resources.open_text("pctheory.data", "sc12.json") as table_json:
+    with importlib.resources.files("pctheory.data").joinpath("sc12.json").open(encoding="utf-8") as table_json:
         return json.loads(table_json.read())
 
 
@@ -66,5 +187,151 @@ def create_tables_ten_trichord():
     Creates tables for ten-trichord rows
     :return: Tables
     """
-    with importlib.resources.open_text("pctheory.data", "ten_trichord.json") as table_json:
+    with importlib.resources.files("pctheory.data").joinpath("ten_trichord.json").open(encoding="utf-8") as table_json:
         return json.loads(table_json.read())
+
+
+def get_row_table_all_trichord() -> PackedRowTable:
+    """
+    Gets the shared packed table of all-trichord rows
+    :return: The row table
+    """
+    return _get_row_table("all_trichord.bin")
+
+
+def get_row_table_all_trichord_babbitt() -> PackedRowTable:
+    """
+    Gets the shared packed table of all-trichord (Babbitt) rows
+    :return: The row table
+    """
+    return _get_row_table("babbitt_trichord.bin")
+
+
+def get_row_table_eleven_interval() -> PackedRowTable:
+    """
+    Gets the shared packed table of eleven-interval row generators
+    :return: The row table
+    """
+    return _get_row_table("eleven_interval.bin")
+
+
+def get_row_table_ten_trichord() -> PackedRowTable:
+    """
+    Gets the shared packed table of ten-trichord rows
+    :return: The row table
+    """
+    return _get_row_table("ten_trichord.bin")
+
+
+def get_tables_all_trichord():
+    """
+    Gets the shared tables for all-trichord rows. The tables are loaded on first use
+    and must not be modified.
+    :return: Tables
+    """
+    return _get_tables("all_trichord.json")
+
+
+def get_tables_all_trichord_babbitt():
+    """
+    Gets the shared tables for all-trichord (Babbitt) rows. The tables are loaded on first use
+    and must not be modified.
+    :return: Tables
+    """
+    return _get_tables("babbitt_trichord.json")
+
+
+def get_tables_eleven_interval():
+    """
+    Gets the shared tables for eleven-interval row generators. The tables are loaded on first use
+    and must not be modified.
+    :return: Tables
+    """
+    return _get_tables("eleven_interval.json")
+
+
+def get_tables_sc12():
+    """
+    Gets the shared tables for SetClass12 objects. The tables are loaded on first use
+    and must not be modified.
+    :return: Tables
+    """
+    return _get_tables("sc12.json")
+
+
+def get_tables_ten_trichord():
+    """
+    Gets the shared tables for ten-trichord rows. The tables are loaded on first use
+    and must not be modified.
+    :return: Tables
+    """
+    return _get_tables("ten_trichord.json")
+
+
+def pack_rows(rows) -> bytes:
+    """
+    Packs rows into the packed row table format. All rows must have the same length,
+    and every entry must be between 0 and 15.
+    :param rows: The rows
+    :return: The packed table
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if rows.ndim != 2:
+        raise ValueError("The rows must all have the same length.")
+    if rows.size > 0 and (rows.min() < 0 or rows.max() > 15):
+        raise ValueError("Packed row tables can only store entries from 0 to 15.")
+    count, width = rows.shape
+    nibbles = np.zeros((count, width + width % 2), dtype=np.uint8)
+    nibbles[:, :width] = rows
+    packed = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+    return _PACKED_ROW_HEADER.pack(PACKED_ROW_MAGIC, PACKED_ROW_VERSION, width, count) + packed.tobytes()
+
+
+def write_packed_rows(rows, path):
+    """
+    Writes rows to a file in the packed row table format.
+    :param rows: The rows
+    :param path: The file path
+    :return:
+    """
+    with open(path, "wb") as table_file:
+        table_file.write(pack_rows(rows))
+
+
+def _get_row_table(file_name: str) -> PackedRowTable:
+    """
+    Gets a shared packed row table, opening it if it has not been opened yet.
+    :param file_name: The name of the file in pctheory.data
+    :return: The row table
+    """
+    if file_name not in _row_tables:
+        path = importlib.resources.files("pctheory.data").joinpath(file_name)
+        with importlib.resources.as_file(path) as table_path:
+            _row_tables[file_name] = PackedRowTable(table_path)
+    return _row_tables[file_name]
+
+
+def _get_tables(file_name: str) -> dict:
+    """
+    Gets a shared table file, loading it if it has not been loaded yet.
+    :param file_name: The name of the file in pctheory.data
+    :return: Tables
+    """
+    if file_name not in _tables:
+        with importlib.resources.files("pctheory.data").joinpath(file_name).open(encoding="utf-8") as table_json:
+            _tables[file_name] = json.loads(table_json.read())
+    return _tables[file_name]
+
+
+def _unpack_nibbles(data: np.ndarray, width: int) -> np.ndarray:
+    """
+    Unpacks packed rows.
+    :param data: A 2D array of packed rows
+    :param width: The number of entries in each row
+    :return: A 2D array of unpacked rows
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    unpacked = np.empty((data.shape[0], data.shape[1] * 2), dtype=np.uint8)
+    unpacked[:, 0::2] = data >> 4
+    unpacked[:, 1::2] = data & 15
+    return unpacked[:, :width]
@@ -22,16 +22,28 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from pctheory.pitch import PitchClass
+from types import MappingProxyType
+import bisect
+import math
+import numpy as np
 import re
 
 
+_oto_catalogues = {}
+_permutations = {}
+_uto_catalogues = {}
+_uto_tables = {}
+
+
 class OTO:
     """
     Represents an ordered tone operator (OTO). If used with a twelve-tone row, it is a row operator (RO).
     Objects of this class are subscriptable. [0] is the index of transposition. [1] is whether or not to
     retrograde (0-no or 1-yes). [2] is the multiplier. Multiplication is performed first, then retrograding,
-    then transposition. These operators can be used with pcsegs.
+    then transposition. These operators can be used with pcsegs. OTOs are immutable.
     """
+    __slots__ = ("_t", "_r", "_m")
+
     def __init__(self, T=0, R=False, M=1):
         """
         Creates an OTO
@@ -74,6 +86,8 @@ class OTO:
 
 
     def __eq__(self, other):
+        if type(other) != OTO:
+            return NotImplemented
         return self._t == other._t and self._r == other._r and self._m == other._m
     
     def __ge__(self, other):
@@ -120,6 +134,8 @@ class OTO:
             return False
 
     def __ne__(self, other):
+        if type(other) != OTO:
+            return NotImplemented
         return self._t != other._t or self._r != other._r or self._m != other._m
 
     def __repr__(self):
@@ -166,6 +182,29 @@ class OTO:
         """
         return self._m
 
+    def apply(self, pcsegs, mod: int = 12) -> np.ndarray:
+        """
+        Transforms pcsegs stored as integer arrays. This is a single array lookup, so it is much faster
+        than transforming lists of PitchClasses when there are many pcsegs.
+        :param pcsegs: An array of pitch-class integers. The last axis holds the order positions, so
+        a 2D array is treated as one pcseg per row.
+        :param mod: The number of possible pcs in the system
+        :return: The transformed pcsegs, as an array of the same shape
+        """
+        transformed = _get_permutation(self._t, self._m, mod).take(np.asarray(pcsegs) % mod)
+        if self._r:
+            transformed = transformed[..., ::-1]
+        return transformed
+
+    def permutation(self, mod: int = 12) -> np.ndarray:
+        """
+        Gets the pitch-class permutation of the OTO. Entry i is the pitch-class that i maps to.
+        The retrograde is not part of the permutation.
+        :param mod: The number of possible pcs in the system
+        :return: A read-only array of length mod
+        """
+        return _get_permutation(self._t, self._m, mod)
+
     def __call__(self, item):
         """
         Transforms an item (can be a pitch-class, list, set, or any number of nestings of these objects)
@@ -196,7 +235,7 @@ class OTO:
                 elif t == set:
                     new_item.add(self.transform(item2))
                 elif t == PitchClass:
-                    new_item.append(PitchClass(item2.pc * self._m + self._t, item2.mod))
+                    new_item.add(PitchClass(item2.pc * self._m + self._t, item2.mod))
                 else:
                     raise ArithmeticError("Cannot transform a type other than a PitchClass.")
         else:
@@ -211,8 +250,10 @@ class UTO:
     Represents an unordered tone operator (UTO), which can be used as a twelve-tone operator (TTO)
     or 24-tone operator (24TO). Objects of this class are subscriptable.
     [0] is the index of transposition. [1] is the multiplier. Multiplication is performed first,
-    then transposition.
+    then transposition. UTOs are immutable.
     """
+    __slots__ = ("_t", "_m")
+
     def __init__(self, T=0, M=1):
         """
         Creates a UTO
@@ -246,6 +287,8 @@ class UTO:
             raise TypeError("The T and M values must be integers, or the T value must be a transformation string.")
 
     def __eq__(self, other):
+        if type(other) != UTO:
+            return NotImplemented
         return self._t == other._t and self._m == other._m
 
     def __ge__(self, other):
@@ -284,6 +327,8 @@ class UTO:
             return False
 
     def __ne__(self, other):
+        if type(other) != UTO:
+            return NotImplemented
         return self._t != other._t or self._m != other._m
 
     def __repr__(self):
@@ -312,6 +357,16 @@ class UTO:
         """
         return self._m
 
+    def apply(self, pcs, mod: int = 12) -> np.ndarray:
+        """
+        Transforms pcs stored as an integer array (for example a pcseg, or a 2D array of rows).
+        This is a single array lookup, so it is much faster than transforming PitchClass objects.
+        :param pcs: An array of pitch-class integers
+        :param mod: The number of possible pcs in the system
+        :return: The transformed pcs, as an array of the same shape
+        """
+        return _get_permutation(self._t, self._m, mod).take(np.asarray(pcs) % mod)
+
     def cycles(self, mod: int = 12) -> list:
         """
         Gets the cycles of the UTO
@@ -341,6 +396,14 @@ class UTO:
         """
         return UTO((-self._m * self._t) % mod, self._m)
 
+    def permutation(self, mod: int = 12) -> np.ndarray:
+        """
+        Gets the pitch-class permutation of the UTO. Entry i is the pitch-class that i maps to.
+        :param mod: The number of possible pcs in the system
+        :return: A read-only array of length mod
+        """
+        return _get_permutation(self._t, self._m, mod)
+
     def __call__(self, item):
         """
         Transforms a pcset, pcseg, or pc
@@ -364,43 +427,86 @@ class UTO:
         return self.__call__(item)
 
 
-def find_otos(pcseg1: list, pcseg2: list):
+def find_oto_occurrences(pcseg1: list, pcseg2: list) -> list:
     """
-    Gets all OTO transformations of pcseg1 that contain pcseg2 as an ordered subseg
+    Finds every occurrence of pcseg2 as an ordered subseg of an OTO transformation of pcseg1.
     :param pcseg1: A pcseg
     :param pcseg2: A pcseg
-    :return: A set of OTOs that transform pcseg1 so that it contains pcseg2.
-    *Compatible with PitchClasses mod 12 and 24
+    :return: A list of (OTO, offset) tuples, sorted by offset and then by OTO. The offset is the
+    order position of pcseg2 in the transformed pcseg1.
+    *Compatible with all PitchClass modulos
     """
-    otos = None
-    oto_set = set()
+    return [(oto, offset) for i, oto, offset in find_oto_occurrences_batch([pcseg1], pcseg2)]
+
 
-    if len(pcseg1) > 0 and len(pcseg2) > 0:
-        mod = pcseg1[0].mod
-        if mod == 12:
-            otos = get_otos12()
-        elif mod == 24:
-            otos = get_otos24()
+def find_oto_occurrences_batch(pcsegs: list, pcseg2: list) -> list:
+    """
+    Finds every occurrence of pcseg2 as an ordered subseg of an OTO transformation of each pcseg in a list.
+    The pcsegs are encoded as directed-interval strings and joined into one text, so each distinct interval
+    pattern (one for each multiplier, with and without retrograde) is found with a single linear-time
+    (Knuth-Morris-Pratt) pass over the whole list, instead of transforming and scanning each pcseg once per OTO.
+    :param pcsegs: A list of pcsegs
+    :param pcseg2: A pcseg to search for
+    :return: A list of (pcseg index, OTO, offset) tuples, sorted by pcseg index, offset, and then OTO.
+    The offset is the order position of pcseg2 in the transformed pcseg.
+    *Compatible with all PitchClass modulos
+    """
+    occurrences = []
+    if len(pcseg2) == 0:
+        return occurrences
+    mod = pcseg2[0].mod
+    otos = {(oto.T, oto.R, oto.M): oto for oto in get_otos(mod).values()}
+    query = [pc.pc for pc in pcseg2]
+    size = len(query)
+    intervals = [(query[i + 1] - query[i]) % mod for i in range(size - 1)]
+
+    # A window w of a pcseg maps onto the query under TnMm if m(w[i+1] - w[i]) = q[i+1] - q[i], so the
+    # window intervals must equal the query intervals times the inverse of m. Under TnRMm the window
+    # is read backward, so its intervals must equal the negated pattern in reverse order.
+    patterns = {}
+    for name, m in _get_uto_names(0, mod):
+        pattern = [interval * pow(m, -1, mod) % mod for interval in intervals]
+        patterns.setdefault(tuple(pattern), []).append((False, m))
+        patterns.setdefault(tuple(-interval % mod for interval in reversed(pattern)), []).append((True, m))
+
+    # The interval strings are joined with a separator (-1), so that no match crosses two pcsegs.
+    rows = [[pc.pc for pc in pcseg] for pcseg in pcsegs]
+    text = []
+    starts = []
+    for row in rows:
+        starts.append(len(text))
+        text += [(row[i + 1] - row[i]) % mod for i in range(len(row) - 1)]
+        text.append(-1)
+
+    for pattern, operators in patterns.items():
+        if size > 1:
+            positions = _kmp_search(text, pattern)
         else:
-            return oto_set
-        
-        for oto in otos:
-            pcseg3 = otos[oto].transform(pcseg1)
-            # Search each transformation in t
-            done_searching = False
-            for i in range(len(pcseg3)):
-                if len(pcseg2) > len(pcseg3) - i:
-                    break
-                done_searching = True
-                for j in range(i, i + len(pcseg2)):
-                    if pcseg3[j] != pcseg2[j - i]:
-                        done_searching = False
-                        break
-                if done_searching:
-                    oto_set.add(otos[oto])
-                    break
+            positions = [starts[i] + j for i, row in enumerate(rows) for j in range(len(row))]
+        for position in positions:
+            i = bisect.bisect_right(starts, position) - 1
+            j = position - starts[i]
+            row = rows[i]
+            for r, m in operators:
+                if r:
+                    occurrences.append((i, otos[((query[0] - m * row[j + size - 1]) % mod, True, m)], len(row) - size - j))
+                else:
+                    occurrences.append((i, otos[((query[0] - m * row[j]) % mod, False, m)], j))
+    occurrences.sort(key=lambda occurrence: (occurrence[0], occurrence[2], occurrence[1]))
+    return occurrences
 
-    return oto_set
+
+def find_otos(pcseg1: list, pcseg2: list):
+    """
+    Gets all OTO transformations of pcseg1 that contain pcseg2 as an ordered subseg
+    :param pcseg1: A pcseg
+    :param pcseg2: A pcseg
+    :return: A set of OTOs that transform pcseg1 so that it contains pcseg2.
+    *Compatible with all PitchClass modulos
+    """
+    if len(pcseg1) == 0:
+        return set()
+    return {oto for oto, offset in find_oto_occurrences(pcseg1, pcseg2)}
 
 
 def find_utos(pcset1: set, pcset2: set):
@@ -409,18 +515,12 @@ def find_utos(pcset1: set, pcset2: set):
     :param pcset1: A pcset
     :param pcset2: A pcset
     :return: A list of UTOS
+    *Compatible with all PitchClass modulos
     """
     utos_final = set()
 
     if len(pcset1) > 0 and len(pcset2) > 0:
-        mod = next(iter(pcset1)).mod
-        if mod == 12:
-            utos = get_utos12()
-        elif mod == 24:
-            utos = get_utos24()
-        else:
-            return utos_final
-        
+        utos = get_utos(next(iter(pcset1)).mod)
         for uto in utos:
             pcset1_transformed = utos[uto].transform(pcset1)
             valid = True
@@ -434,80 +534,115 @@ def find_utos(pcset1: set, pcset2: set):
     return utos_final
 
 
-def get_otos12() -> list:
+def get_otos(mod: int = 12) -> MappingProxyType:
+    """
+    Gets all invertible OTOs for a modulo. The catalogue is built once and shared, so it is read-only.
+    For mod 12 and mod 24, the names are the same as in get_otos12() and get_otos24(). For other
+    modulos, the names are T{n}, T{n}R, T{n}M{m}, T{n}RM{m}, T{n}I, and T{n}RI.
+    :param mod: The number of pcs in the system
+    :return: A read-only dictionary of OTOs
+    """
+    if mod not in _oto_catalogues:
+        otos = {}
+        for i in range(mod):
+            for name, uto in _get_uto_names(i, mod):
+                otos[name] = OTO(i, False, uto)
+                otos[name[:len(f"T{i}")] + "R" + name[len(f"T{i}"):]] = OTO(i, True, uto)
+        _oto_catalogues[mod] = MappingProxyType(otos)
+    return _oto_catalogues[mod]
+
+
+def get_otos12() -> MappingProxyType:
     """
     Gets chromatic OTOs (ROs)
-    :return: A list of OTOs
+    :return: A read-only dictionary of OTOs
     """
-    otos = {}
-    for i in range(12):
-        otos[f"T{i}"] = OTO(i, False, 1)
-        otos[f"T{i}R"] = OTO(i, True, 1)
-        otos[f"T{i}M"] = OTO(i, False, 5)
-        otos[f"T{i}RM"] = OTO(i, True, 5)
-        otos[f"T{i}MI"] = OTO(i, False, 7)
-        otos[f"T{i}RMI"] = OTO(i, True, 7)
-        otos[f"T{i}I"] = OTO(i, False, 11)
-        otos[f"T{i}RI"] = OTO(i, True, 11)
-    return otos
+    return get_otos(12)
 
 
-def get_otos24() -> list:
+def get_otos24() -> MappingProxyType:
     """
     Gets microtonal OTOs
-    :return: A list of microtonal OTOs
-    """
-    otos = {}
-    for i in range(24):
-        otos[f"T{i}"] = OTO(i, 0, 1)
-        otos[f"T{i}R"] = OTO(i, 1, 1)
-        otos[f"T{i}M5"] = OTO(i, 0, 5)
-        otos[f"T{i}RM5"] = OTO(i, 1, 5)
-        otos[f"T{i}M7"] = OTO(i, 0, 7)
-        otos[f"T{i}RM7"] = OTO(i, 1, 7)
-        otos[f"T{i}M11"] = OTO(i, 0, 11)
-        otos[f"T{i}RM11"] = OTO(i, 1, 11)
-        otos[f"T{i}M13"] = OTO(i, 0, 13)
-        otos[f"T{i}RM13"] = OTO(i, 1, 13)
-        otos[f"T{i}M17"] = OTO(i, 0, 17)
-        otos[f"T{i}RM17"] = OTO(i, 1, 17)
-        otos[f"T{i}M19"] = OTO(i, 0, 19)
-        otos[f"T{i}RM19"] = OTO(i, 1, 19)
-        otos[f"T{i}I"] = OTO(i, 0, 23)
-        otos[f"T{i}RI"] = OTO(i, 1, 23)
-    return otos
-
-
-def get_utos12() -> dict:
+    :return: A read-only dictionary of microtonal OTOs
+    """
+    return get_otos(24)
+
+
+def get_uto_cayley_table(mod: int = 12) -> np.ndarray:
+    """
+    Gets the composition (Cayley) table of the UTOs, in the order of get_uto_list(). Entry [i, j]
+    is the index of the UTO that results from applying UTO j and then UTO i (the same as
+    left_multiply_utos(utos[i], utos[j])).
+    :param mod: The number of pcs in the system
+    :return: A read-only 2D array of UTO indices (48 x 48 for mod 12, 192 x 192 for mod 24)
+    """
+    return _get_uto_table(mod)["cayley"]
+
+
+def get_uto_index(uto: UTO, mod: int = 12) -> int:
+    """
+    Gets the index of a UTO in get_uto_list()
+    :param uto: A UTO
+    :param mod: The number of pcs in the system
+    :return: The index
+    """
+    index = _get_uto_table(mod)["index"].get((uto.T % mod, uto.M % mod))
+    if index is None:
+        raise ValueError(f"The UTO {uto} is not invertible in mod {mod}.")
+    return index
+
+
+def get_uto_list(mod: int = 12) -> tuple:
+    """
+    Gets all invertible UTOs, ordered by multiplier and then by index of transposition.
+    This order is used by get_uto_cayley_table() and get_uto_permutations().
+    :param mod: The number of pcs in the system
+    :return: A tuple of UTOs (48 for mod 12, 192 for mod 24)
+    """
+    return _get_uto_table(mod)["utos"]
+
+
+def get_uto_permutations(mod: int = 12) -> np.ndarray:
+    """
+    Gets the pitch-class permutations of all UTOs, in the order of get_uto_list(). To apply many
+    UTOs to many rows at once, index this array, e.g. perms[uto_indices[:, None], rows].
+    :param mod: The number of pcs in the system
+    :return: A read-only 2D array with one permutation per row
+    """
+    return _get_uto_table(mod)["permutations"]
+
+
+def get_utos(mod: int = 12) -> MappingProxyType:
+    """
+    Gets all invertible UTOs for a modulo. The catalogue is built once and shared, so it is read-only.
+    For mod 12 and mod 24, the names are the same as in get_utos12() and get_utos24(). For other
+    modulos, the names are T{n}, T{n}M{m}, and T{n}I.
+    :param mod: The number of pcs in the system
+    :return: A read-only dictionary of UTOs
+    """
+    if mod not in _uto_catalogues:
+        utos = {}
+        for i in range(mod):
+            for name, m in _get_uto_names(i, mod):
+                utos[name] = UTO(i, m)
+        _uto_catalogues[mod] = MappingProxyType(utos)
+    return _uto_catalogues[mod]
+
+
+def get_utos12() -> MappingProxyType:
     """
     Gets the twelve-tone UTOs (TTOs)
-    :return: A dictionary of UTOs
+    :return: A read-only dictionary of UTOs
     """
-    utos = {}
-    for i in range(12):
-        utos[f"T{i}"] = UTO(i, 1)
-        utos[f"T{i}M"] = UTO(i, 5)
-        utos[f"T{i}MI"] = UTO(i, 7)
-        utos[f"T{i}I"] = UTO(i, 11)
-    return utos
+    return get_utos(12)
 
 
-def get_utos24() -> dict:
+def get_utos24() -> MappingProxyType:
     """
     Gets the 24-tone UTOs (24TOs)
-    :return: A dictionary of UTOs
+    :return: A read-only dictionary of UTOs
     """
-    utos = {}
-    for i in range(24):
-        utos[f"T{i}"] = UTO(i, 1)
-        utos[f"T{i}M5"] = UTO(i, 5)
-        utos[f"T{i}M7"] = UTO(i, 7)
-        utos[f"T{i}M11"] = UTO(i, 11)
-        utos[f"T{i}M13"] = UTO(i, 13)
-        utos[f"T{i}M17"] = UTO(i, 17)
-        utos[f"T{i}M19"] = UTO(i, 19)
-        utos[f"T{i}I"] = UTO(i, 23)
-    return utos
+    return get_utos(24)
 
 
 def left_multiply_utos(*args, mod: int = 12) -> UTO:
@@ -540,6 +675,24 @@ def left_multiply_utos(*args, mod: int = 12) -> UTO:
         return UTO(n % mod, m % mod)
 
 
+def left_multiply_uto_indices(chains, mod: int = 12) -> np.ndarray:
+    """
+    Left-multiplies many chains of UTOs at once, using the Cayley table. UTOs are given by their
+    index in get_uto_list(). As in left_multiply_utos(), the last UTO in each chain is applied first.
+    :param chains: A 2D array of UTO indices, with one chain per row
+    :param mod: The number of pcs in the system
+    :return: An array with the index of the resulting UTO for each chain
+    """
+    cayley = _get_uto_table(mod)["cayley"]
+    chains = np.asarray(chains)
+    if chains.ndim != 2:
+        raise ValueError("The chains must be a 2D array of UTO indices.")
+    result = chains[:, -1].copy()
+    for i in range(chains.shape[1] - 2, -1, -1):
+        result = cayley[chains[:, i], result]
+    return result
+
+
 def make_uto_list(*args) -> list:
     """
     Makes a UTO list
@@ -550,3 +703,92 @@ def make_uto_list(*args) -> list:
     for uto in args:
         uto_list.append(UTO(uto.T, uto.M))
     return uto_list
+
+
+def _get_permutation(t: int, m: int, mod: int) -> np.ndarray:
+    """
+    Gets the shared permutation array for the operator x -> mx + t
+    :param t: The index of transposition
+    :param m: The multiplier
+    :param mod: The number of pcs in the system
+    :return: A read-only array of length mod
+    """
+    key = (t % mod, m % mod, mod)
+    if key not in _permutations:
+        permutation = (np.arange(mod, dtype=np.int64) * key[1] + key[0]) % mod
+        permutation.flags.writeable = False
+        _permutations[key] = permutation
+    return _permutations[key]
+
+
+def _get_uto_names(t: int, mod: int) -> list:
+    """
+    Gets the names and multipliers of the invertible UTOs with a given index of transposition
+    :param t: The index of transposition
+    :param mod: The number of pcs in the system
+    :return: A list of (name, multiplier) tuples
+    """
+    if mod == 12:
+        return [(f"T{t}", 1), (f"T{t}M", 5), (f"T{t}MI", 7), (f"T{t}I", 11)]
+    names = []
+    for m in range(1, mod):
+        if math.gcd(m, mod) == 1:
+            if m == 1:
+                names.append((f"T{t}", m))
+            elif m == mod - 1:
+                names.append((f"T{t}I", m))
+            else:
+                names.append((f"T{t}M{m}", m))
+    return names
+
+
+def _get_uto_table(mod: int) -> dict:
+    """
+    Gets the shared UTO list, index, permutations, and Cayley table for a modulo, building them on first use
+    :param mod: The number of pcs in the system
+    :return: A dictionary of tables
+    """
+    if mod not in _uto_tables:
+        if type(mod) != int or mod < 1:
+            raise ValueError("The modulo must be a positive integer.")
+        multipliers = [m for m in range(mod) if math.gcd(m, mod) == 1]
+        catalogue = {(uto.T, uto.M): uto for uto in get_utos(mod).values()}
+        utos = tuple(catalogue[(t, m)] for m in multipliers for t in range(mod))
+        index = {(uto.T, uto.M): i for i, uto in enumerate(utos)}
+        permutations = np.array([(np.arange(mod) * uto.M + uto.T) % mod for uto in utos], dtype=np.int64)
+        permutations.flags.writeable = False
+        # Applying j and then i: x -> m_i(m_j x + t_j) + t_i
+        cayley = np.array([[index[((ui.M * uj.T + ui.T) % mod, (ui.M * uj.M) % mod)] for uj in utos] for ui in utos],
+                          dtype=np.int16)
+        cayley.flags.writeable = False
+        _uto_tables[mod] = {"utos": utos, "index": index, "permutations": permutations, "cayley": cayley}
+    return _uto_tables[mod]
+
+
+def _kmp_search(text: list, pattern: tuple) -> list:
+    """
+    Finds all occurrences of a non-empty pattern in a text with the Knuth-Morris-Pratt algorithm
+    :param text: A list
+    :param pattern: A pattern
+    :return: The start positions of the occurrences, in ascending order
+    """
+    # failure[i] is the length of the longest proper prefix of pattern[:i + 1] that is also a suffix of it
+    failure = [0] * len(pattern)
+    k = 0
+    for i in range(1, len(pattern)):
+        while k > 0 and pattern[i] != pattern[k]:
+            k = failure[k - 1]
+        if pattern[i] == pattern[k]:
+            k += 1
+        failure[i] = k
+    positions = []
+    k = 0
+    for i, item in enumerate(text):
+        while k > 0 and item != pattern[k]:
+            k = failure[k - 1]
+        if item == pattern[k]:
+            k += 1
+            if k == len(pattern):
+                positions.append(i - k + 1)
+                k = failure[k - 1]
+    return positions
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from pctheory import batch, pcset
+from pctheory.pcset import PcSetN, SetClass
+from pctheory.transformations import UTO, get_utos12, get_utos24
+
+class BatchTestCase(unittest.TestCase):
+    """
+    Tests batch pcset operations against the scalar functions
+    """
+    def test_conversion(self):
+        """
+        Tests converting pcsets to and from bitmasks
+        """
+        bits = batch.to_bits(np.array([[0, 4, 7, -1], [11, 2, 2, 5], [-1, -1, -1, -1]]))
+        self.assertEqual(bits.dtype, np.uint16)
+        self.assertEqual(bits.tolist(), [0b10010001, 0b100000100100, 0])
+        self.assertEqual(batch.to_bits([pcset.make12(0, 4, 7), PcSetN([2, 5, 11])]).tolist(), bits[:2].tolist())
+        self.assertEqual(batch.to_pcsets(bits), [PcSetN([0, 4, 7]), PcSetN([2, 5, 11]), PcSetN()])
+        self.assertEqual(batch.to_bits([[1, 23]], 24).dtype, np.uint32)
+        self.assertRaises(ValueError, batch.to_bits, [4096])
+        self.assertRaises(ValueError, batch.to_bits, [-1])
+        self.assertRaises(ValueError, batch.to_bits, [1], 65)
+
+    def test_mod12(self):
+        """
+        Tests batch operations on all chromatic pcsets
+        """
+        bits = np.arange(4096)
+        pcsets = [PcSetN.from_bits(b, 12) for b in range(4096)]
+        self.assertEqual(batch.transpose(bits, 5).tolist(), [pcset.transpose(s, 5).bits for s in pcsets])
+        self.assertEqual(batch.transpose(bits, bits % 12).tolist(), [pcset.transpose(s, b % 12).bits for b, s in enumerate(pcsets)])
+        self.assertEqual(batch.invert(bits).tolist(), [pcset.invert(s).bits for s in pcsets])
+        self.assertEqual(batch.multiply(bits, 5).tolist(), [pcset.multiply(s, 5).bits for s in pcsets])
+        self.assertEqual(batch.complement(bits).tolist(), [pcset.get_complement(s).bits for s in pcsets])
+        self.assertEqual(batch.cardinality(bits).tolist(), [len(s) for s in pcsets])
+        utos = list(get_utos12().values())
+        images = batch.transform_all(bits, utos)
+        for i, uto in enumerate(utos):
+            self.assertEqual(images[i].tolist(), [s.transform(uto).bits for s in pcsets])
+        for weight_right in [True, False]:
+            primes = batch.prime_form(bits, weight_right=weight_right)
+            self.assertEqual(primes.tolist(), [PcSetN(SetClass.calculate_prime_form(s.to_set(), weight_right), 12).bits
+                                               for s in pcsets])
+        self.assertEqual(batch.ic_vector(bits).tolist(), [SetClass(s.to_set(), 12).ic_vector for s in pcsets])
+        self.assertEqual(batch.ic_vector(bits, long=True).tolist(), [SetClass(s.to_set(), 12).ic_vector_long for s in pcsets])
+
+    def test_mod24(self):
+        """
+        Tests batch operations on microtonal pcsets
+        """
+        rng = np.random.default_rng(24)
+        bits = rng.integers(0, 1 << 24, size=200)
+        pcsets = [PcSetN.from_bits(int(b), 24) for b in bits]
+        self.assertEqual(batch.transpose(bits, 13, 24).tolist(), [s.transpose(13).bits for s in pcsets])
+        self.assertEqual(batch.invert(bits, 24).tolist(), [s.invert().bits for s in pcsets])
+        self.assertEqual(batch.transform(bits, UTO(7, 5), 24).tolist(), [s.transform(UTO(7, 5)).bits for s in pcsets])
+        self.assertEqual(batch.transform_all(bits, list(get_utos24().values()), 24).shape, (192, 200))
+        for weight_right in [True, False]:
+            primes = batch.prime_form(bits, 24, weight_right)
+            self.assertEqual(primes.tolist(), [PcSetN(SetClass.calculate_prime_form(s.to_set(), weight_right, 24), 24).bits
+                                               for s in pcsets])
+        self.assertEqual(batch.ic_vector(bits, 24).tolist(), [SetClass(s.to_set(), 24).ic_vector for s in pcsets])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+from pctheory import pcset, transformations
+from pctheory.group import OperatorGroup
+from pctheory.pcset import PcSetN
+from pctheory.pitch import PitchClass
+from pctheory.transformations import UTO
+
+class OperatorGroupTestCase(unittest.TestCase):
+    """
+    Tests operator groups
+    """
+    def test_creation(self):
+        """
+        Tests group creation and names
+        """
+        group = OperatorGroup([UTO("T0"), UTO("T6"), UTO("T0M5"), UTO("T6M5"), UTO("T6")])
+        self.assertEqual(group.name, "G06/06//")
+        self.assertEqual(len(group), 4)
+        self.assertEqual(group.operators, (UTO("T0"), UTO("T6"), UTO("T0M5"), UTO("T6M5")))
+        self.assertIn(UTO("T6M5"), group)
+        self.assertEqual(OperatorGroup(transformations.get_uto_list(12)).name, "G*/*/*/*")
+        self.assertEqual(OperatorGroup([UTO(0, 1), UTO(8, 1), UTO(16, 1)], 24).name, "G0,8,16///////")
+        self.assertEqual(OperatorGroup([UTO(0, 1), UTO(0, 2), UTO(0, 4)], 7).name, "G0/0//0//")
+        self.assertRaises(ValueError, OperatorGroup, [UTO(0, 2)])
+        self.assertEqual(len(OperatorGroup([UTO(i, 1) for i in range(0, 12, 3)]).get_orbits()), 3)
+
+    def test_invariance(self):
+        """
+        Tests batch stabilizers, complement maps, and orbit sizes against the single-pcset functions
+        """
+        group = OperatorGroup(transformations.get_uto_list(12))
+        stabilizers, complement_maps, orbit_sizes = group.get_invariance(np.arange(4096))
+        self.assertEqual(stabilizers.shape, (4096, 48))
+        for bits in range(0, 4096, 7):
+            s = PcSetN.from_bits(bits, 12)
+            self.assertEqual({group.operators[j] for j in np.flatnonzero(stabilizers[bits])}, pcset.get_self_map_utos(s))
+            self.assertEqual({group.operators[j] for j in np.flatnonzero(complement_maps[bits])}, pcset.get_complement_map_utos(s))
+        self.assertTrue(np.all(orbit_sizes * stabilizers.sum(axis=1) == 48))
+        ti = OperatorGroup([uto for uto in transformations.get_uto_list(12) if uto.M in [1, 11]])
+        orbit_sizes = ti.get_orbit_sizes(np.arange(1, 4096))
+        self.assertEqual(orbit_sizes.tolist(), [len(pcset.get_corpus(PcSetN.from_bits(b, 12))) for b in range(1, 4096)])
+        self.assertEqual(ti.get_stabilizers([pcset.make12("{0167}")]), [{UTO("T0"), UTO("T6"), UTO("T1I"), UTO("T7I")}])
+
+    def test_invariance24(self):
+        """
+        Tests batch stabilizers and complement maps for mod 24 pcsets
+        """
+        group = OperatorGroup(transformations.get_uto_list(24), 24)
+        bits = np.random.default_rng(10).integers(0, 1 << 24, 40)
+        pcsets = [{PitchClass(i, 24) for i in range(24) if int(b) >> i & 1} for b in bits]
+        self.assertEqual(group.get_stabilizers(bits), [pcset.get_self_map_utos(s) for s in pcsets])
+        self.assertEqual(group.get_complement_map_utos(pcsets), [pcset.get_complement_map_utos(s) for s in pcsets])
+        t = OperatorGroup([UTO(i, 1) for i in range(24)], 24)
+        self.assertEqual(t.get_orbit_sizes([[0, 6, 12, 18], [0, 1, 12, 13], [0, 1, 2, -1]]).tolist(), [6, 12, 24])
+
+
+if __name__ == "__main__":
+    unittest.main()
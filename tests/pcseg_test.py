@@ -1,5 +1,8 @@
+import importlib.resources
+import itertools
+import numpy as np
 import unittest
-from pctheory import pcseg
+from pctheory import pcseg, tables
 from pctheory.pcset import SetClass
 from pctheory.pitch import PitchClass
 
@@ -14,6 +17,35 @@ class PcSegTestCase(unittest.TestCase):
         self.assertEqual(pcseg.make_pcseg12(1, 0, 11, 9, 11), [PitchClass(1), PitchClass(0), PitchClass(11), PitchClass(9), PitchClass(11)])
         self.assertEqual(pcseg.make_pcseg12(3, 2, 4, 9, 11), [PitchClass(3), PitchClass(2), PitchClass(4), PitchClass(9), PitchClass(11)])
     
+    def test_imb_n(self):
+        """
+        Tests imbrication with SetClasses and with set-class ids
+        """
+        seg = pcseg.make12(0, 1, 1, 4, 0, 1, 6, 7, 11, 2)
+        imb = pcseg.imb_n(seg, 3)
+        self.assertEqual([sc.name_prime for sc in imb], ["[01]", "[03]", "[014]", "[014]", "[016]", "[016]", "[015]", "[037]"])
+        ids = pcseg.imb_n_ids(seg, 3)
+        self.assertEqual(ids.tolist(), [sc.class_id for sc in imb])
+        self.assertEqual(pcseg.bip_n(ids.tolist()), pcseg.bip_n(imb))
+        segs = np.random.default_rng(5).integers(0, 12, (50, 40))
+        ids = pcseg.imb_n_ids(segs, 5)
+        self.assertEqual(ids.shape, (50, 36))
+        for i in range(0, 50, 7):
+            imb = pcseg.imb_n(pcseg.make12(segs[i].tolist()), 5)
+            self.assertEqual(ids[i].tolist(), [sc.class_id for sc in imb])
+            self.assertEqual(pcseg.bip_n(ids)[i].tolist(), pcseg.bip_n(imb))
+        seg = [PitchClass(pc, 7) for pc in [0, 3, 5, 1, 1, 6]]
+        self.assertEqual(pcseg.imb_n_ids(seg, 3).tolist(), [21, 21, 9, 5])
+        self.assertEqual([sc.name_prime for sc in pcseg.imb_n(seg, 3)], ["[024]", "[024]", "[03]", "[02]"])
+        self.assertEqual(pcseg.imb_n_ids(seg, 7).shape, (0,))
+        self.assertRaises(ValueError, pcseg.imb_n_ids, seg, 0)
+
+        # BIP_n is only defined for chromatic set-classes
+        self.assertRaises(ValueError, pcseg.bip_n, pcseg.imb_n(seg, 3))
+        self.assertRaises(ValueError, pcseg.bip_n, pcseg.imb_n_ids(seg, 3), 7)
+        seg24 = [PitchClass(pc, 24) for pc in [0, 13, 7, 22, 5]]
+        self.assertRaises(ValueError, pcseg.bip_n, pcseg.imb_n_ids(seg24, 3))
+
     def test_operations(self):
         """
         Tests operations on pcsegs
@@ -49,6 +81,41 @@ class RowTestCase(unittest.TestCase):
         else:
             return False
 
+    def test_enumerate_all_interval_rows(self):
+        """
+        Tests all-interval row enumeration
+        """
+        rows = list(pcseg.enumerate_all_interval_rows(12, False))
+        self.assertEqual(len(rows), 3856)
+        self.assertTrue(all(pcseg.is_all_interval_row(row) and row[0] == PitchClass(0) for row in rows))
+        generators = {tuple(interval % 12 for interval in pcseg.get_intervals(row)) for row in rows}
+        self.assertTrue(set(tables.get_row_table_eleven_interval()) <= generators)
+        representatives = list(pcseg.enumerate_all_interval_rows(12))
+        self.assertEqual(len(representatives), 1008)
+        self.assertEqual(sum(len(pcseg.get_row_class(row)) for row in representatives), 3856 * 12)
+        self.assertEqual([len(list(pcseg.enumerate_all_interval_rows(mod, False))) for mod in [2, 4, 6, 8, 10]], [1, 2, 4, 24, 288])
+        self.assertEqual(list(pcseg.enumerate_all_interval_rows(10, processes=2)), list(pcseg.enumerate_all_interval_rows(10)))
+        row24 = next(pcseg.enumerate_all_interval_rows(24))
+        self.assertEqual(len({(row24[i].pc - row24[i - 1].pc) % 24 for i in range(1, 24)}), 23)
+        self.assertRaises(ValueError, next, pcseg.enumerate_all_interval_rows(11))
+
+    def test_enumerate_imb_n_rows(self):
+        """
+        Tests trichord row enumeration and regenerating the row tables
+        """
+        data = importlib.resources.files("pctheory.data")
+        self.assertEqual(pcseg.create_row_table("all_trichord_babbitt"), data.joinpath("babbitt_trichord.bin").read_bytes())
+        self.assertEqual(pcseg.create_row_table("eleven_interval"), data.joinpath("eleven_interval.bin").read_bytes())
+        rows = list(itertools.islice(pcseg.enumerate_imb_n_rows(3, excluded=[SetClass("[036]"), SetClass("[048]")], include_inversions=True), 200))
+        self.assertTrue(all(pcseg.is_all_trichord_babbitt_row(row) for row in rows))
+        self.assertEqual(rows, sorted(rows, key=lambda row: [pc.pc for pc in row]))
+        self.assertEqual(pcseg.make12(list(tables.get_row_table_all_trichord()[0])), next(pcseg.enumerate_imb_n_rows(3, cyclic=True)))
+        self.assertEqual(list(pcseg.enumerate_imb_n_rows(3, 10, processes=2)), list(pcseg.enumerate_imb_n_rows(3, 10)))
+        row = next(pcseg.enumerate_imb_n_rows(4, 16))
+        self.assertEqual(len(set(pcseg.imb_n(row, 4))), 13)
+        self.assertEqual(list(pcseg.enumerate_imb_n_rows(3, 12, cyclic=True, excluded=[SetClass("[012]")])), [])
+        self.assertRaises(ValueError, pcseg.create_row_table, "all_combinatorial")
+
     def test_row_creation(self):
         """
         Tests row creation
@@ -105,7 +172,7 @@ class RowTestCase(unittest.TestCase):
         ]
         ttmx = pcseg.TwelveToneMatrix(row)
         for i in range(len(mx)):
-            self.assertEqual(ttmx._mx[i], mx[i])
+            self.assertEqual(ttmx.get_row(i), mx[i])
         self.assertEqual(ttmx.labels_top, ["T0I", "T1I", "T6I", "T7I", "T5I", "T2I", "T4I", "T3I", "T10I", "T9I", "T11I", "T8I"])
         self.assertEqual(ttmx.labels_bottom, ["T0RI", "T1RI", "T6RI", "T7RI", "T5RI", "T2RI", "T4RI", "T3RI", "T10RI", "T9RI", "T11RI", "T8RI"])
         self.assertEqual(ttmx.labels_left, ["T0", "T11", "T6", "T5", "T7", "T10", "T8", "T9", "T2", "T3", "T1", "T4"])
@@ -114,7 +181,43 @@ class RowTestCase(unittest.TestCase):
         # Test retrieval
         self.assertEqual(ttmx.get_column(2), pcseg.make12("[650B1423897A]"))
         self.assertEqual(ttmx.get_row(2), pcseg.make12("[6701B8A94352]"))
+        self.assertEqual(ttmx.array.tolist(), [[pc.pc for pc in pcs] for pcs in mx])
+
+        # Test queries
+        self.assertEqual(ttmx.find_forms(pcseg.make12(4, 3)), [("T0", 6), ("T6", 8), ("T4I", 0), ("T10I", 2), ("T9R", 8), ("T3R", 10), ("T1RI", 2), ("T7RI", 4)])
+        self.assertEqual(ttmx.find_pcs(PitchClass(0)).tolist(), [[i, i] for i in range(12)])
+        invariants = ttmx.count_invariant_pcs("T0", 6)
+        self.assertEqual([label for label in invariants if invariants[label] == 12], ["T0", "T7I"])
+        self.assertEqual(invariants["T6"], 8)
+        self.assertEqual(ttmx.count_invariant_pcs("T0")["T8RI"], 4)
+        self.assertRaises(ValueError, ttmx.count_invariant_pcs, "T0", 5)
+
+        # Test importing another row
+        ttmx.import_row(pcseg.make12("[0B7438196A52]"))
+        self.assertEqual(ttmx.array.shape, (12, 12))
+        self.assertEqual(ttmx.labels_left[:3], ["T0", "T1", "T5"])
 
+class SegmentIndexTestCase(unittest.TestCase):
+    """
+    Tests the suffix-array pcseg index
+    """
+    def test_search(self):
+        """
+        Tests literal and invariant searches against adjacent_search
+        """
+        corpus = [pcseg.make12("0123"), pcseg.make12("9A"), pcseg.make12("56789A"), pcseg.make12(""), pcseg.make12("34AB9A")]
+        index = pcseg.SegmentIndex(corpus)
+        self.assertEqual(pcseg.adjacent_search(pcseg.make12("9A"), corpus), [corpus[1], corpus[2], corpus[4]])
+        self.assertEqual(index.search(pcseg.make12("9A")), pcseg.adjacent_search(pcseg.make12("9A"), corpus))
+        self.assertEqual(index.find(pcseg.make12("A")), [(1, 1), (2, 5), (4, 2), (4, 5)])
+        self.assertEqual(index.count(pcseg.make12("23")), 1)
+        self.assertEqual(index.find(pcseg.make12("A0")), [])
+        self.assertEqual(pcseg.SegmentIndex(corpus, "T").find(pcseg.make12("45")), [(0, 0), (0, 1), (0, 2), (1, 0), (2, 0), (2, 1), (2, 2), (2, 3), (2, 4), (4, 0), (4, 2), (4, 4)])
+        self.assertEqual(pcseg.SegmentIndex(corpus, "T").search(pcseg.make12("A9")), [])
+        self.assertEqual(pcseg.SegmentIndex(corpus, "TI").search(pcseg.make12("A9")), [corpus[0], corpus[1], corpus[2], corpus[4]])
+        self.assertRaises(ValueError, index.find, [])
+        self.assertRaises(ValueError, pcseg.SegmentIndex, corpus, "R")
+        
 class InvarianceMatrixTestCase(unittest.TestCase):
     """
     Tests invariance matrices
@@ -142,7 +245,7 @@ class InvarianceMatrixTestCase(unittest.TestCase):
             pcseg.make12("[984105A6372B]"),
         ]
         for i in range(len(mx)):
-            self.assertEqual(imx._mx[i], mx[i])
+            self.assertEqual(imx.get_row(i), mx[i])
     
     def test_tmx(self):
         """
@@ -168,7 +271,7 @@ class InvarianceMatrixTestCase(unittest.TestCase):
             pcseg.make12("[B27638A91450]"),
         ]
         for i in range(len(mx)):
-            self.assertEqual(tmx._mx[i], mx[i])
+            self.assertEqual(tmx.get_row(i), mx[i])
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,7 @@
 import unittest
-from pctheory import pcset
-from pctheory.pcset import SetClass
+import numpy as np
+from pctheory import pcseg, pcset, transformations
+from pctheory.pcset import PcSet12, PcSetN, SetClass, SetClassTable12
 from pctheory.pitch import PitchClass
 from pctheory.transformations import UTO
 
@@ -291,6 +292,20 @@ class PcSetTestCase(unittest.TestCase):
         self.assertEqual(pcset.get_complement_map_utos(pcset.make12("{0134}")),
             {UTO("T5"), UTO("T6"), UTO("T7"), UTO("T9I"), UTO("T10I"), UTO("T11I"),
             UTO("T2M5"), UTO("T6M5"), UTO("T2M7"), UTO("T10M7")})
+        self.assertEqual(pcset.get_complement_map_utos(PcSetN(pcset.make12("{0134}"))), pcset.get_complement_map_utos(pcset.make12("{0134}")))
+        self.assertEqual(pcset.get_complement_map_utos(PcSetN([0, 1], 7)), {UTO(2, 1), UTO(3, 1), UTO(4, 1), UTO(5, 1),
+            UTO(2, 2), UTO(3, 2), UTO(4, 2), UTO(2, 3), UTO(3, 3), UTO(6, 3), UTO(2, 4), UTO(5, 4), UTO(6, 4),
+            UTO(4, 5), UTO(5, 5), UTO(6, 5), UTO(3, 6), UTO(4, 6), UTO(5, 6), UTO(6, 6)})
+
+    def test_self_map_utos(self):
+        """
+        Tests self map UTO generation
+        """
+        self.assertEqual(pcset.get_self_map_utos(pcset.make12("{0167}")), {UTO("T0"), UTO("T6"), UTO("T1I"), UTO("T7I"),
+            UTO("T1M5"), UTO("T7M5"), UTO("T0M7"), UTO("T6M7")})
+        self.assertEqual(pcset.get_self_map_utos(PcSetN(pcset.make12("{0167}"))), pcset.get_self_map_utos(pcset.make12("{0167}")))
+        self.assertEqual(pcset.get_self_map_utos(PcSetN([0, 1, 3], 7)), {UTO(0, 1), UTO(1, 2), UTO(3, 4)})
+        self.assertEqual(len(pcset.get_self_map_utos(set())), 48)
 
     def test_corpus(self):
         """
@@ -305,6 +320,33 @@ class PcSetTestCase(unittest.TestCase):
             frozenset(pcset.make12("{3478B0}")),
         })
     
+    def test_iterators(self):
+        """
+        Tests lazy subset, partition, and permutation generators
+        """
+        s = pcset.make12(0, 2, 4, 7, 9)
+        subsets = pcset.iter_subsets(s)
+        self.assertEqual(next(subsets), [])
+        self.assertEqual(next(subsets), [PitchClass(0)])
+        self.assertEqual(next(subsets), [PitchClass(0), PitchClass(2)])
+        self.assertEqual(list(pcset.iter_subsets(s)), sorted(sorted(sub) for sub in pcset.subsets(s)))
+        self.assertEqual(len(list(pcset.iter_subsets(s))), 32)
+        self.assertEqual(list(pcset.iter_subsets(s, 2, 3)), [sub for sub in pcset.subsets(s) if 2 <= len(sub) <= 3])
+        self.assertEqual(list(pcset.iter_subsets(PcSetN(s), 4, 4)), [PcSetN(sub) for sub in pcset.subsets(s) if len(sub) == 4])
+        self.assertEqual(list(pcset.iter_subsets(set())), [[]])
+        partitions = list(pcset.iter_partitions2(s))
+        self.assertEqual(len(partitions), 16)
+        self.assertEqual(partitions[0], (set(), s))
+        self.assertEqual(partitions[1], (pcset.make12(0), pcset.make12(2, 4, 7, 9)))
+        self.assertEqual(list(pcset.iter_partitions2(s, 2)), [p for p in partitions if len(p[0]) == 2 or len(p[1]) == 2])
+        self.assertEqual(list(pcset.iter_partitions2(PcSetN(s), 1)), [(PcSetN(a), PcSetN(b)) for a, b in partitions if len(a) == 1 or len(b) == 1])
+        self.assertEqual(list(pcset.iter_partitions2(set())), [])
+        permutations = pcset.iter_permutations(pcset.make12(7, 0, 4))
+        self.assertEqual(next(permutations), pcseg.make_pcseg12(0, 4, 7))
+        self.assertEqual(next(permutations), pcseg.make_pcseg12(0, 7, 4))
+        self.assertEqual(list(pcset.iter_permutations(s)), pcset.permutations(s))
+        self.assertEqual(len(list(pcset.iter_permutations(s, 2))), 20)
+
     def test_is_all_combinatorial(self):
         """
         Tests detection of all-combinatorial hexachords
@@ -312,5 +354,267 @@ class PcSetTestCase(unittest.TestCase):
         self.assertTrue(pcset.is_all_combinatorial_hexachord(pcset.make12("{134568}")))
         self.assertFalse(pcset.is_all_combinatorial_hexachord(pcset.make12("{012346}")))
 
+class PcSetNTestCase(unittest.TestCase):
+    """
+    Tests bitmask pcsets
+    """
+    def test_conversion(self):
+        """
+        Tests conversion to and from sets of PitchClasses
+        """
+        s = pcset.make12(0, 4, 7, 11)
+        b = PcSet12(s)
+        self.assertEqual(b.bits, 0b100010010001)
+        self.assertEqual(b.pcs, (0, 4, 7, 11))
+        self.assertEqual(b.to_set(), s)
+        self.assertEqual(set(b), s)
+        self.assertEqual(len(b), 4)
+        self.assertEqual(PcSetN.from_bits(b.bits, 12), b)
+        self.assertEqual(PcSetN([1, 25], 24).pcs, (1,))
+        self.assertEqual(PcSetN(pcset.make24(1, 23)).mod, 24)
+        self.assertIn(PitchClass(4), b)
+        self.assertIn(16, b)
+        self.assertNotIn(PitchClass(4, 24), b)
+        self.assertEqual(hash(b), hash(PcSetN([0, 4, 7, 11], 12)))
+        self.assertEqual(len({b, PcSet12([11, 7, 4, 0])}), 1)
+        with self.assertRaises(ValueError):
+            PcSetN.from_bits(1 << 12, 12)
+        with self.assertRaises(ArithmeticError):
+            PcSet12(pcset.make24(1, 2))
+
+    def test_operations(self):
+        """
+        Tests that bitmask operations match the set operations
+        """
+        for bits in range(0, 4096, 7):
+            b = PcSetN.from_bits(bits, 12)
+            s = b.to_set()
+            for n in [0, 1, 5, 11, -3, 14]:
+                self.assertEqual(pcset.transpose(b, n).to_set(), pcset.transpose(s, n))
+                self.assertEqual(pcset.multiply(b, n).to_set(), pcset.multiply(s, n))
+            self.assertEqual(pcset.invert(b).to_set(), pcset.invert(s))
+            self.assertEqual(pcset.get_complement(b).to_set(), pcset.get_complement(s, 12))
+            self.assertEqual(pcset.transform(b, "T5I").to_set(), pcset.transform(s, "T5I"))
+            self.assertEqual(b.transform(UTO(3, 7)).to_set(), UTO(3, 7)(s))
+        for bits in range(0, 1 << 24, 99991):
+            b = PcSetN.from_bits(bits, 24)
+            s = b.to_set()
+            self.assertEqual(pcset.transpose(b, 17).to_set(), pcset.transpose(s, 17))
+            self.assertEqual(pcset.invert(b).to_set(), pcset.invert(s))
+            self.assertEqual(pcset.multiply(b, 13).to_set(), pcset.multiply(s, 13))
+
+    def test_set_algebra(self):
+        """
+        Tests union, intersection, difference, and subset checks
+        """
+        a = PcSet12([0, 1, 2, 3])
+        b = PcSet12([2, 3, 4])
+        self.assertEqual(a | b, PcSet12([0, 1, 2, 3, 4]))
+        self.assertEqual(a & b, PcSet12([2, 3]))
+        self.assertEqual(a - b, PcSet12([0, 1]))
+        self.assertEqual(a ^ b, PcSet12([0, 1, 4]))
+        self.assertEqual(a.union(pcset.make12(5)), PcSet12([0, 1, 2, 3, 5]))
+        self.assertTrue(PcSet12([1, 2]) <= a)
+        self.assertTrue(PcSet12([1, 2]) < a)
+        self.assertFalse(a < a)
+        self.assertTrue(a >= PcSet12([0]))
+        self.assertTrue(a.issubset(pcset.make12(0, 1, 2, 3, 9)))
+        self.assertTrue(a.isdisjoint(PcSet12([7, 8])))
+        self.assertEqual(a.complement(), PcSet12(range(4, 12)))
+        with self.assertRaises(ArithmeticError):
+            a | PcSetN([1], 24)
+
+    def test_module_functions(self):
+        """
+        Tests that the pcset module functions accept bitmask pcsets
+        """
+        b = PcSet12([0, 1, 3, 4])
+        s = b.to_set()
+        self.assertEqual(SetClass(b), SetClass(s))
+        self.assertEqual(pcset.get_corpus(b), {PcSetN(c) for c in pcset.get_corpus(s)})
+        self.assertEqual(pcset.get_self_map_utos(b), pcset.get_self_map_utos(s))
+        self.assertEqual(pcset.get_complement_map_utos(b), pcset.get_complement_map_utos(s))
+        self.assertEqual(pcset.transpositional_combination(b, pcset.make12(0, 6)).to_set(),
+            pcset.transpositional_combination(s, pcset.make12(0, 6)))
+        self.assertEqual(pcset.visualize(b), pcset.visualize(s))
+        self.assertEqual(pcset.subsets(b), pcset.subsets(s))
+        self.assertTrue(pcset.is_all_combinatorial_hexachord(PcSet12([1, 3, 4, 5, 6, 8])))
+
+
+class SetClassTable12TestCase(unittest.TestCase):
+    """
+    Tests the mod 12 set-class lookup table
+    """
+    def test_prime_forms(self):
+        """
+        Tests that the table prime forms and operators agree with the set-class definitions
+        """
+        table = SetClassTable12.get()
+        self.assertIs(table, SetClassTable12.get())
+        self.assertEqual(len(table), 224)
+        for bits in range(4096):
+            b = PcSetN.from_bits(bits, 12)
+            images = {b.transpose(i).bits for i in range(12)} | {b.invert().transpose(i).bits for i in range(12)}
+            # Packing from the right is the same as choosing the smallest bitmask
+            self.assertEqual(table.get_prime_form(bits).bits, min(images))
+            for weight_right in [True, False]:
+                prime = table.get_prime_form(b, weight_right)
+                self.assertEqual(b.transform(table.get_normalizing_operator(b, weight_right)), prime)
+                self.assertEqual(table.get_class_id(prime), table.get_class_id(b))
+            self.assertEqual(table.dsyms[table.get_class_id(bits)], 24 // len(images))
+
+    def test_lookup(self):
+        """
+        Tests looking up set-class data
+        """
+        table = SetClassTable12.get()
+        data = table.lookup(pcset.make12(3, 4, 8, 9, 11))
+        self.assertEqual(data["name_prime"], "[01568]")
+        self.assertEqual(data["name_forte"], "5-20")
+        self.assertEqual(data["name_morris"], "(5-20)[01568]")
+        self.assertEqual(data["prime_form"], PcSet12([0, 1, 5, 6, 8]))
+        self.assertEqual(data["ic_vector"], [2, 1, 1, 2, 3, 1])
+        self.assertEqual(data["operator"], UTO(9, 1))
+        self.assertEqual(data["invariance_vector"], SetClass("5-20").get_invariance_vector())
+        data = table.lookup(pcset.make12(3, 4, 8, 9, 11), False)
+        self.assertEqual(data["name_prime"], "[01378]")
+        self.assertEqual(data["name_forte"], "5-20")
+        self.assertEqual(data["operator"], UTO(4, 1))
+        self.assertEqual(table.names_forte[table.get_class_id(0)], "0-1")
+        self.assertEqual(table.names_forte[223], "12-1")
+        self.assertEqual(list(table.cardinalities), sorted(table.cardinalities))
+        self.assertEqual(table.ic_vectors.shape, (224, 6))
+        self.assertEqual(table.invariance_vectors.shape, (224, 8))
+
+    def test_inclusion(self):
+        """
+        Tests the abstract inclusion matrix
+        """
+        table = SetClassTable12.get()
+        inclusion = table.inclusion_matrix
+        self.assertEqual(inclusion.shape, (224, 224))
+        self.assertTrue(inclusion.diagonal().all())
+        self.assertTrue(inclusion[223].all())
+        primes = [PcSetN.from_bits(int(bits), 12) for bits in table.get_prime_bits()]
+        for i in range(0, 224, 5):
+            for j in range(224):
+                images = [primes[j].transpose(n) for n in range(12)] + [primes[j].invert().transpose(n) for n in range(12)]
+                self.assertEqual(inclusion[i, j], any(image <= primes[i] for image in images))
+        self.assertEqual(table.get_abstract_complement_id(table.get_class_id(pcset.make12(0, 1, 3, 4))),
+                         table.get_class_id(pcset.make12(0, 1, 2, 3, 4, 5, 6, 9)))
+        self.assertTrue(SetClass("6-Z17").contains_abstract_subset(SetClass("4-Z29")))
+        self.assertFalse(SetClass("6-20").contains_abstract_subset(SetClass("3-1")))
+        self.assertEqual(len(SetClass("[0147]").get_abstract_subset_classes()), 12)
+        self.assertEqual(SetClass("[0147]").class_id, table.get_class_id(pcset.make12(0, 1, 4, 7)))
+        sc24 = SetClass(pcset.make24(0, 3, 7, 13, 20))
+        for sub in [pcset.make24(4, 7, 14), pcset.make24(0, 5, 9), pcset.make24(0, 1), pcset.make24(2, 7, 14, 18)]:
+            images = [uto.transform(sub) for uto in transformations.get_utos24().values() if uto.M in [1, 23]]
+            self.assertEqual(sc24.contains_abstract_subset(SetClass(sub)), any(image <= sc24.pcset for image in images))
+
+    def test_weight_right(self):
+        """
+        Tests changing the packing of a SetClass
+        """
+        sc = SetClass(pcset.make12(3, 4, 8, 9, 11))
+        sc.weight_right = False
+        self.assertEqual(sc.name_prime, "[01378]")
+        self.assertEqual(sc.name_morris, "(5-20)[01378]")
+        self.assertEqual(sc.pcset, pcset.make12(0, 1, 3, 7, 8))
+
+    def test_subset_class_census(self):
+        """
+        Tests subset-class vectors and censuses
+        """
+        table = SetClassTable12.get()
+        vectors = table.subset_class_vectors
+        self.assertEqual(vectors.shape, (224, 224))
+        self.assertEqual(vectors.sum(axis=1).tolist(), [2 ** int(n) for n in table.cardinalities])
+        self.assertTrue(np.array_equal(vectors > 0, table.inclusion_matrix))
+        self.assertIs(table.subset_class_vectors, vectors)
+        census = SetClass(pcset.make12(0, 1, 4, 7)).get_subset_class_census()
+        self.assertEqual([(sc.name_forte, cardinality, multiplicity) for sc, cardinality, multiplicity in census],
+                         [("0-1", 0, 1), ("1-1", 1, 4), ("2-1", 2, 1), ("2-3", 2, 2), ("2-4", 2, 1), ("2-5", 2, 1),
+                          ("2-6", 2, 1), ("3-3", 3, 1), ("3-5", 3, 1), ("3-10", 3, 1), ("3-11", 3, 1), ("4-18", 4, 1)])
+        self.assertIs(census[3][0], SetClass.intern(pcset.make12(0, 3)))
+        sc24 = SetClass(pcset.make24(0, 1, 3, 7, 12, 13), 24)
+        census = sc24.get_subset_class_census()
+        self.assertEqual(sum(multiplicity for sc, cardinality, multiplicity in census), 64)
+        self.assertEqual({sc for sc, cardinality, multiplicity in census}, sc24.get_abstract_subset_classes())
+        for sc, cardinality, multiplicity in census:
+            self.assertEqual(multiplicity, sum(1 for sub in pcset.iter_subsets(sc24.pcset, cardinality, cardinality) if SetClass(sub, 24) == sc))
+
+
+class SetClassInternTestCase(unittest.TestCase):
+    """
+    Tests interned SetClasses
+    """
+    def setUp(self):
+        SetClass.clear_intern_cache()
+
+    def tearDown(self):
+        SetClass.set_intern_cache_capacity(4096)
+        SetClass.clear_intern_cache()
+
+    def test_intern(self):
+        """
+        Tests that equivalent pcsets share a single SetClass
+        """
+        sc1 = SetClass.intern(pcset.make12(3, 4, 8, 9, 11))
+        sc2 = SetClass.intern(PcSet12([1, 2, 6, 7, 9]))
+        sc3 = SetClass.intern("5-20")
+        self.assertIs(sc1, sc2)
+        self.assertIs(sc1, sc3)
+        self.assertEqual(sc1, SetClass("5-20"))
+        self.assertEqual(hash(sc1), hash(SetClass("5-20")))
+        self.assertEqual(sc1.name_morris, "(5-20)[01568]")
+        self.assertIsNot(sc1, SetClass.intern(pcset.make12(3, 4, 8, 9, 11), weight_right=False))
+        self.assertEqual(SetClass.intern(pcset.make12(3, 4, 8, 9, 11), weight_right=False).name_prime, "[01378]")
+        self.assertEqual(SetClass.get_intern_cache_info(), {"hits": 3, "misses": 2, "size": 2, "capacity": 4096})
+        sc4 = SetClass.intern(pcset.make24(0, 3, 7))
+        self.assertIs(sc4, SetClass.intern(pcset.make24(1, 4, 8)))
+        self.assertEqual(sc4.mod, 24)
+        self.assertEqual(sc4, SetClass(pcset.make24(0, 3, 7)))
+        self.assertIs(SetClass.get_set_classes12()[5], SetClass.get_set_classes12()[5])
+        self.assertEqual(len(SetClass.get_set_classes12([3])), 12)
+
+    def test_immutable(self):
+        """
+        Tests that interned SetClasses cannot be modified
+        """
+        sc = SetClass.intern(pcset.make12(0, 1, 3, 4))
+        with self.assertRaises(AttributeError):
+            sc.pcset = pcset.make12(0, 1, 2)
+        with self.assertRaises(AttributeError):
+            sc.weight_right = False
+        with self.assertRaises(AttributeError):
+            sc.load_from_name("3-1")
+        with self.assertRaises(ArithmeticError):
+            SetClass.intern(pcset.make24(0, 1, 2), 12)
+
+        # Mutating the result of a getter does not leak into the cache
+        sc = SetClass.intern("3-11")
+        sc.pcset.add(PitchClass(1))
+        sc.ic_vector[0] = 5
+        sc.ic_vector_long.append(1)
+        self.assertEqual(SetClass.intern("3-11").pcset, pcset.make12(0, 3, 7))
+        self.assertEqual(SetClass.intern(pcset.make12(0, 3, 7)).ic_vector, [0, 0, 1, 1, 1, 0])
+        self.assertEqual(SetClass.intern("3-11").ic_vector_long, [3, 0, 0, 1, 1, 1, 0])
+
+    def test_capacity(self):
+        """
+        Tests the cache capacity
+        """
+        SetClass.set_intern_cache_capacity(2)
+        sc1 = SetClass.intern(pcset.make12(0, 1))
+        SetClass.intern(pcset.make12(0, 2))
+        SetClass.intern(pcset.make12(0, 1))
+        SetClass.intern(pcset.make12(0, 3))
+        self.assertEqual(SetClass.get_intern_cache_info()["size"], 2)
+        self.assertIs(sc1, SetClass.intern(pcset.make12(0, 1)))
+        self.assertEqual(SetClass.get_intern_cache_info()["misses"], 3)
+        with self.assertRaises(ValueError):
+            SetClass.set_intern_cache_capacity(-1)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,3 +1,5 @@
+import copy
+import pickle
 import unittest
 from pctheory import pcset
 from pctheory.pitch import Pitch, PitchClass
@@ -167,6 +169,27 @@ class PitchClassTestCase(unittest.TestCase):
         self.assertTrue(PitchClass(5) > PitchClass(3))
         self.assertTrue(PitchClass(5) > PitchClass(13))
         self.assertTrue(PitchClass(5) != PitchClass(4))
+        self.assertFalse(PitchClass(5) == 5)
+        self.assertTrue(PitchClass(5) != None)
+        self.assertFalse(PitchClass(5) == Pitch(5))
+
+    def test_pool(self):
+        """
+        Tests that pitch classes are shared, immutable instances
+        """
+        self.assertIs(PitchClass(15), PitchClass(3))
+        self.assertIs(PitchClass("B"), PitchClass(-1, 12))
+        self.assertIs(PitchClass(5) + 7, PitchClass(0))
+        self.assertIsNot(PitchClass(3, 24), PitchClass(3, 12))
+        self.assertEqual(PitchClass(3, 5000), PitchClass(5003, 5000))
+        self.assertEqual(hash(PitchClass(3, 5000)), hash(PitchClass(5003, 5000)))
+        self.assertIs(pickle.loads(pickle.dumps(PitchClass(3))), PitchClass(3))
+        self.assertIs(copy.deepcopy(PitchClass(3)), PitchClass(3))
+        with self.assertRaises(AttributeError):
+            PitchClass(3).pc = 4
+        with self.assertRaises(AttributeError):
+            PitchClass(3).name = "D#"
+        self.assertEqual(PitchClass(3).pc, 3)
 
 class PitchTestCase(unittest.TestCase):
     """
@@ -293,5 +316,21 @@ class PitchTestCase(unittest.TestCase):
         self.assertTrue(Pitch(5) > Pitch(3))
         self.assertTrue(Pitch(5) != Pitch(4))
 
+    def test_hash(self):
+        """
+        Tests pitch hashing, copying, and updating
+        """
+        p1 = Pitch(14, 12, "D5")
+        self.assertEqual(len({p1, Pitch(14), Pitch(2)}), 2)
+        p2 = pickle.loads(pickle.dumps(p1))
+        self.assertEqual((p2.p, p2.pc, p2.pname), (14, 2, "D5"))
+        p2 = copy.copy(p1)
+        self.assertIsNot(p2, p1)
+        p2.p = 27
+        self.assertEqual((p1.p, p2.p, p2.pc), (14, 27, 3))
+        self.assertEqual(hash(p2), hash(Pitch(27)))
+        p2.midi = 61
+        self.assertEqual((p2.p, p2.pc), (1, 1))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,209 @@
+import itertools
+import random
+import time
+import unittest
+import numpy as np
+from pctheory import pset
+from pctheory.pitch import Pitch, PitchClass
+
+class PsetTestCase(unittest.TestCase):
+    """
+    Tests psets
+    """
+    def test_ic_roster(self):
+        """
+        Tests ic-rosters, ic-matrices, and PM similarity
+        """
+        chord1 = pset.make_pset12(48, 52, 55, 60)
+        chord2 = pset.make_pset12(48, 55, 60, 64)
+        self.assertEqual(pset.get_ic_roster(chord1), {3: 1, 4: 1, 5: 1, 7: 1, 8: 1, 12: 1})
+        self.assertEqual(pset.get_ic_roster(chord2), {4: 1, 5: 1, 7: 1, 9: 1, 12: 1, 16: 1})
+        self.assertEqual(pset.get_ic_matrix(chord1).tolist(), [[0, 4, 7, 12], [4, 0, 3, 8], [7, 3, 0, 5], [12, 8, 5, 0]])
+        self.assertEqual(pset.calculate_pm_similarity(chord1, chord2), (3, 4))
+        self.assertEqual(pset.get_ic_roster(set()), {})
+
+        # All pairs at once
+        rng = random.Random(8)
+        psets = [{Pitch(rng.randint(40, 80)) for _ in range(rng.randint(0, 7))} for _ in range(60)]
+        common, shared = pset.get_pm_similarity_matrix(psets, chunk_size=7)
+        self.assertEqual(common.shape, (60, 60))
+        for i in range(60):
+            for j in range(60):
+                self.assertEqual((common[i, j], shared[i, j]), pset.calculate_pm_similarity(psets[i], psets[j]))
+        self.assertRaises(ValueError, next, pset.iter_pm_similarity_matrix(psets, 0))
+
+    def test_realizations(self):
+        """
+        Tests enumerating, counting, and sampling constrained pset realizations
+        """
+        pcset = {PitchClass(0), PitchClass(4), PitchClass(7)}
+        self.assertEqual([sorted(p.p for p in r) for r in pset.iter_pset_realizations(pcset, 48, 60, max_span=8)],
+                         [[48, 52, 55], [52, 55, 60]])
+        self.assertEqual(pset.count_pset_realizations(pcset, 48, 72), 12)
+        self.assertEqual(pset.count_pset_realizations(pcset, 48, 72, bass=Pitch(52)), 4)
+        self.assertEqual(pset.count_pset_realizations(pcset, 48, 72, 1, doubled_pcs={PitchClass(0)}), 12)
+        self.assertEqual(pset.count_pset_realizations(pcset, 48, 50), 0)
+        self.assertRaises(ValueError, pset.count_pset_realizations, pcset, 48, 72, -1)
+        aggregate = {PitchClass(pc) for pc in range(12)}
+        self.assertEqual(pset.count_pset_realizations(aggregate, 21, 108, max_span=11), 77)
+        self.assertEqual(pset.count_pset_realizations(aggregate, 21, 108, max_span=20), 17664)
+        self.assertEqual(len(pset.sample_pset_realizations(aggregate, 21, 108, 100, max_span=20)), 100)
+
+        # Random constraints, checked against every combination of candidate pitches
+        rng = random.Random(4)
+        for _ in range(40):
+            pcs = rng.sample(range(12), rng.randint(1, 4))
+            lower = rng.randint(36, 48)
+            upper = lower + rng.randint(0, 30)
+            num_duplicate_pitches = rng.randint(0, 2)
+            max_span = rng.choice([None, rng.randint(6, 30)])
+            min_spacing = rng.choice([None, rng.randint(1, 5)])
+            max_spacing = rng.choice([None, rng.randint(3, 12)])
+            bass = rng.choice([None, PitchClass(pcs[0])])
+            candidates = [p for p in range(lower, upper + 1) if p % 12 in pcs]
+            expected = []
+            for r in itertools.combinations(candidates, len(pcs) + num_duplicate_pitches):
+                spacings = np.diff(r)
+                if {p % 12 for p in r} == set(pcs) and (max_span is None or r[-1] - r[0] <= max_span) and \
+                        (min_spacing is None or np.all(spacings >= min_spacing)) and \
+                        (max_spacing is None or np.all(spacings <= max_spacing)) and \
+                        (bass is None or r[0] % 12 == bass.pc):
+                    expected.append(list(r))
+            args = ({PitchClass(pc) for pc in pcs}, lower, upper, num_duplicate_pitches, max_span, min_spacing,
+                    max_spacing, bass)
+            self.assertEqual([sorted(p.p for p in r) for r in pset.iter_pset_realizations(*args)], expected)
+            self.assertEqual(pset.count_pset_realizations(*args), len(expected))
+            sample = pset.sample_pset_realizations(args[0], lower, upper, 3, *args[3:])
+            self.assertEqual(len(sample), min(3, len(expected)))
+            self.assertEqual(len({str(sorted(r)) for r in sample}), len(sample))
+            for r in sample:
+                self.assertIn(sorted(p.p for p in r), expected)
+
+        realizations = pset.generate_random_pset_realizations(pcset, 48, 72, 20)
+        self.assertEqual(len(realizations), 12)
+
+class SieveTestCase(unittest.TestCase):
+    """
+    Tests Xenakis sieves
+    """
+    def test_sieve(self):
+        """
+        Tests sieve ranges, membership, and intervals
+        """
+        sieve = pset.Sieve({(3, 0), (4, 1)}, 0)
+        self.assertEqual(sieve.period, 12)
+        self.assertEqual(sieve.intervals, [1, 2, 2, 1, 3, 3])
+        self.assertEqual(sieve.get_range(0, 12), {Pitch(p) for p in [0, 1, 3, 5, 6, 9, 12]})
+        self.assertEqual(sieve.get_range(Pitch(-5), Pitch(10), True).tolist(), [0, 1, 3, 5, 6, 9])
+        self.assertTrue(sieve.is_in_sieve(9))
+        self.assertTrue(sieve.is_in_sieve({Pitch(13), Pitch(15)}))
+        self.assertFalse(sieve.is_in_sieve(Pitch(14)))
+        self.assertFalse(sieve.is_in_sieve(-3))
+
+        # A sieve with a base pitch and a long period, checked against direct residue tests
+        tuples = {(7, 2), (11, 3), (13, 5), (16, 0)}
+        sieve = pset.Sieve(tuples, 60, 24)
+        sieve.add_tuples((5, 7))  # A residue outside the modulus is an empty class
+        self.assertEqual(sieve.period, 16016)
+        self.assertEqual(sieve.base_pitch, Pitch(60, 24))
+        pitches = sieve.get_range(0, 40000, True)
+        expected = [p for p in range(60, 40001) if any((p - 60) % m == r for m, r in tuples)]
+        self.assertTrue(np.array_equal(pitches, expected))
+        self.assertEqual(sum(sieve.intervals), 16016)
+        self.assertEqual(len(sieve.get_range(100, 99)), 0)
+        sieve.add_tuples((5, 0), (6, 1))
+        self.assertEqual(sieve.period, 240240)
+        self.assertTrue(sieve.is_in_sieve(65))
+
+    def test_sieve_algebra(self):
+        """
+        Tests sieve union, intersection, and complement
+        """
+        s2 = pset.Sieve({(2, 0)}, 0)
+        s3 = pset.Sieve({(3, 0)}, 0)
+        self.assertEqual((s2 & s3).tuples, {(6, 0)})
+        self.assertEqual((s2 | s3).tuples, {(2, 0), (3, 0)})
+        self.assertEqual((~(s2 & s3)).tuples, {(2, 1), (3, 1), (3, 2)})
+        self.assertEqual((s2 | ~s2).tuples, {(1, 0)})
+        self.assertEqual((s2 & ~s2).tuples, set())
+        self.assertEqual(pset.Sieve({(4, 0), (4, 2), (8, 1), (8, 3), (8, 5), (8, 7)}, 0).tuples, {(1, 0)})
+        self.assertEqual(pset.Sieve({(6, 0), (6, 4), (3, 2)}, 0).tuples, {(2, 0), (3, 2)})
+        self.assertEqual((s2 & pset.Sieve({(3, 0)}, 1)).tuples, {(6, 3)})
+        self.assertEqual((s2 & pset.Sieve({(3, 0)}, 1)).base_pitch, Pitch(1))
+        self.assertEqual((s2 & pset.Sieve({(4, 1)}, 0)).period, 1)
+
+        # Neither Sieve has pitches below its base pitch
+        a = pset.Sieve({(6, 2), (8, 5)}, -2)
+        b = pset.Sieve({(1, 0)}, 3)
+        self.assertFalse((a & b).is_in_sieve(0))
+        self.assertEqual((a & b).get_range(-10, 20, True).tolist(), [3, 6, 11, 12, 18, 19])
+        self.assertEqual((b | a).base_pitch, Pitch(-2))
+        self.assertEqual((b | a).get_range(-10, 8, True).tolist(), [0, 3, 4, 5, 6, 7, 8])
+        self.assertEqual((a | b).tuples, {(1, 0)})
+        self.assertEqual((a | b).period, 1)
+        self.assertFalse((a | b).is_in_sieve(1))
+
+        # Sieves decomposed from different pitch fields have different base pitches
+        low = pset.Sieve.from_pitches([0, 3, 7, 12, 15, 19])
+        high = pset.Sieve.from_pitches([26, 29, 31, 36])
+        sieve = low | high | ~pset.Sieve({(5, 0)}, 40)
+        expected = [p for p in range(-20, 200) if low.is_in_sieve(p) or high.is_in_sieve(p) or (p >= 40 and p % 5 != 0)]
+        self.assertEqual(sieve.get_range(-20, 199, True).tolist(), expected)
+        self.assertEqual([p for p in range(-20, 200) if sieve.is_in_sieve(p)], expected)
+        self.assertEqual(sieve.intervals, np.diff(sieve.get_range(40, 40 + sieve.period, True)).tolist())
+
+        # A nested sieve, checked against its definition
+        a = pset.Sieve({(8, 0), (8, 1), (8, 7)}, 0)
+        b = pset.Sieve({(5, 1), (5, 3)}, 0)
+        c = pset.Sieve({(3, 2), (4, 3)}, 0)
+        sieve = ((a & ~b) | (b & ~c)) & ~pset.Sieve({(7, 0)}, 0)
+        self.assertEqual(sieve.period, 840)
+        expected = [p for p in range(2000) if ((a.is_in_sieve(p) and not b.is_in_sieve(p)) or
+                                               (b.is_in_sieve(p) and not c.is_in_sieve(p))) and p % 7 != 0]
+        self.assertEqual(sieve.get_range(0, 1999, True).tolist(), expected)
+
+        # Complements of unions of coprime moduli are not expanded into the product of their classes
+        for primes in [[2, 3, 5, 7, 11, 13, 17, 19], [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]]:
+            start = time.perf_counter()
+            sieve = ~pset.Sieve({(q, 0) for q in primes}, 0)
+            self.assertEqual(sieve.get_range(0, 2000, True).tolist(),
+                             [p for p in range(2001) if all(p % q != 0 for q in primes)])
+            self.assertTrue(sieve.is_in_sieve(2 * 3 * 5 * 7 * 11 * 13 * 17 * 19 * 23 * 29 + 1))
+            self.assertLess(time.perf_counter() - start, 5)
+
+    def test_sieve_decomposition(self):
+        """
+        Tests decomposing psets into sieves
+        """
+        sieve = pset.Sieve.from_pitches(pset.Sieve({(3, 0), (4, 1)}, 0).get_range(0, 119))
+        self.assertEqual(sieve.tuples, {(3, 0), (4, 1)})
+        self.assertEqual(sieve.base_pitch, Pitch(0))
+        sieve = pset.Sieve.from_pitches({Pitch(5), Pitch(9)}, p0=1, p1=20)
+        self.assertEqual(sieve.get_range(1, 20), {Pitch(5), Pitch(9)})
+        self.assertEqual(len(sieve.tuples), 2)
+        self.assertEqual(sieve.intervals, [4, 12, 12, 4, 8])
+        self.assertRaises(ValueError, pset.Sieve.from_pitches, [0, 1, 5, 9], 3)
+
+        # The decomposition is irredundant, though a smaller one may exist: {(2, 0), (4, 3), (8, 1)} also works
+        pitches = [0, 1, 2, 3, 4, 6, 7, 8, 9, 10, 11, 12]
+        sieve = pset.Sieve.from_pitches(pitches)
+        self.assertEqual(sieve.get_range(0, 12, True).tolist(), pitches)
+        for t in sieve.tuples:
+            self.assertNotEqual(pset.Sieve(sieve.tuples - {t}, 0).get_range(0, 12, True).tolist(), pitches)
+        self.assertRaises(ValueError, pset.Sieve.from_pitches, [0, 1, 5, 9], None, 2)
+
+        # Random pitch fields, which need more moduli than a single mask can cover
+        rng = np.random.default_rng(3)
+        for n, length in [(50, 200), (2000, 5000)]:
+            pitches = np.sort(rng.choice(length, n, replace=False)) - 100
+            sieve = pset.Sieve.from_pitches(pitches)
+            self.assertTrue(np.array_equal(sieve.get_range(int(pitches[0]), int(pitches[-1]), True), pitches))
+            self.assertTrue(sieve.is_in_sieve(int(pitches[n // 2])))
+            self.assertFalse(sieve.is_in_sieve(int(pitches[0]) - 1))
+        self.assertGreater(sieve.period, 1 << 24)
+        with self.assertRaises(ValueError):
+            sieve.intervals
+
+
+if __name__ == "__main__":
+    unittest.main()
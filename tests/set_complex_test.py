@@ -18,5 +18,24 @@ class SetComplexTestCase(unittest.TestCase):
         skcomplex = set_complex.get_k12(sc)
         skhcomplex = set_complex.get_kh12(sc)
 
+    def test_k_complexes(self):
+        """
+        Tests K and Kh complexes against the set-class definitions
+        """
+        for nexus in [SetClass("4-Z15"), SetClass("5-4"), SetClass("6-Z17")]:
+            k = set_complex.get_k12(nexus)
+            kh = set_complex.get_kh12(nexus)
+            for sc in set_complex.set_classes12:
+                sc_bar = sc.get_abstract_complement()
+                in_k = sc.contains_abstract_subset(nexus) or sc_bar.contains_abstract_subset(nexus) or \
+                    nexus.contains_abstract_subset(sc) or nexus.contains_abstract_subset(sc_bar)
+                in_kh = (sc.contains_abstract_subset(nexus) or nexus.contains_abstract_subset(sc)) and \
+                    (sc_bar.contains_abstract_subset(nexus) or nexus.contains_abstract_subset(sc_bar))
+                self.assertEqual(sc in k, in_k)
+                self.assertEqual(sc in kh, in_kh)
+                self.assertEqual(set_complex.assert_k(nexus, sc), in_k)
+                self.assertEqual(set_complex.assert_kh(nexus, sc), in_kh)
+        self.assertIn(SetClass("6-Z17"), set_complex.get_kh12(SetClass("4-Z15")))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
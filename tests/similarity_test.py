@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+from pctheory import similarity
+from pctheory.pcset import SetClass
+from pctheory.pitch import PitchClass
+
+class SimilarityTestCase(unittest.TestCase):
+    """
+    Tests set-class similarity measures
+    """
+    def test_measures(self):
+        """
+        Tests each measure against values computed by hand
+        """
+        x = SetClass("3-1")
+        y = SetClass("3-2")
+        self.assertEqual(similarity.sim(x, y), 2)
+        self.assertAlmostEqual(similarity.asim(x, y), 1 / 3)
+        self.assertAlmostEqual(similarity.icvsim(x, y), np.sqrt(1 / 3))
+        self.assertAlmostEqual(similarity.angle(x, y), np.degrees(np.arccos(3 / np.sqrt(15))))
+        self.assertAlmostEqual(similarity.rel(x, y), (np.sqrt(2) + 1) / 4)
+        self.assertAlmostEqual(similarity.atmemb(x, y), 5 / 8)
+        self.assertAlmostEqual(similarity.recrel(x, y), 200 / 3)
+        for measure, identical in [("ANGLE", 0), ("ASIM", 0), ("ATMEMB", 1), ("IcVSIM", 0), ("RECREL", 0), ("REL", 1), ("SIM", 0)]:
+            self.assertEqual(similarity.get_similarity_matrix([x, x], measure)[0, 1], identical)
+        self.assertTrue(np.isnan(similarity.rel(x, SetClass("1-1"))))
+        self.assertRaises(ValueError, similarity.get_similarity_matrix, [x, y], "COS")
+
+    def test_matrix(self):
+        """
+        Tests that similarity matrices match pairwise values, with and without chunks
+        """
+        set_classes12 = SetClass.get_set_classes12()
+        for measure in ["ANGLE", "ASIM", "ATMEMB", "IcVSIM", "RECREL", "REL", "SIM"]:
+            matrix = similarity.get_similarity_matrix(set_classes12, measure)
+            self.assertEqual(matrix.shape, (224, 224))
+            np.testing.assert_allclose(matrix, matrix.T, equal_nan=True)
+            np.testing.assert_allclose(matrix, similarity.get_similarity_matrix(set_classes12, measure, 17), equal_nan=True)
+            function = getattr(similarity, measure.lower())
+            for i, j in [(20, 50), (100, 101), (223, 5)]:
+                self.assertAlmostEqual(matrix[i, j], function(set_classes12[i], set_classes12[j]))
+
+    def test_matrix24(self):
+        """
+        Tests similarity matrices for mod 24 set-classes
+        """
+        rng = np.random.default_rng(14)
+        set_classes = [SetClass({PitchClass(int(pc), 24) for pc in rng.choice(24, n, replace=False)}, 24) for n in rng.integers(3, 9, 30)]
+        starts = []
+        for start, rows in similarity.iter_similarity_matrix(set_classes, "RECREL", 8):
+            starts.append(start)
+            self.assertEqual(rows.shape[1], 30)
+        self.assertEqual(starts, [0, 8, 16, 24])
+        for measure in ["ASIM", "ATMEMB", "REL"]:
+            matrix = similarity.get_similarity_matrix(set_classes, measure)
+            self.assertAlmostEqual(matrix[3, 7], similarity.get_similarity_matrix([set_classes[3], set_classes[7]], measure)[0, 1])
+            np.testing.assert_allclose(np.diag(matrix), 0 if measure == "ASIM" else 1)
+        self.assertRaises(ValueError, similarity.get_similarity_matrix, [set_classes[0], SetClass("3-1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pctheory import pcset, tables
+
+class TablesTestCase(unittest.TestCase):
+    """
+    Tests table loading
+    """
+    def test_shared_tables(self):
+        """
+        Tests that the shared tables are loaded once and reused
+        """
+        self.assertIs(tables.get_tables_sc12(), tables.get_tables_sc12())
+        self.assertEqual(tables.get_tables_sc12(), tables.create_tables_sc12())
+        self.assertEqual(pcset.name_tables["forteToSetNameTable"]["4-3"], "[0134]")
+        self.assertIs(pcset.name_tables.load(), tables.get_tables_sc12())
+        self.assertEqual(len(tables.get_tables_ten_trichord()["tenTrichordRows"]), 19504)
+
+    def test_packed_rows(self):
+        """
+        Tests the packed row tables
+        """
+        pairs = [(tables.get_row_table_all_trichord(), tables.get_tables_all_trichord()["allTrichordRows"]),
+                 (tables.get_row_table_all_trichord_babbitt(), tables.get_tables_all_trichord_babbitt()["allTrichordBabbittRows"]),
+                 (tables.get_row_table_eleven_interval(), tables.get_tables_eleven_interval()["elevenIntervalRowGenerators"]),
+                 (tables.get_row_table_ten_trichord(), tables.get_tables_ten_trichord()["tenTrichordRows"])]
+        for table, rows in pairs:
+            self.assertEqual(len(table), len(rows))
+            self.assertEqual(table.width, len(rows[0]))
+            self.assertEqual(table.to_array().tolist(), rows)
+            self.assertEqual(table[5], tuple(rows[5]))
+            self.assertEqual(table[-1], tuple(rows[-1]))
+            self.assertEqual(table[10:20].tolist(), rows[10:20])
+        self.assertIs(tables.get_row_table_ten_trichord(), tables.get_row_table_ten_trichord())
+
+    def test_pack_rows(self):
+        """
+        Tests writing and reading packed row tables
+        """
+        rows = [[0, 15, 3], [7, 1, 9], [12, 4, 0]]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rows.bin")
+            tables.write_packed_rows(rows, path)
+            self.assertEqual(os.path.getsize(path), 16 + 2 * 3)
+            table = tables.PackedRowTable(path)
+            self.assertEqual([list(row) for row in table], rows)
+            self.assertEqual(table[[2, 0]].tolist(), [rows[2], rows[0]])
+            del table
+            with open(path, "wb") as table_file:
+                table_file.write(b"not a table at all")
+            self.assertRaises(ValueError, tables.PackedRowTable, path)
+        self.assertRaises(ValueError, tables.pack_rows, [[0, 16]])
+        self.assertRaises(ValueError, tables.pack_rows, [[0, 1], [2]])
+
+    def test_lazy_import(self):
+        """
+        Tests that importing the package does not load tables or optional dependencies
+        """
+        code = "import sys\n" \
+               "from pctheory import pcseg, pcset, set_complex, tables\n" \
+               "print(pcset.name_tables.is_loaded, len(tables._tables), len(tables._row_tables), 'networkx' in sys.modules, 'pyvis' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.split(), ["False", "0", "0", "False", "False"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import operator
 from pctheory import pcset, pcseg
 from pctheory.pcset import SetClass
 from pctheory.pitch import PitchClass
@@ -100,6 +101,17 @@ class OTO12TestCase(unittest.TestCase):
         self.assertEqual(OTO("T5RM")(pcseg.make_pcseg12(2, 4, 9, 10)), pcseg.make_pcseg12(7, 2, 1, 3))
         self.assertEqual(OTO("T5RM5")(pcseg.make_pcseg12(2, 4, 9, 10)), pcseg.make_pcseg12(7, 2, 1, 3))
 
+    def test_apply(self):
+        """
+        Tests applying OTOs to integer arrays
+        """
+        rows = [[2, 4, 9, 10], [0, 1, 2, 3]]
+        for name, oto in transformations.get_otos12().items():
+            expected = [[pc.pc for pc in oto(pcseg.make_pcseg12(*row))] for row in rows]
+            self.assertEqual(oto.apply(rows).tolist(), expected)
+        self.assertEqual(OTO("T5RI").permutation().tolist(), [(5 - i) % 12 for i in range(12)])
+        self.assertEqual(OTO("T5I")(pcset.make_pcset12(2, 4)), pcset.make_pcset12(3, 1))
+
     def test_corpus(self):
         """
         Tests for retrieving the OTO corpus
@@ -108,6 +120,12 @@ class OTO12TestCase(unittest.TestCase):
         self.assertEqual(len(corpus), 12 * 8)
         for name, oto in corpus.items():
             self.assertEqual(oto, OTO(name))
+        self.assertIs(transformations.get_otos(12), corpus)
+        self.assertRaises(TypeError, operator.setitem, corpus, "T0", OTO("T1"))
+        corpus = transformations.get_otos24()
+        self.assertEqual(len(corpus), 24 * 16)
+        self.assertEqual(corpus["T3RM5"], OTO(3, True, 5))
+        self.assertEqual(transformations.get_otos(7)["T3RM2"], OTO(3, True, 2))
 
     def test_find_otos(self):
         """
@@ -126,6 +144,23 @@ class OTO12TestCase(unittest.TestCase):
         self.assertEqual(transformations.find_otos(pcseg.make_pcseg12(1, 2, 4, 0), pcseg.make_pcseg12(5, 6)), {OTO("T4"), OTO("T7RI")})
         self.assertEqual(transformations.find_otos(pcseg.make_pcseg12(1, 2, 4, 0), pcseg.make_pcseg12(4, 6)), {OTO("T2"), OTO("T8RI"), OTO("T8RM5"), OTO("T2M7")})
 
+    def test_find_oto_occurrences(self):
+        """
+        Tests finding the operator and offset of each occurrence
+        """
+        self.assertEqual(transformations.find_oto_occurrences(pcseg.make_pcseg12(1, 2, 4, 0), pcseg.make_pcseg12(5, 6)),
+            [(OTO("T4"), 0), (OTO("T7RI"), 2)])
+        self.assertEqual(transformations.find_oto_occurrences(pcseg.make_pcseg12(0, 1, 0, 1), pcseg.make_pcseg12(3, 4)),
+            [(OTO("T3"), 0), (OTO("T4RI"), 0), (OTO("T4I"), 1), (OTO("T3R"), 1), (OTO("T3"), 2), (OTO("T4RI"), 2)])
+        rows = [pcseg.make_pcseg12(1, 2, 4, 0), [], pcseg.make_pcseg12(7), pcseg.make_pcseg12(9, 10, 0, 8, 9), pcseg.make_pcseg12(8, 6, 5, 3)]
+        self.assertEqual(transformations.find_oto_occurrences_batch(rows, pcseg.make_pcseg12(5, 6, 8)),
+            [(0, OTO("T4"), 0), (3, OTO("T8"), 0), (4, OTO("T11I"), 1), (4, OTO("T0R"), 1)])
+        otos = transformations.get_otos24()
+        row = [PitchClass(pc, 24) for pc in [0, 5, 11, 2, 23, 16, 7]]
+        query = [PitchClass(pc, 24) for pc in [3, 9, 8]]
+        self.assertEqual(transformations.find_oto_occurrences(row, query),
+            sorted([(oto, i) for oto in otos.values() for i in range(5) if oto.transform(row)[i:i + 3] == query], key=lambda o: (o[1], o[0])))
+
 class UTO12TestCase(unittest.TestCase):
     """
     Tests mod 12 UTOs.
@@ -239,7 +274,49 @@ class UTO12TestCase(unittest.TestCase):
         self.assertEqual(len(corpus), 12 * 4)
         for name, uto in corpus.items():
             self.assertEqual(uto, UTO(name))
+        self.assertIs(transformations.get_utos12(), corpus)
+        self.assertIs(transformations.get_utos(12), corpus)
+        self.assertRaises(TypeError, operator.setitem, corpus, "T0", UTO("T1"))
+        self.assertRaises(AttributeError, setattr, corpus["T0"], "_x", 0)
+        self.assertEqual(set(corpus.values()), set(transformations.get_uto_list()))
+        self.assertEqual(len(transformations.get_utos24()), 24 * 8)
+        self.assertEqual(transformations.get_utos(7)["T3M2"], UTO(3, 2))
+        self.assertEqual(transformations.get_utos(7)["T3I"], UTO(3, 6))
+        self.assertEqual(len(transformations.get_utos(7)), 7 * 6)
+        self.assertNotEqual(UTO("T0"), "T0")
     
+    def test_apply(self):
+        """
+        Tests applying UTOs to integer arrays
+        """
+        for mod, utos in [(12, transformations.get_utos12()), (24, transformations.get_utos24())]:
+            permutations = transformations.get_uto_permutations(mod)
+            for uto in utos.values():
+                expected = [pc.pc for pc in uto([PitchClass(i, mod) for i in range(mod)])]
+                self.assertEqual(uto.permutation(mod).tolist(), expected)
+                self.assertEqual(uto.apply(list(range(mod)), mod).tolist(), expected)
+                self.assertEqual(permutations[transformations.get_uto_index(uto, mod)].tolist(), expected)
+        self.assertEqual(UTO("T3M5").apply([[0, 1], [2, 3]]).tolist(), [[3, 8], [1, 6]])
+
+    def test_cayley_table(self):
+        """
+        Tests the UTO composition table
+        """
+        for mod, size in [(12, 48), (24, 192)]:
+            utos = transformations.get_uto_list(mod)
+            cayley = transformations.get_uto_cayley_table(mod)
+            self.assertEqual(len(utos), size)
+            self.assertEqual(cayley.shape, (size, size))
+            for i in range(0, size, 5):
+                for j in range(size):
+                    self.assertEqual(utos[cayley[i, j]], transformations.left_multiply_utos(utos[i], utos[j], mod=mod))
+        utos = transformations.get_uto_list()
+        chains = [[transformations.get_uto_index(UTO(name)) for name in chain] for chain in
+                  [["T5I", "T2", "T8I"], ["T4I", "T4I", "T0"], ["T5", "T8", "T3M5"]]]
+        self.assertEqual([utos[i] for i in transformations.left_multiply_uto_indices(chains)],
+                         [UTO("T7"), UTO("T0"), UTO("T4M5")])
+        self.assertRaises(ValueError, transformations.get_uto_index, UTO(0, 2))
+
     def test_left_multiply(self):
         """
         Tests left-multiplication of UTOs